@@ -1,13 +1,19 @@
 import subprocess
-import threading
-from typing import Optional, Tuple
+from typing import Iterable, Optional, Tuple
+
+from war_drone.adb_channels import DeviceChannels, device_channels
+from war_drone.adb_shell import AdbShellSession, swipe_cmd, sleep_cmd, tap_cmd
 
 
 class AdbClient:
-    def __init__(self, serial: Optional[str] = None, adb_path: str = "adb"):
+    def __init__(self, serial: Optional[str] = None, adb_path: str = "adb", input_mode: str = "exec"):
         self.serial = serial
         self.adb = adb_path
-        self._lock = threading.Lock()
+        # 截屏与输入各走一条通道（各自队列 + 锁），点击不会排在慢截屏后面；同一设备共用
+        self.channels: DeviceChannels = device_channels(serial)
+        # exec: 每次动作 fork adb 进程；session: 常驻 adb shell 会话
+        self.input_mode = input_mode
+        self._session: Optional[AdbShellSession] = None
 
     def _build_cmd(self, *parts: str):
         cmd = [self.adb]
@@ -16,54 +22,112 @@ class AdbClient:
         cmd += list(parts)
         return cmd
 
+    def _get_session(self) -> AdbShellSession:
+        if self._session is None:
+            self._session = AdbShellSession(self._build_cmd("shell"))
+        return self._session
+
+    def channel_stats(self) -> str:
+        """capture / input 两条通道的排队等待与执行耗时"""
+        return self.channels.describe()
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def input_batch(self, cmds: Iterable[str], timeout: float = 10.0):
+        """一次往返顺序执行多条输入命令（tap_cmd/swipe_cmd/sleep_cmd）。"""
+        cmds = [c for c in cmds if c]
+        if not cmds:
+            return
+        self.channels.input.call(self._input_batch, cmds, timeout)
+
+    def _input_batch(self, cmds, timeout: float):
+        try:
+            if self.input_mode == "session":
+                self._get_session().run_batch(cmds, timeout=timeout)
+            else:
+                subprocess.check_call(self._build_cmd("shell", "; ".join(cmds)), timeout=timeout)
+        except Exception as e:
+            print(f"[WARN] 批量输入失败 ({len(cmds)} 条): {e}")
+
+    def tap_batch(self, points: Iterable[Tuple[int, int]], interval_s: float = 0.0):
+        """多点依次点击，一次往返。"""
+        cmds = []
+        for i, (x, y) in enumerate(points):
+            if i and interval_s > 0:
+                cmds.append(sleep_cmd(interval_s))
+            cmds.append(tap_cmd(x, y))
+        self.input_batch(cmds, timeout=5.0 + interval_s * len(cmds))
+
     def tap(self, x: int, y: int):
         """点击指定坐标"""
-        with self._lock:
-            cmd = self._build_cmd("shell", "input", "tap", str(int(x)), str(int(y)))
+        self.channels.input.call(self._tap, x, y)
+
+    def _tap(self, x: int, y: int):
+        if self.input_mode == "session":
             try:
-                subprocess.check_call(cmd, timeout=5)
-            except subprocess.TimeoutExpired:
-                print(f"[WARN] 点击命令超时 ({x},{y})")
+                self._get_session().run(tap_cmd(x, y), timeout=5)
             except Exception as e:
                 print(f"[WARN] 点击失败 ({x},{y}): {e}")
+            return
+        cmd = self._build_cmd("shell", "input", "tap", str(int(x)), str(int(y)))
+        try:
+            subprocess.check_call(cmd, timeout=5)
+        except subprocess.TimeoutExpired:
+            print(f"[WARN] 点击命令超时 ({x},{y})")
+        except Exception as e:
+            print(f"[WARN] 点击失败 ({x},{y}): {e}")
 
     def swipe(self, start: Tuple[int, int], end: Tuple[int, int], duration_s: float = 0.3):
         """滑动"""
-        with self._lock:
-            x1, y1 = start
-            x2, y2 = end
-            dur_ms = int(max(1, float(duration_s) * 1000))
-            cmd = self._build_cmd(
-                "shell",
-                "input",
-                "swipe",
-                str(int(x1)),
-                str(int(y1)),
-                str(int(x2)),
-                str(int(y2)),
-                str(dur_ms),
-            )
+        self.channels.input.call(self._swipe, start, end, duration_s)
+
+    def _swipe(self, start: Tuple[int, int], end: Tuple[int, int], duration_s: float):
+        x1, y1 = start
+        x2, y2 = end
+        if self.input_mode == "session":
             try:
-                subprocess.check_call(cmd, timeout=max(3.0, float(duration_s) + 2.0))
+                self._get_session().run(swipe_cmd(start, end, duration_s), timeout=max(3.0, float(duration_s) + 2.0))
                 print(f"[ACTION] swipe ({x1},{y1})->({x2},{y2}) dur={duration_s:.2f}s")
-            except subprocess.TimeoutExpired:
-                print("[WARN] 滑动命令超时")
             except Exception as e:
                 print(f"[WARN] 滑动命令失败: {e}")
+            return
+        dur_ms = int(max(1, float(duration_s) * 1000))
+        cmd = self._build_cmd(
+            "shell",
+            "input",
+            "swipe",
+            str(int(x1)),
+            str(int(y1)),
+            str(int(x2)),
+            str(int(y2)),
+            str(dur_ms),
+        )
+        try:
+            subprocess.check_call(cmd, timeout=max(3.0, float(duration_s) + 2.0))
+            print(f"[ACTION] swipe ({x1},{y1})->({x2},{y2}) dur={duration_s:.2f}s")
+        except subprocess.TimeoutExpired:
+            print("[WARN] 滑动命令超时")
+        except Exception as e:
+            print(f"[WARN] 滑动命令失败: {e}")
 
     def screencap(self) -> bytes:
         """截屏，返回 PNG bytes。"""
-        with self._lock:
-            cmd = self._build_cmd("exec-out", "screencap", "-p")
-            try:
-                data = subprocess.check_output(cmd, timeout=10)
-                # 某些设备通过 adb 传输时会把 PNG 的 LF 变成 CRLF
-                if b"\r\n" in data:
-                    data = data.replace(b"\r\n", b"\n")
-                return data
-            except subprocess.TimeoutExpired:
-                print("[WARN] 截屏超时")
-                raise
-            except Exception as e:
-                print(f"[WARN] 截屏失败: {e}")
-                raise
+        return self.channels.capture.call(self._screencap)
+
+    def _screencap(self) -> bytes:
+        cmd = self._build_cmd("exec-out", "screencap", "-p")
+        try:
+            data = subprocess.check_output(cmd, timeout=10)
+            # 某些设备通过 adb 传输时会把 PNG 的 LF 变成 CRLF
+            if b"\r\n" in data:
+                data = data.replace(b"\r\n", b"\n")
+            return data
+        except subprocess.TimeoutExpired:
+            print("[WARN] 截屏超时")
+            raise
+        except Exception as e:
+            print(f"[WARN] 截屏失败: {e}")
+            raise
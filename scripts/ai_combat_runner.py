@@ -21,6 +21,7 @@ import numpy as np
 from ultralytics import YOLO
 
 from war_drone.adb_client import AdbClient
+from war_drone.frames import open_source
 
 
 def _pct_to_px(p, wh):
@@ -39,6 +40,7 @@ def parse_args():
     ap.add_argument("--device", default="cpu", help="YOLO device, e.g. cpu / 0")
     ap.add_argument("--interval", type=float, default=0.2, help="循环间隔（s），含推理耗时")
     ap.add_argument("--max-frames", type=int, default=0, help="最多循环帧数，0=不限制")
+    ap.add_argument("--source", default="adb", help="帧源：adb[:png|raw|auto] / screenrecord / scrcpy / video:<mp4> / dir:<目录>")
     return ap.parse_args()
 
 
@@ -73,6 +75,7 @@ def main():
 
     model = YOLO(args.model)
     adb = AdbClient(serial=args.serial)
+    src = open_source(args.source, adb=adb, decode_size=(W, H)).start()
 
     print(f"[INFO] AI combat runner start: device={args.device}, imgsz={imgsz}, conf={conf_th}")
     frame_idx = 0
@@ -84,8 +87,11 @@ def main():
                 break
             frame_idx += 1
 
-            bgr = adb.screencap()
+            bgr = src.screencap()
             if bgr is None:
+                if src.exhausted:
+                    print("[INFO] source exhausted, exit.")
+                    break
                 print("[WARN] screencap failed")
                 continue
             # YOLO 接受 BGR/RGB 均可，这里保持 BGR 直接传
@@ -194,7 +200,8 @@ def main():
                     dur_ms = int(min(adaptive_duration, 300))  # 最长300ms
                     
                     # 执行滑动
-                    adb._cmd(["shell", "input", "swipe", str(x1), str(y1), str(x2), str(y2), str(dur_ms)])
+                    if not src.finite:  # 回放帧源只看决策，不注入
+                        adb._cmd(["shell", "input", "swipe", str(x1), str(y1), str(x2), str(y2), str(dur_ms)])
                     
                     # 可选：添加调试信息
                     print(f"[AIM] 移动准星: ({dx:.3f}, {dy:.3f}) 滑动: {slide_distance:.1f}px")
@@ -217,7 +224,8 @@ def main():
 
             if fire_btn:
                 x, y = _pct_to_px(fire_btn, (W, H))
-                adb.tap(x, y)
+                if not src.finite:
+                    adb.tap(x, y)
                 print(f"[FIRE] {tgt['name']} conf={tgt['conf']:.2f} btn={fire_btn}")
 
             # 控制循环节奏
@@ -225,6 +233,8 @@ def main():
 
     except KeyboardInterrupt:
         print("\n[INFO] stopped by user")
+    finally:
+        src.stop()
 
 
 if __name__ == "__main__":
@@ -34,6 +34,8 @@ from ultralytics import YOLO
 from PIL import Image, ImageDraw, ImageFont
 
 from war_drone.adb_client import AdbClient
+from war_drone.frames import FrameSource, open_source
+from war_drone.latency import FrameTrace, LatencyRecorder
 
 
 # ==================== 性能监控 ====================
@@ -89,6 +91,7 @@ class DetectionResult:
     img_h: int
     center_x: int
     center_y: int
+    trace: Optional[FrameTrace] = None
 
 
 @dataclass
@@ -106,15 +109,16 @@ class ControlCommand:
     start_y_px: int = 0
     end_x_px: int = 0    # 滑动终点像素坐标
     end_y_px: int = 0
+    trace: Optional[FrameTrace] = None  # 产生该命令的帧
 
 
 # ==================== 截图线程 ====================
 class ScreenshotThread(threading.Thread):
     """专用截图线程"""
-    def __init__(self, adb_client: AdbClient, output_queue: queue.Queue, 
+    def __init__(self, frame_source: FrameSource, output_queue: queue.Queue,
                  stop_event: threading.Event, perf_monitor: PerformanceMonitor):
         super().__init__(name="ScreenshotThread", daemon=True)
-        self.adb = adb_client
+        self.source = frame_source
         self.output_queue = output_queue
         self.stop_event = stop_event
         self.perf_monitor = perf_monitor
@@ -127,15 +131,20 @@ class ScreenshotThread(threading.Thread):
             try:
                 t0 = time.time()
                 
-                # 截屏
-                bgr = self.adb.screencap()
+                # 截屏（FramePacket 自带延迟埋点 trace）
+                pkt = self.source.next()
                 
-                if bgr is None:
+                if pkt is None:
+                    if self.source.exhausted:
+                        print("[截图线程] 帧源已结束")
+                        self.stop_event.set()
+                        break
                     self.fail_count += 1
                     sleep_time = min(0.1 * self.fail_count, 1.0)
                     time.sleep(sleep_time)
                     continue
                 
+                bgr = pkt.image
                 self.fail_count = 0
                 self.frame_id += 1
                 
@@ -143,26 +152,22 @@ class ScreenshotThread(threading.Thread):
                 screenshot_time = time.time() - t0
                 self.perf_monitor.add_time('screenshot', screenshot_time)
                 
+                item = {
+                    'frame_id': self.frame_id,
+                    'timestamp': t0,
+                    'image': bgr,
+                    'img_h': bgr.shape[0],
+                    'img_w': bgr.shape[1],
+                    'trace': pkt.trace,
+                }
                 # 将截图放入队列（如果队列满了就丢弃旧数据）
                 if self.output_queue.qsize() < 5:  # 限制队列大小
-                    self.output_queue.put({
-                        'frame_id': self.frame_id,
-                        'timestamp': t0,
-                        'image': bgr,
-                        'img_h': bgr.shape[0],
-                        'img_w': bgr.shape[1],
-                    })
+                    self.output_queue.put(item)
                 else:
                     # 队列满了，尝试清空一个旧数据
                     try:
                         self.output_queue.get_nowait()
-                        self.output_queue.put({
-                            'frame_id': self.frame_id,
-                            'timestamp': t0,
-                            'image': bgr,
-                            'img_h': bgr.shape[0],
-                            'img_w': bgr.shape[1],
-                        })
+                        self.output_queue.put(item)
                     except queue.Empty:
                         pass
                 
@@ -256,6 +261,9 @@ class YOLOThread(threading.Thread):
                 # 记录YOLO时间
                 yolo_time = time.time() - t0
                 self.perf_monitor.add_time('yolo', yolo_time)
+                trace = data.get('trace')
+                if trace is not None:
+                    trace.mark("detect")
                 
                 # 创建结果对象
                 result = DetectionResult(
@@ -266,7 +274,8 @@ class YOLOThread(threading.Thread):
                     img_w=data['img_w'],
                     img_h=data['img_h'],
                     center_x=data['img_w'] // 2,
-                    center_y=data['img_h'] // 2
+                    center_y=data['img_h'] // 2,
+                    trace=trace,
                 )
                 
                 # 将结果放入输出队列
@@ -285,7 +294,8 @@ class ADBControlThread(threading.Thread):
     """专用ADB控制线程"""
     def __init__(self, adb_client: AdbClient, input_queue: queue.Queue,
                  stop_event: threading.Event, perf_monitor: PerformanceMonitor,
-                 args, img_w: int, img_h: int):
+                 args, img_w: int, img_h: int, coord_scale: float = 1.0,
+                 latency: Optional[LatencyRecorder] = None):
         super().__init__(name="ADBThread", daemon=True)
         self.adb = adb_client
         self.input_queue = input_queue
@@ -294,6 +304,8 @@ class ADBControlThread(threading.Thread):
         self.args = args
         self.img_w = img_w
         self.img_h = img_h
+        self.coord_scale = coord_scale  # 帧像素 -> 设备像素（屏幕流按较低分辨率解码时 >1）
+        self.latency = latency
         self.last_command_time = 0
         self.min_command_interval = 0.02  # 最小命令间隔（约50Hz）
         self.last_cmd = None  # 保存最后一次命令用于可视化
@@ -326,8 +338,13 @@ class ADBControlThread(threading.Thread):
                 t0 = time.time()
                 
                 # 执行滑动
+                injected = False
                 if cmd.slide_dist > 0 and not self.args.dry_run:
-                    self._execute_swipe(cmd)
+                    injected = self._execute_swipe(cmd)
+                if cmd.trace is not None and self.latency is not None:
+                    if injected:
+                        cmd.trace.mark("inject")
+                    self.latency.add(cmd.trace)
                 
                 # 保存最后执行的命令用于可视化
                 self.last_cmd = cmd
@@ -348,11 +365,11 @@ class ADBControlThread(threading.Thread):
         print("[ADB线程] 已停止")
     
     def _execute_swipe(self, cmd: ControlCommand):
-        """执行滑动命令"""
+        """执行滑动命令；返回是否真正下发了滑动"""
         # 计算滑动方向和长度
         slide_dist = cmd.slide_dist
         if slide_dist <= 0:
-            return
+            return False
         
         # 重要：检查目标距离是否真的需要移动
         # cmd.dist 是目标到准星的实际距离
@@ -360,7 +377,7 @@ class ADBControlThread(threading.Thread):
             # 已经在容差范围内，不需要滑动
             if self.args.debug:
                 print(f"\n[ADB] 目标已在容差内，不滑动")
-            return
+            return False
         
         # 使用原始 dx, dy 计算方向
         raw_dist = math.hypot(cmd.dx, cmd.dy)
@@ -397,16 +414,16 @@ class ADBControlThread(threading.Thread):
         dur_ms = min(dur_ms, 200)
         
         # 执行滑动
-        self.adb._cmd(["shell", "input", "swipe", 
-                    str(start_x_px), str(start_y_px), 
-                    str(end_x_px), str(end_y_px), 
-                    str(dur_ms)])
+        k = self.coord_scale
+        self.adb.swipe((int(start_x_px * k), int(start_y_px * k)),
+                       (int(end_x_px * k), int(end_y_px * k)), dur_ms / 1000.0)
         
         # 调试输出
         if self.args.debug:
             print(f"\n[ADB] 目标距离: {cmd.dist:.1f}px, "
                 f"滑动距离: {swipe_distance:.1f}px, "
                 f"时长: {dur_ms}ms")
+        return True
     
     def get_last_command(self):
         """获取最后一次执行的命令（用于可视化）"""
@@ -447,6 +464,22 @@ def parse_args():
     ap.add_argument("--max-lock-dist", type=float, default=800.0, help="最大锁定距离（像素），超过此距离不锁定")
     ap.add_argument("--lock-switch-threshold", type=float, default=0.7, 
                    help="切换目标阈值：新目标距离必须小于当前目标的此比例才切换")
+    ap.add_argument("--input-mode", choices=["exec", "session"], default="exec",
+                   help="输入注入方式：exec=每次 fork adb；session=常驻 adb shell 会话")
+    ap.add_argument("--transport", choices=["exec", "socket"], default="exec",
+                   help="adb 通道：exec=每条命令启动 adb 进程；socket=直连 adb server（5037）线协议")
+    ap.add_argument("--screencap-mode", choices=["png", "raw", "auto"], default="png",
+                   help="截屏方式：png=screencap -p；raw=原始帧缓冲；auto=按实测耗时自动选择")
+    ap.add_argument("--capture", choices=["screencap", "stream"], default="screencap",
+                   help="取帧方式：screencap=轮询截屏；stream=screenrecord H.264 连续流")
+    ap.add_argument("--stream-decode-width", type=int, default=0,
+                   help="屏幕流解码宽度（0=设备原始分辨率；高度按比例）")
+    ap.add_argument("--stream-record-size", default=None, help="screenrecord --size，如 1280x576")
+    ap.add_argument("--stream-file", default=None, help="用本地 .h264 文件代替设备屏幕流（调试）")
+    ap.add_argument("--latency-json", default=None, help="退出时把各阶段延迟（截屏→检测→决策→注入）写入 JSON")
+    ap.add_argument("--source", default=None,
+                   help="帧源（覆盖 --capture）：adb[:png|raw|auto] / screenrecord / scrcpy / "
+                        "video:<mp4>[@fps] / dir:<目录>[@fps]；回放类帧源自动 dry-run")
     return ap.parse_args()
 
 
@@ -863,7 +896,8 @@ def main():
     print("=" * 70)
 
     # 初始化ADB客户端
-    adb = AdbClient(serial=args.serial)
+    adb = AdbClient(serial=args.serial, input_mode=args.input_mode, screencap_mode=args.screencap_mode,
+                    transport=args.transport)
 
     # 创建队列 - 减小队列大小避免延迟
     screenshot_queue = queue.Queue(maxsize=3)  # 截图到YOLO
@@ -876,17 +910,49 @@ def main():
     # 性能监控
     perf_monitor = PerformanceMonitor(window_size=30)
 
-    # 先获取一次屏幕分辨率
-    test_img = adb.screencap()
-    if test_img is None:
-        print("[错误] 无法获取屏幕分辨率")
+    # 取帧源：--source 优先，其次 --capture / --stream-file（接口同为 screencap()）
+    if args.source:
+        source_spec = args.source
+    elif args.stream_file:
+        source_spec = f"screenrecord:{args.stream_file}"
+    elif args.capture == "stream":
+        source_spec = "screenrecord" + (f":{args.stream_record_size}" if args.stream_record_size else "")
+    else:
+        source_spec = f"adb:{args.screencap_mode}"
+    kind = source_spec.split(":", 1)[0]
+    live = kind in ("adb", "screenrecord", "scrcpy") and not args.stream_file
+
+    # 实时帧源先获取一次屏幕分辨率（坐标缩放用）
+    test_img = None
+    if live:
+        test_img = adb.screencap()
+        if test_img is None:
+            print("[错误] 无法获取屏幕分辨率")
+            return
+        dev_h, dev_w = test_img.shape[:2]
+        print(f"[屏幕分辨率] {dev_w}x{dev_h}")
+
+    decode_size = None
+    if test_img is not None:
+        decode_size = (dev_w, dev_h)
+        if args.stream_decode_width > 0:
+            decode_size = (args.stream_decode_width, int(round(dev_h * args.stream_decode_width / dev_w)))
+    frame_source = open_source(source_spec, adb=adb, decode_size=decode_size).start()
+    if frame_source.finite and not args.dry_run:
+        print(f"[INFO] 回放帧源 {frame_source.name}，自动启用 --dry-run")
+        args.dry_run = True
+    first = frame_source.latest()
+    if first is None:
+        print(f"[错误] 帧源 {frame_source.name} 无画面")
+        frame_source.stop()
         return
-    img_h, img_w = test_img.shape[:2]
-    print(f"[屏幕分辨率] {img_w}x{img_h}")
+    img_h, img_w = first.image.shape[:2]
+    coord_scale = (dev_w / img_w) if test_img is not None else 1.0
+    print(f"[帧源] {frame_source.name} {img_w}x{img_h}，坐标缩放 {coord_scale:.3f}")
 
     # 创建并启动截图线程
     screenshot_thread = ScreenshotThread(
-        adb_client=adb,
+        frame_source=frame_source,
         output_queue=screenshot_queue,
         stop_event=stop_event,
         perf_monitor=perf_monitor
@@ -909,6 +975,8 @@ def main():
     yolo_thread.start()
 
     # 创建并启动ADB控制线程（传入屏幕分辨率）
+    latency = LatencyRecorder()
+    pending_trace = None  # 最新检测结果的 trace，尚未生成控制命令
     adb_thread = ADBControlThread(
         adb_client=adb,
         input_queue=control_queue,
@@ -916,7 +984,9 @@ def main():
         perf_monitor=perf_monitor,
         args=args,
         img_w=img_w,
-        img_h=img_h
+        img_h=img_h,
+        coord_scale=coord_scale,
+        latency=latency,
     )
     adb_thread.start()
 
@@ -972,6 +1042,9 @@ def main():
                         'center_y': result.center_y,
                     }
                     last_result = result  # 保存最新的结果用于显示
+                    # 上一帧没能生成命令：只记录到 detect 为止
+                    latency.add(pending_trace)
+                    pending_trace = result.trace
             except queue.Empty:
                 pass
 
@@ -1039,11 +1112,14 @@ def main():
                             target_id=locked_track_id,
                             target_name=locked_target['name']
                         )
+                        if pending_trace is not None:
+                            cmd.trace = pending_trace.mark("decide")
+                            pending_trace = None
                         
-                        # 清空旧命令，只保留最新的
+                        # 清空旧命令，只保留最新的（被丢弃的命令只记录到 decide）
                         try:
                             while not control_queue.empty():
-                                control_queue.get_nowait()
+                                latency.add(control_queue.get_nowait().trace)
                         except queue.Empty:
                             pass
                         
@@ -1278,6 +1354,7 @@ def main():
         
         # 等待线程结束
         screenshot_thread.join(timeout=2.0)
+        frame_source.stop()
         yolo_thread.join(timeout=2.0)
         adb_thread.join(timeout=2.0)
         
@@ -1299,7 +1376,13 @@ def main():
                 print(f"{metric}: {value:.1f}ms")
             elif '_fps' in metric:
                 print(f"{metric}: {value:.1f}fps")
+        print(adb.channel_stats())
+        print(latency.format_summary())
+        if args.latency_json:
+            latency.dump_json(args.latency_json)
+            print(f"[INFO] 延迟明细已写入 {args.latency_json}")
         print("=" * 70)
+        adb.close()
 
 
 if __name__ == "__main__":
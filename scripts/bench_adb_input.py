@@ -0,0 +1,80 @@
+"""
+输入注入基准：对比“每次 fork adb 进程”与“常驻 adb shell 会话”的吞吐和延迟。
+
+用法示例：
+  python -m scripts.bench_adb_input --serial <adb-serial> --count 50
+  python -m scripts.bench_adb_input --serial <adb-serial> --tap 0.5 0.05 --count 30   # 真实点击（选个安全位置）
+参数：
+  --noop       不下发 input，只执行 `true`，用于单独测量传输/进程开销（默认开启，--tap 时关闭）
+  --batch      额外测 session 批量模式（每批 N 条命令一次往返）
+输出：
+  每种模式的 actions/sec、p50、p99（毫秒）
+"""
+import argparse
+import statistics
+import subprocess
+import time
+from typing import Callable, Dict, List
+
+from war_drone.adb_client import AdbClient
+from war_drone.adb_shell import tap_cmd
+from war_drone.latency import percentile
+
+
+def _measure(fn: Callable[[], None], count: int, per_call_actions: int = 1) -> Dict[str, float]:
+    lat: List[float] = []
+    t_start = time.perf_counter()
+    for _ in range(count):
+        t0 = time.perf_counter()
+        fn()
+        lat.append((time.perf_counter() - t0) * 1000.0)
+    total = time.perf_counter() - t_start
+    return {
+        "actions_per_s": (count * per_call_actions) / total if total > 0 else 0.0,
+        "p50_ms": percentile(lat, 50),
+        "p99_ms": percentile(lat, 99),
+        "mean_ms": statistics.fmean(lat) if lat else 0.0,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--serial", default=None, help="adb 序列号")
+    ap.add_argument("--count", type=int, default=50, help="每种模式的调用次数")
+    ap.add_argument("--tap", type=float, nargs=2, default=None, metavar=("X", "Y"),
+                    help="真实点击的相对坐标（0~1），不给则只跑 noop")
+    ap.add_argument("--screen", type=int, nargs=2, default=(2670, 1200), metavar=("W", "H"))
+    ap.add_argument("--batch", type=int, default=6, help="批量模式每批命令数（0=不测）")
+    args = ap.parse_args()
+
+    if args.tap:
+        x, y = int(args.tap[0] * args.screen[0]), int(args.tap[1] * args.screen[1])
+        cmd = tap_cmd(x, y)
+    else:
+        cmd = "true"
+
+    exec_client = AdbClient(serial=args.serial, input_mode="exec")
+    sess_client = AdbClient(serial=args.serial, input_mode="session")
+    base = exec_client._base()
+
+    print(f"[INFO] 命令: {cmd!r}  次数: {args.count}")
+    results = {}
+    results["exec"] = _measure(lambda: subprocess.check_call(base + ["shell", cmd]), args.count)
+
+    sess_client.session.run("true")  # 预热：建立会话不计入
+    results["session"] = _measure(lambda: sess_client.session.run(cmd), args.count)
+
+    if args.batch > 0:
+        cmds = [cmd] * args.batch
+        results[f"session_batch{args.batch}"] = _measure(
+            lambda: sess_client.input_batch(cmds), max(1, args.count // args.batch), per_call_actions=args.batch
+        )
+    sess_client.close()
+
+    print(f"{'mode':18s} {'act/s':>8s} {'p50(ms)':>9s} {'p99(ms)':>9s} {'mean(ms)':>9s}")
+    for name, r in results.items():
+        print(f"{name:18s} {r['actions_per_s']:8.1f} {r['p50_ms']:9.1f} {r['p99_ms']:9.1f} {r['mean_ms']:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
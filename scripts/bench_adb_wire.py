@@ -0,0 +1,73 @@
+"""
+adb 通道基准：对比“每条命令启动 adb 进程”（exec）与“直连 adb server 线协议”（socket）在截屏 / 点击热路径上的耗时。
+
+用法示例：
+  python -m scripts.bench_adb_wire --serial <adb-serial> --count 30                 # 真机（点击默认 noop）
+  python -m scripts.bench_adb_wire --fake --count 200                                # 本地假 adb server，不需要手机
+参数：
+  --tap X Y    真实点击的相对坐标（0~1），不给则用 `true` 代替 input tap
+  --fake       启动 war_drone.adb_fake.FakeAdbServer；exec 通道用 `adb -P <port>` 连它（需 PATH 中有 adb，否则跳过）
+输出：
+  每个 操作/通道 的 ops/s、p50、p99、mean（毫秒）
+"""
+import argparse
+import shutil
+
+from scripts.bench_adb_input import _measure
+from war_drone.adb_client import AdbClient
+from war_drone.adb_shell import tap_cmd
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--serial", default=None, help="adb 序列号")
+    ap.add_argument("--count", type=int, default=30, help="每项调用次数")
+    ap.add_argument("--tap", type=float, nargs=2, default=None, metavar=("X", "Y"))
+    ap.add_argument("--screen", type=int, nargs=2, default=(2670, 1200), metavar=("W", "H"))
+    ap.add_argument("--fake", action="store_true", help="使用本地假 adb server")
+    ap.add_argument("--fake-screen", type=int, nargs=2, default=(2670, 1200), metavar=("W", "H"))
+    args = ap.parse_args()
+
+    fake = None
+    port = 5037
+    serial = args.serial
+    if args.fake:
+        from war_drone.adb_fake import FakeAdbServer
+        fake = FakeAdbServer(screen=args.fake_screen).start()
+        port, serial = fake.port, fake.serials[0]
+        print(f"[INFO] 假 adb server 127.0.0.1:{port} 屏幕 {args.fake_screen[0]}x{args.fake_screen[1]}")
+
+    if args.tap:
+        cmd = tap_cmd(int(args.tap[0] * args.screen[0]), int(args.tap[1] * args.screen[1]))
+    else:
+        cmd = "true"
+
+    clients = {}
+    exec_client = AdbClient(serial=serial, transport="exec", adb_port=port)
+    if fake is not None and not shutil.which(exec_client.adb):
+        print("[WARN] 找不到 adb 可执行文件，跳过 exec 通道")
+    else:
+        clients["exec"] = exec_client
+    clients["socket"] = AdbClient(serial=serial, transport="socket", adb_port=port)
+
+    results = {}
+    try:
+        for name, c in clients.items():
+            c._cmd(["shell", "true"])  # 预热（socket 通道顺带建好连接池）
+            results[f"screencap_raw/{name}"] = _measure(lambda c=c: c.screencap_raw(), args.count)
+            results[f"screencap_png/{name}"] = _measure(
+                lambda c=c: c._cmd(["exec-out", "screencap", "-p"], capture_output=True), args.count)
+            results[f"tap/{name}"] = _measure(lambda c=c: c._cmd(["shell", cmd]), args.count)
+    finally:
+        for c in clients.values():
+            c.close()
+        if fake is not None:
+            fake.stop()
+
+    print(f"{'op/transport':22s} {'ops/s':>8s} {'p50(ms)':>9s} {'p99(ms)':>9s} {'mean(ms)':>9s}")
+    for name, r in results.items():
+        print(f"{name:22s} {r['actions_per_s']:8.1f} {r['p50_ms']:9.1f} {r['p99_ms']:9.1f} {r['mean_ms']:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+TemplateStateDetector.predict 基准：在同一批帧上对比不同模式的单帧耗时。
+
+用法示例：
+  python -m scripts.bench_detector                                   # 默认回放 tests/dataset
+  python -m scripts.bench_detector --source dir:captures --repeat 5
+  python -m scripts.bench_detector --source adb:raw --frames 30      # 真机截 30 帧后离线跑
+模式（--modes，逗号分隔）：
+  reload   每次 predict 前重新读盘全部模板（模拟模板库之前的行为），全分辨率匹配
+  bank     模板库预加载，全分辨率匹配（空间域 matchTemplate）
+  fft      bank + 按模板尺寸自动选空间域 / 频域互相关（match_backend=auto）
+  pyramid  模板库 + 按配置 pyramid_levels 由粗到细匹配
+  local    pyramid + 上次匹配位置附近的局部搜索（按配置 local_search_pad，默认行为）
+  fsm      local + 以上一帧结果为 prev_state 的转移先验排序与提前结束（按配置 state_fsm）
+输出：
+  每个模式的 帧/秒、p50、p99、mean（毫秒），以及与第一个模式相比的加速比；
+  local / fsm 模式额外打印局部命中率与估算节省的耗时，fsm 模式打印平均每帧评估的状态数
+"""
+import argparse
+import itertools
+import time
+
+from scripts.bench_adb_input import _measure
+from war_drone.frames import open_source
+from war_drone.state_detector import TemplateStateDetector
+
+
+def _collect_frames(spec: str, limit: int, adb=None):
+    src = open_source(spec, adb=adb).start()
+    frames = []
+    try:
+        while limit <= 0 or len(frames) < limit:
+            pkt = src.next()
+            if pkt is None:
+                if src.exhausted:
+                    break
+                time.sleep(0.01)
+                continue
+            frames.append(pkt.image)
+    finally:
+        src.stop()
+    return frames
+
+
+def _mode_reload(det):
+    def run(img):
+        det.bank.invalidate()
+        det.predict(img_bgr=img)
+    return run
+
+
+def _mode_bank(det):
+    return lambda img: det.predict(img_bgr=img)
+
+
+def _mode_fsm(det):
+    prev = ["unknown"]
+
+    def run(img):
+        r = det.predict(img_bgr=img, prev_state=prev[0])
+        if r.name != "unknown":
+            prev[0] = r.name
+    return run
+
+
+# 模式名 -> (TemplateStateDetector 额外参数, 单帧调用构造器)
+MODES = {
+    "reload": ({"pyramid_levels": 0, "local_search_pad": 0, "match_backend": "spatial"}, _mode_reload),
+    "bank": ({"pyramid_levels": 0, "local_search_pad": 0, "match_backend": "spatial"}, _mode_bank),
+    "fft": ({"pyramid_levels": 0, "local_search_pad": 0, "match_backend": "auto"}, _mode_bank),
+    "pyramid": ({"local_search_pad": 0}, _mode_bank),
+    "local": ({}, _mode_bank),
+    "fsm": ({}, _mode_fsm),
+}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--source", default="dir:tests/dataset", help="帧源（见 war_drone.frames.open_source）")
+    ap.add_argument("--frames", type=int, default=0, help="最多读入多少帧（0=读完回放源）")
+    ap.add_argument("--repeat", type=int, default=3, help="每个模式遍历帧的轮数")
+    ap.add_argument("--modes", default=",".join(MODES), help=f"逗号分隔：{'/'.join(MODES)}")
+    ap.add_argument("--cfg", default="configs/config.json5")
+    ap.add_argument("--templates", default="templates")
+    ap.add_argument("--template-cache", default=None, help="模板库 .npz 缓存路径")
+    ap.add_argument("--serial", default=None, help="adb 帧源使用的序列号")
+    args = ap.parse_args()
+
+    adb = None
+    if args.source.startswith("adb"):
+        from war_drone.adb_client import AdbClient
+        adb = AdbClient(serial=args.serial)
+    frames = _collect_frames(args.source, args.frames, adb=adb)
+    if not frames:
+        print(f"[WARN] 帧源 {args.source} 没有读到帧")
+        return
+    print(f"[INFO] 读入 {len(frames)} 帧，每个模式 {args.repeat} 轮")
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    unknown = [m for m in modes if m not in MODES]
+    if unknown:
+        ap.error(f"未知模式: {unknown}")
+
+    results = {}
+    for name in modes:
+        t0 = time.perf_counter()
+        det_kwargs, factory = MODES[name]
+        det = TemplateStateDetector(cfg_path=args.cfg, templates_dir=args.templates, frame_change=False,
+                                    template_cache=args.template_cache, **det_kwargs)
+        init_ms = (time.perf_counter() - t0) * 1000.0
+        run = factory(det)
+        run(frames[0])  # 预热
+        it = itertools.cycle(frames)
+        r = _measure(lambda: run(next(it)), len(frames) * args.repeat)
+        r["init_ms"] = init_ms
+        r["local"] = det.local_search_stats() if det.local_search_pad > 0 else None
+        r["fsm"] = det.fsm_stats() if name == "fsm" else None
+        if name == "fft":
+            for b in det.backend_report:
+                print(f"[INFO] fft: {b['template']:24s} {b['kind']:5s} ROI {b['roi'][1]}x{b['roi'][0]} -> {b['backend']:7s} "
+                      f"(spatial {b['spatial_ms']:.2f}ms / fft {b['fft_ms']:.2f}ms)")
+        results[name] = r
+
+    base = results[modes[0]]["mean_ms"]
+    print(f"{'mode':10s} {'fps':>8s} {'p50(ms)':>9s} {'p99(ms)':>9s} {'mean(ms)':>9s} {'init(ms)':>9s} {'speedup':>8s}")
+    for name, r in results.items():
+        speed = base / r["mean_ms"] if r["mean_ms"] > 0 else 0.0
+        print(f"{name:10s} {r['actions_per_s']:8.1f} {r['p50_ms']:9.1f} {r['p99_ms']:9.1f} "
+              f"{r['mean_ms']:9.1f} {r['init_ms']:9.1f} {speed:7.2f}x")
+    for name, r in results.items():
+        st = r["local"]
+        if st:
+            print(f"[INFO] {name}: 局部搜索命中 {st['hits']}/{st['hits'] + st['misses']} ({st['hit_ratio']:.0%})，"
+                  f"估算节省 {st['saved_ms']:.1f}ms")
+        fs = r["fsm"]
+        if fs:
+            print(f"[INFO] {name}: 平均每帧评估 {fs['mean_evaluated']:.2f}/{fs['states']} 个状态")
+
+
+if __name__ == "__main__":
+    main()
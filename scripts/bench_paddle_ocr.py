@@ -0,0 +1,146 @@
+"""
+PaddleStateDetector.predict 基准：在同一批帧上对比不同 OCR 模式的单帧耗时与识别结果。
+
+用法示例：
+  python -m scripts.bench_paddle_ocr --cpu                               # 默认回放 tests/dataset
+  python -m scripts.bench_paddle_ocr --source dir:captures --modes per_roi,batched --repeat 2
+模式（--modes，逗号分隔）：
+  per_roi  每个 ROI 一次 ocr(det+rec)（同帧同一 ROI 只识别一次）
+  batched  逐 ROI 文本检测，全部文本行一次送入识别器
+  full_frame  缩小整帧检测一次，文本框按重叠分给 ROI，只识别被分到的框
+  auto     按本帧要识别的 ROI 数在 batched / full_frame 间切换（full_frame.min_rois）
+  各模式都按配置 roi_modes 对 rec_only ROI 跳过检测
+参数：
+  --lean     每个模式另跑一遍 lean 判定（上一帧结果作 prev_state，领先者无法被追平即停止），
+             对比耗时、每帧评估的状态数与判定一致率
+  --per-roi  另对每个 ROI 对比 det+rec 与 rec_only（跳过检测直接识别）：耗时、文本一致率、
+             规则判定一致率、按 rec_only_min_conf 会回落 det+rec 的比例（用来决定 roi_modes）
+输出：
+  每个模式的 帧/秒、p50、p99、mean（毫秒）、每帧识别的 ROI 数、与第一个模式状态一致的比例；
+  batched 另打印 det / cls / rec 各阶段每帧耗时
+"""
+import argparse
+import os
+import statistics
+import time
+from collections import defaultdict
+
+from scripts.bench_detector import _collect_frames
+from war_drone.latency import percentile
+
+
+def _run_mode(det, mode: str, frames, repeat: int, lean: bool = False):
+    det.ocr_mode = mode
+    det.lean = lean
+    det.predict(frames[0])  # 预热
+    det.reset_ocr_stats()
+    lat, states = [], []
+    prev = None
+    for _ in range(repeat):
+        for img in frames:
+            t0 = time.perf_counter()
+            state, _ = det.predict(img, prev_state=prev)
+            lat.append((time.perf_counter() - t0) * 1000.0)
+            states.append(state)
+            prev = state
+    return {"lat": lat, "states": states, "ocr": det.ocr_stats(), "times": dict(det.ocr_times),
+            "strategies": dict(det.strategy_counts)}
+
+
+def _per_roi_report(det, frames):
+    """逐 ROI：det+rec 与 rec_only 的耗时 / 文本一致 / 规则判定一致 / 回落比例。"""
+    from war_drone import ocr_batch
+    from war_drone.frame import as_frame
+    from war_drone.paddle_state_detector import _norm_text, crop_rel
+
+    rules = defaultdict(list)
+    for st in det.states:
+        for rule in st.get("ocr", []):
+            rules[rule["roi"]].append(rule)
+    rows = {k: defaultdict(float) for k in rules}
+    for img in frames:
+        bgr = as_frame(img).bgr
+        for key, rs in rules.items():
+            r = rows[key]
+            t0 = time.perf_counter()
+            full = det._texts_in_roi(bgr, key)
+            t1 = time.perf_counter()
+            txt, conf = ocr_batch.recognize_tiles(det.ocr_reader, {key: crop_rel(bgr, det.rois[key], det.WH)})[key]
+            t2 = time.perf_counter()
+            full_norm = [(_norm_text(t), c) for t, c in full]
+            rec_norm = [(_norm_text(txt), conf)] if txt else []
+            r["n"] += 1
+            r["det_rec_ms"] += (t1 - t0) * 1000.0
+            r["rec_only_ms"] += (t2 - t1) * 1000.0
+            r["text_agree"] += "".join(t for t, _ in full_norm) == (rec_norm[0][0] if rec_norm else "")
+            r["rule_agree"] += all(det._eval_rule(full_norm, rule) == det._eval_rule(rec_norm, rule) for rule in rs)
+            r["fallback"] += not txt or conf < det.rec_only_min_conf
+    print(f"{'roi':26s} {'det+rec(ms)':>11s} {'rec_only(ms)':>12s} {'text':>6s} {'rule':>6s} {'fallback':>9s}")
+    for key, r in rows.items():
+        n = max(1.0, r["n"])
+        print(f"{key:26s} {r['det_rec_ms'] / n:11.1f} {r['rec_only_ms'] / n:12.1f} {r['text_agree'] / n:6.0%} "
+              f"{r['rule_agree'] / n:6.0%} {r['fallback'] / n:9.0%}")
+
+
+MODES = ("per_roi", "batched", "full_frame", "auto")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--source", default="dir:tests/dataset", help="帧源（见 war_drone.frames.open_source）")
+    ap.add_argument("--frames", type=int, default=0, help="最多读入多少帧（0=读完回放源）")
+    ap.add_argument("--repeat", type=int, default=1, help="每个模式遍历帧的轮数")
+    ap.add_argument("--modes", default=",".join(MODES), help=f"逗号分隔：{'/'.join(MODES)}")
+    ap.add_argument("--cfg", default="configs/ocr_states_fsm.json5")
+    ap.add_argument("--cpu", action="store_true", help="屏蔽 GPU，只测 CPU")
+    ap.add_argument("--lean", action="store_true", help="每个模式另跑 lean 判定并对比")
+    ap.add_argument("--per-roi", action="store_true", help="另打印逐 ROI 的 det+rec / rec_only 对比")
+    ap.add_argument("--model-root", default=None)
+    ap.add_argument("--det-dir", default=None)
+    ap.add_argument("--rec-dir", default=None)
+    ap.add_argument("--cls-dir", default=None)
+    args = ap.parse_args()
+
+    if args.cpu:
+        os.environ["CUDA_VISIBLE_DEVICES"] = ""  # 须在 import paddle 之前
+    from war_drone.paddle_state_detector import OCR_MODES, PaddleStateDetector
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    unknown = [m for m in modes if m not in OCR_MODES]
+    if unknown:
+        ap.error(f"未知模式: {unknown}")
+    frames = _collect_frames(args.source, args.frames)
+    if not frames:
+        print(f"[WARN] 帧源 {args.source} 没有读到帧")
+        return
+    print(f"[INFO] 读入 {len(frames)} 帧，每个模式 {args.repeat} 轮")
+
+    det = PaddleStateDetector(args.cfg, det_dir=args.det_dir, rec_dir=args.rec_dir, cls_dir=args.cls_dir,
+                              model_root=args.model_root, frame_change=False)
+    results = {m: _run_mode(det, m, frames, args.repeat) for m in modes}
+    if args.lean:
+        results.update({f"{m}+lean": _run_mode(det, m, frames, args.repeat, lean=True) for m in modes})
+
+    ref = results[modes[0]]["states"]
+    base = statistics.fmean(results[modes[0]]["lat"])
+    print(f"{'mode':15s} {'fps':>7s} {'p50(ms)':>9s} {'p99(ms)':>9s} {'mean(ms)':>9s} {'ROI/帧':>7s} "
+          f"{'agree':>6s} {'speedup':>8s}")
+    for name, r in results.items():
+        mean = statistics.fmean(r["lat"])
+        agree = sum(a == b for a, b in zip(r["states"], ref)) / len(ref)
+        print(f"{name:15s} {1000.0 / mean:7.2f} {percentile(r['lat'], 50):9.1f} {percentile(r['lat'], 99):9.1f} "
+              f"{mean:9.1f} {r['ocr']['calls_per_frame']:7.1f} {agree:6.0%} {base / mean:7.2f}x")
+    for name, r in results.items():
+        if r["times"]:
+            frames_n = max(1, r["ocr"]["frames"])
+            print(f"[INFO] {name}: " + " ".join(f"{k}={v / frames_n:.1f}ms/帧" for k, v in r["times"].items()))
+        if name.endswith("+lean"):
+            print(f"[INFO] {name}: 每帧评估 {r['ocr']['evaluated_per_frame']:.1f}/{r['ocr']['states']} 个状态")
+        if name.startswith("auto"):
+            print(f"[INFO] auto: " + " ".join(f"{k}={v}" for k, v in r["strategies"].items()))
+    if args.per_roi:
+        _per_roi_report(det, frames)
+
+
+if __name__ == "__main__":
+    main()
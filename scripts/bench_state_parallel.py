@@ -0,0 +1,91 @@
+"""
+并发状态评估基准：状态数（基础 + extra_states 复制 K 份）× 线程数 的 predict 耗时表。
+
+用法示例：
+  python -m scripts.bench_state_parallel                          # 默认 tests/dataset，workers=1,2,4，复制 0,2,4 份
+  python -m scripts.bench_state_parallel --workers 1,2,4,8 --copies 0,4,8 --repeat 2
+说明：
+  复制的状态与原状态参数完全相同（名字加 #k 后缀），只用于放大每帧的状态数量；
+  workers=1 为串行路径；并发时 OpenCV 线程数按 CPU 数 / workers 自动下调（--cv-threads 可覆盖）。
+输出：
+  每行一个状态数，列为各 workers 的平均单帧耗时（毫秒）与相对 workers=1 的加速比
+"""
+import argparse
+import itertools
+import os
+
+import cv2
+
+from scripts.bench_adb_input import _measure
+from scripts.bench_detector import _collect_frames
+from war_drone.state_detector import TemplateStateDetector
+
+
+def _clone_states(det: TemplateStateDetector, copies: int):
+    """把每个扩展状态复制 copies 份，加到 state_order 末尾。"""
+    extras = [s["name"] for s in det.extra_states_cfg]
+    per_state = (det.anchor_keys, det.templates, det.template_opts, det.roi_half_size_per_state,
+                 det.roi_offset_pct, det.use_edges_per_state, det.gray_per_state, det.combine_mode,
+                 det.pyramid_levels)
+    for k in range(1, copies + 1):
+        for name in extras:
+            clone = f"{name}#{k}"
+            for table in per_state:
+                if name in table:
+                    table[clone] = table[name]
+            det.state_order.append(clone)
+
+
+def _ints(text: str):
+    return [int(x) for x in text.split(",") if x.strip()]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--source", default="dir:tests/dataset", help="帧源（见 war_drone.frames.open_source）")
+    ap.add_argument("--frames", type=int, default=0, help="最多读入多少帧（0=读完回放源）")
+    ap.add_argument("--repeat", type=int, default=1, help="每个组合遍历帧的轮数")
+    ap.add_argument("--workers", default="1,2,4", help="逗号分隔的线程数")
+    ap.add_argument("--copies", default="0,2,4", help="逗号分隔：extra_states 额外复制几份")
+    ap.add_argument("--cv-threads", type=int, default=None, help="并发时 OpenCV 线程数（缺省自动，<0 不干预）")
+    ap.add_argument("--cfg", default="configs/config.json5")
+    ap.add_argument("--templates", default="templates")
+    args = ap.parse_args()
+
+    frames = _collect_frames(args.source, args.frames)
+    if not frames:
+        print(f"[WARN] 帧源 {args.source} 没有读到帧")
+        return
+    workers_list, copies_list = _ints(args.workers), _ints(args.copies)
+    print(f"[INFO] 读入 {len(frames)} 帧；CPU {os.cpu_count()}；OpenCV 线程 {cv2.getNumThreads()}")
+
+    default_cv_threads = cv2.getNumThreads()
+    rows = []
+    for copies in copies_list:
+        row = {}
+        for w in workers_list:
+            cv2.setNumThreads(default_cv_threads)  # 每个组合从同一起点开始
+            det = TemplateStateDetector(cfg_path=args.cfg, templates_dir=args.templates, frame_change=False,
+                                        workers=w, cv_threads=args.cv_threads)
+            _clone_states(det, copies)
+            det.predict(img_bgr=frames[0])  # 预热
+            it = itertools.cycle(frames)
+            r = _measure(lambda: det.predict(img_bgr=next(it)), len(frames) * args.repeat)
+            row[w] = (r["mean_ms"], cv2.getNumThreads())
+            det.close()
+        rows.append((len(det.state_order), row))
+    cv2.setNumThreads(default_cv_threads)
+
+    header = f"{'states':>6s} " + " ".join(f"{f'w={w}':>18s}" for w in workers_list)
+    print(header)
+    for n_states, row in rows:
+        base = row[workers_list[0]][0]
+        cells = []
+        for w in workers_list:
+            ms, cvt = row[w]
+            cells.append(f"{ms:7.1f}ms {base / ms if ms > 0 else 0:4.2f}x cv{cvt:<2d}")
+        print(f"{n_states:6d} " + " ".join(f"{c:>18s}" for c in cells))
+
+
+if __name__ == "__main__":
+    main()
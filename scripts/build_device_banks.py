@@ -0,0 +1,50 @@
+"""
+预生成设备分辨率档案的模板库缓存：多机型混跑前先把各分辨率的缩放模板写成 .npz，启动时直接命中。
+
+用法示例：
+  python -m scripts.build_device_banks --sizes 2400x1080,1920x1080
+  python -m scripts.build_device_banks --serial emulator-5554 --serial 192.168.1.20:5555
+说明：
+  分辨率与配置 screen 相同的设备不需要缩放，跳过；缓存目录缺省取配置 template_cache_dir
+"""
+import argparse
+
+from war_drone.adb_client import AdbClient
+from war_drone.state_detector import TemplateStateDetector
+
+
+def _parse_size(s: str):
+    w, h = s.lower().split("x")
+    return int(w), int(h)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="", help="逗号分隔的分辨率，如 2400x1080,1920x1080")
+    ap.add_argument("--serial", action="append", default=[], help="从已连接设备读取 wm size（可多次）")
+    ap.add_argument("--cfg", default="configs/config.json5")
+    ap.add_argument("--templates", default="templates")
+    ap.add_argument("--cache", default=None, help="缓存目录或 .npz 路径；缺省用配置 template_cache_dir")
+    args = ap.parse_args()
+
+    sizes = [_parse_size(s) for s in args.sizes.split(",") if s.strip()]
+    for serial in args.serial:
+        try:
+            sizes.append(AdbClient(serial=serial).screen_size())
+        except Exception as e:
+            print(f"[WARN] {serial} 读取分辨率失败: {e}")
+    if not sizes:
+        ap.error("需要 --sizes 或 --serial")
+
+    for size in dict.fromkeys(sizes):
+        det = TemplateStateDetector(cfg_path=args.cfg, templates_dir=args.templates, screen_size=size,
+                                    template_cache=args.cache, frame_change=False, match_backend="spatial")
+        if det.profile is None:
+            print(f"[INFO] {size[0]}x{size[1]} 与配置分辨率一致，无需缩放")
+            continue
+        print(f"[OK] {det.profile.describe()}: {len(det.bank)} 个模板 → {det.bank.cache_path}"
+              f"（读盘 {det.bank.loads}，命中缓存 {det.bank.cache_hits}）")
+
+
+if __name__ == "__main__":
+    main()
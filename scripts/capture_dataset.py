@@ -22,17 +22,31 @@ def main():
     ap.add_argument("--state", required=True, help="任意状态名，例如 list / prebattle / combat / settlement / negatives / splash / upgrade ...")
     ap.add_argument("--serial", default=None)
     ap.add_argument("--count", type=int, default=5)
+    ap.add_argument("--source", default=None, help="帧源，如 video:logs/combat_xxx.mp4@2（默认 adb 截屏）")
     args = ap.parse_args()
 
+    src = None
+    if args.source:
+        from war_drone.adb_client import AdbClient
+        from war_drone.frames import open_source
+        src = open_source(args.source, adb=AdbClient(serial=args.serial)).start()
+
     out_dir = os.path.join("tests","dataset", args.state)
     os.makedirs(out_dir, exist_ok=True)
     for i in range(args.count):
-        img = screencap_bgr(args.serial)
+        img = src.screencap() if src else screencap_bgr(args.serial)
+        if img is None:
+            if src is not None and src.exhausted:
+                break
+            continue
         ts = time.strftime("%Y%m%d_%H%M%S")
         path = os.path.join(out_dir, f"{args.state}_{ts}_{i:02d}.jpg")
         cv2.imwrite(path, img)
         print("saved:", path)
-        time.sleep(0.8)
+        if src is None or not src.finite:
+            time.sleep(0.8)
+    if src is not None:
+        src.stop()
 
 if __name__ == "__main__":
     main()
@@ -7,7 +7,7 @@
 用法示例（在已安装 paddleocr 的 venv 内）：
   python -m scripts.paddle_runner --serial <adb-serial> --cfg configs/ocr_states_fsm.json5 --det-dir ... --rec-dir ... --cls-dir ...
 参数：
-  --interval   状态轮询间隔（秒，默认 1.5）
+  --interval   状态轮询间隔（秒，默认 1.5；回放帧源按自身 @fps 节流，不用此值）
   --dry-run    仅打印状态，不发送点击
   --combat-macro  combat 状态播放的录制文件（JSON）
 """
@@ -28,6 +28,24 @@ import cv2
 
 from war_drone.adb_client import AdbClient
 from war_drone.paddle_state_detector import PaddleStateDetector
+from war_drone.frames import ScreenrecordSource, open_source
+from war_drone.latency import LatencyRecorder
+
+
+# 映射：状态 -> 相对坐标
+ACTION_MAP = {
+    "main_menu": (0.868165, 0.866667),
+    "ready": (0.868165, 0.866667),
+    "settlement": (0.150936, 0.85),
+    "weapon": (0.098127, 0.543333),
+    "free_gift": (0.315356, 0.781667),
+    "mission_hard": (0.325468, 0.618333),
+    "piggy_full": (0.819101, 0.188333),
+    "bankrupt_sale": (0.261, 0.798333),
+    "major_news": (0.404, 0.638333),
+    "vip_ad": (0.820225, 0.111667),
+    "ad_other": (0.95, 0.08),
+}
 
 
 def _pct_to_px(p: Tuple[float, float], wh: Tuple[int, int]) -> Tuple[int, int]:
@@ -54,6 +72,32 @@ class MacroEvent:
     duration: float = 0.3
 
 
+def load_macro_events(filepath: str) -> List[MacroEvent]:
+    """读取录制宏 JSON（record_macro*.py 产出）为事件列表"""
+    with open(filepath, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    events = []
+    for ev in data.get("events", []):
+        event = MacroEvent(
+            type=ev.get("type", "tap"),
+            dt=float(ev.get("dt", 0.0))
+        )
+        if event.type == "tap":
+            pos = ev.get("pos")
+            if pos and len(pos) == 2:
+                event.pos = (float(pos[0]), float(pos[1]))
+        elif event.type == "swipe":
+            start = ev.get("start")
+            end = ev.get("end")
+            if start and len(start) == 2 and end and len(end) == 2:
+                event.start = (float(start[0]), float(start[1]))
+                event.end = (float(end[0]), float(end[1]))
+                event.duration = float(ev.get("duration", 0.3))
+        events.append(event)
+    return events
+
+
 class MacroController:
     """线程安全的宏控制器"""
     
@@ -78,29 +122,7 @@ class MacroController:
     def load_macro(self, filepath: str) -> bool:
         """加载宏文件"""
         try:
-            with open(filepath, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            
-            events_data = data.get("events", [])
-            events = []
-            for ev in events_data:
-                event = MacroEvent(
-                    type=ev.get("type", "tap"),
-                    dt=float(ev.get("dt", 0.0))
-                )
-                if event.type == "tap":
-                    pos = ev.get("pos")
-                    if pos and len(pos) == 2:
-                        event.pos = (float(pos[0]), float(pos[1]))
-                elif event.type == "swipe":
-                    start = ev.get("start")
-                    end = ev.get("end")
-                    if start and len(start) == 2 and end and len(end) == 2:
-                        event.start = (float(start[0]), float(start[1]))
-                        event.end = (float(end[0]), float(end[1]))
-                        event.duration = float(ev.get("duration", 0.3))
-                events.append(event)
-            
+            events = load_macro_events(filepath)
             with self._lock:
                 self._events = events
             print(f"[INFO] loaded combat macro {filepath}, events={len(events)}")
@@ -340,17 +362,11 @@ class CombatVideoRecorder:
         self._remote_path: Optional[str] = None
 
     def _adb_base(self) -> List[str]:
-        base = [self.adb.adb]
-        if self.adb.serial:
-            base += ["-s", self.adb.serial]
-        return base
+        return self.adb._base()
 
     def _run(self, args: List[str], capture_output: bool = False, timeout: Optional[float] = None):
-        cmd = self._adb_base() + args
-        if capture_output:
-            return subprocess.check_output(cmd, timeout=timeout)
-        subprocess.check_call(cmd, timeout=timeout)
-        return None
+        # 走 AdbClient：--transport socket 时 mkdir/pull/rm 不再启动 adb 进程
+        return self.adb._cmd(args, capture_output=capture_output, timeout=timeout)
 
     def _build_paths(self) -> Tuple[str, str]:
         stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -515,6 +531,22 @@ class CombatVideoRecorder:
                     print(f"[INFO] combat 倒放已保存: {reverse_path}")
 
 
+def _frame_change_cfg(args, cfg):
+    """命令行覆盖配置中的 frame_change 段；返回 False 表示关闭。"""
+    if args.frame_change == "off":
+        return False
+    fc = dict(cfg.get("frame_change") or {})
+    if args.frame_change:
+        if args.frame_change != fc.get("method"):
+            fc.pop("thresh", None)  # 换方法时阈值量纲不同，回到该方法默认值
+        fc.update(enabled=True, method=args.frame_change)
+    if args.frame_change_thresh is not None:
+        fc["thresh"] = args.frame_change_thresh
+    if args.frame_change_max_skip is not None:
+        fc["max_skip"] = args.frame_change_max_skip
+    return fc or False
+
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--serial", default=None, help="adb 序列号")
@@ -541,6 +573,26 @@ def main():
     ap.add_argument("--record-video-overlay", action="store_true", help="在录像中叠加状态/得分等调试信息")
     ap.add_argument("--record-video-reverse", action="store_true", help="额外生成一个本地倒放视频")
     ap.add_argument("--quiet", action="store_true", help="减少日志输出（压低 paddleocr 日志）")
+    ap.add_argument("--input-mode", choices=["exec", "session"], default="exec",
+                    help="输入注入方式：exec=每次 fork adb；session=常驻 adb shell 会话")
+    ap.add_argument("--transport", choices=["exec", "socket"], default="exec",
+                    help="adb 通道：exec=每条命令启动 adb 进程；socket=直连 adb server（5037）线协议")
+    ap.add_argument("--screencap-mode", choices=["png", "raw", "auto"], default="png",
+                    help="截屏方式：png=screencap -p；raw=原始帧缓冲；auto=按实测耗时自动选择")
+    ap.add_argument("--capture", choices=["screencap", "stream"], default="screencap",
+                    help="取帧方式：screencap=轮询截屏；stream=screenrecord H.264 连续流（解码到配置分辨率）")
+    ap.add_argument("--stream-record-size", default=None, help="screenrecord --size，如 1280x576（手机端编码尺寸）")
+    ap.add_argument("--source", default=None,
+                    help="帧源（覆盖 --capture/--screencap-mode）：adb[:png|raw|auto] / screenrecord / scrcpy / "
+                         "video:<mp4>[@fps] / dir:<目录>[@fps]；回放类帧源自动 dry-run，结束时打印吞吐")
+    ap.add_argument("--frame-change", choices=["off", "mad", "dhash"], default=None,
+                    help="画面未变化时复用上次识别结果：off=关闭；mad/dhash=检测方法；缺省读配置 frame_change 段")
+    ap.add_argument("--frame-change-thresh", type=float, default=None,
+                    help="变化阈值：mad 为分格灰度平均差的最大值（0~255），dhash 为汉明距离")
+    ap.add_argument("--frame-change-max-skip", type=int, default=None, help="连续复用上限，到达后强制重算（0=不限）")
+    ap.add_argument("--lean", action="store_true",
+                    help="lean 判定：按上一状态的后继优先评估、领先者无法被追平即停止，不构造调试信息（缺省读配置 lean）")
+    ap.add_argument("--latency-json", default=None, help="退出时把各阶段延迟（截屏→识别→决策→点击）写入 JSON")
     args = ap.parse_args()
 
     # 配置日志
@@ -556,9 +608,28 @@ def main():
     W, H = cfg["screen"]["width"], cfg["screen"]["height"]
 
     # 初始化组件
-    det = PaddleStateDetector(args.cfg, det_dir=args.det_dir, rec_dir=args.rec_dir, cls_dir=args.cls_dir)
-    adb = AdbClient(serial=args.serial)
+    det = PaddleStateDetector(args.cfg, det_dir=args.det_dir, rec_dir=args.rec_dir, cls_dir=args.cls_dir,
+                              frame_change=_frame_change_cfg(args, cfg), lean=True if args.lean else None)
+    adb = AdbClient(serial=args.serial, input_mode=args.input_mode, screencap_mode=args.screencap_mode,
+                    transport=args.transport)
     
+    # 取帧源（war_drone.frames），screencap() 与 adb.screencap() 同接口
+    if args.source:
+        source_spec = args.source
+    elif args.capture == "stream":
+        source_spec = "screenrecord" + (f":{args.stream_record_size}" if args.stream_record_size else "")
+    else:
+        source_spec = f"adb:{args.screencap_mode}"
+    # OCR ROI 按配置分辨率裁剪，因此屏幕流解码到配置尺寸
+    frame_source = open_source(source_spec, adb=adb, decode_size=(W, H)).start()
+    if frame_source.finite and not args.dry_run:
+        print(f"[INFO] 回放帧源 {frame_source.name}，自动启用 --dry-run")
+        args.dry_run = True
+    # 回放帧源由自身的 @fps 节流（fps=0 尽快输出，测吞吐），不再按 --interval 轮询
+    poll_s = 0.0 if frame_source.finite else args.interval
+    if isinstance(frame_source, ScreenrecordSource) and args.record_combat_video:
+        print("[WARN] 屏幕流与 combat 录像都使用 screenrecord，部分机型同时只允许一路编码")
+
     # 初始化宏控制器
     macro_ctrl = MacroController(adb, (W, H))
 
@@ -581,20 +652,7 @@ def main():
         if macro_ctrl.load_macro(args.combat_macro):
             macro_ctrl.configure(args.combat_macro_loops, args.macro_sleep_scale)
 
-    # 映射：状态 -> 相对坐标
-    action_map = {
-        "main_menu": (0.868165, 0.866667),
-        "ready": (0.868165, 0.866667),
-        "settlement": (0.150936, 0.85),
-        "weapon": (0.098127, 0.543333),
-        "free_gift": (0.315356, 0.781667),
-        "mission_hard": (0.325468, 0.618333),
-        "piggy_full": (0.819101, 0.188333),
-        "bankrupt_sale": (0.261, 0.798333),
-        "major_news": (0.404, 0.638333),
-        "vip_ad": (0.820225, 0.111667),
-        "ad_other": (0.95, 0.08),
-    }
+    action_map = ACTION_MAP
 
     # 状态变量
     prev_state = None
@@ -602,12 +660,29 @@ def main():
     exit_pending = False
     last_support_click = 0  # 用于combat自动点击的节流
 
+    latency = LatencyRecorder()
+    trace = None  # 当前帧的延迟 trace
+
+    def _mark(stage):
+        if trace is not None:
+            trace.mark(stage)
+
     def tap_px(x, y, label=None):
         """点击绝对坐标"""
+        _mark("decide")
         adb.tap(x, y)
+        _mark("inject")
         if label:
             print(f"[ACTION] {label} -> tap ({x},{y})")
 
+    def tap_batch(points, interval_s=0.0, label=None):
+        """一次往返依次点击多个绝对坐标"""
+        _mark("decide")
+        adb.tap_batch(points, interval_s=interval_s)
+        _mark("inject")
+        if label:
+            print(f"[ACTION] {label} -> tap_batch {points}")
+
     def tap_pct(pos, label=None):
         """点击相对坐标"""
         if not pos:
@@ -616,6 +691,7 @@ def main():
         tap_px(x, y, label=label)
 
     print("[INFO] paddle runner 启动，按 Ctrl+C 退出")
+    t_loop_start = time.time()
     
     try:
         while True:
@@ -623,12 +699,21 @@ def main():
             macro_ctrl.check_scheduled()
             
             # 截屏并识别状态
-            img = adb.screencap()
-            state, dbg = det.predict(img)
+            pkt = frame_source.next()
+            if pkt is None:
+                if frame_source.exhausted:
+                    print(f"[INFO] 帧源 {frame_source.name} 已结束")
+                    break
+                time.sleep(poll_s)
+                continue
+            trace = pkt.trace
+            state, dbg = det.predict(pkt.frame, prev_state=prev_state)
+            _mark("detect")
             
             # 打印状态（限制小数位数）
             scores_str = {k: round(v, 2) for k, v in dbg.get('scores', {}).items()}
-            print(f"[STATE] {state} scores={scores_str}")
+            cap_info = pkt.meta.get("capture", frame_source.name)
+            print(f"[STATE] {state} scores={scores_str} cap={cap_info}{' (cached)' if dbg.get('cached') else ''}")
 
             if video_recorder:
                 video_recorder.update_overlay(
@@ -647,8 +732,9 @@ def main():
                 video_recorder.stop("离开 combat")
 
             if args.dry_run:
+                latency.add(trace)
                 prev_state = state
-                time.sleep(args.interval)
+                time.sleep(poll_s)
                 continue
 
             # 处理状态对应的操作
@@ -657,9 +743,10 @@ def main():
             if pos:
                 # 有对应的点击位置
                 if state == "settlement":
-                    # 结算界面：尝试多个位置
+                    # 结算界面：尝试多个位置（一次往返批量下发）
                     candidates = [pos, (0.86, 0.86)]
                     seen = set()
+                    points = []
                     for c in candidates:
                         if not c:
                             continue
@@ -667,9 +754,8 @@ def main():
                         if key in seen:
                             continue
                         seen.add(key)
-                        x, y = _pct_to_px(c, (W, H))
-                        tap_px(x, y, label=state)
-                        time.sleep(0.05)  # 短暂延迟避免点击过快
+                        points.append(_pct_to_px(c, (W, H)))
+                    tap_batch(points, interval_s=0.05, label=state)  # 短暂延迟避免点击过快
                 else:
                     x, y = _pct_to_px(pos, (W, H))
                     tap_px(x, y, label=state)
@@ -709,15 +795,12 @@ def main():
                     now = time.time()
                     if now - last_support_click >= args.combat_sleep:
                         print("[INFO] combat 自动执行支持点击")
-                        clicked = False
-                        for i in range(1, 7):
-                            key = f"support{i}"
-                            if key in coords:
-                                sx, sy = _pct_to_px(coords[key], (W, H))
-                                tap_px(sx, sy, label=f"combat->{key}")
-                                clicked = True
-                                time.sleep(0.1)  # 短暂延迟
-                        if clicked:
+                        points = [
+                            _pct_to_px(coords[f"support{i}"], (W, H))
+                            for i in range(1, 7) if f"support{i}" in coords
+                        ]
+                        if points:
+                            tap_batch(points, interval_s=0.1, label="combat->support")  # 短暂延迟
                             last_support_click = now
                 else:
                     # 无操作
@@ -728,8 +811,9 @@ def main():
                 print(f"[INFO] combat 次数 {combat_count} 已达上限 {args.max_combat}，宏已结束，退出循环")
                 break
 
+            latency.add(trace)
             prev_state = state
-            time.sleep(args.interval)
+            time.sleep(poll_s)
             
     except KeyboardInterrupt:
         print("\n[INFO] 收到中断信号，正在停止...")
@@ -756,6 +840,20 @@ def main():
         macro_ctrl.wait_for_completion(timeout=3.0)
         if video_recorder and video_recorder.is_running:
             video_recorder.stop("程序结束")
+        frame_source.stop()
+        elapsed = time.time() - t_loop_start
+        if frame_source.frame_id and elapsed > 0:
+            print(f"[INFO] 共处理 {frame_source.frame_id} 帧，{elapsed:.1f}s，"
+                  f"{frame_source.frame_id / elapsed:.2f} 帧/秒")
+        print(adb.channel_stats())
+        if det.frame_change is not None:
+            print(det.frame_change.describe())
+        print(det.describe_ocr())
+        print(latency.format_summary())
+        if args.latency_json:
+            latency.dump_json(args.latency_json)
+            print(f"[INFO] 延迟明细已写入 {args.latency_json}")
+        adb.close()
 
 
 if __name__ == "__main__":
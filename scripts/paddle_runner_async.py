@@ -0,0 +1,352 @@
+# scripts/paddle_runner_async.py
+"""
+paddle_runner 的 asyncio 版本：截屏、OCR、点击、宏并发执行，互不串行等待。
+  - 截屏任务按 --interval 节拍取帧，第 N+1 帧的截屏与第 N 帧的 OCR 重叠（队列容量 1）
+  - OCR 在单线程池中执行（PaddleOCR 不保证线程安全），不阻塞事件循环
+  - 状态点击以任务形式下发，不阻塞下一帧 OCR
+  - combat 宏是 asyncio 任务；离开 combat 时 cancel，正在执行的 adb 命令进程会被 kill
+  - 截屏与点击共享每台设备的并发上限（--max-adb-concurrency）
+  - 每帧带 FrameTrace（截屏 → 解码 → 识别 → 决策 → 点击完成），退出时打印各阶段延迟（--latency-json 另存）
+
+用法示例：
+  python -m scripts.paddle_runner_async --serial <adb-serial> --cfg configs/ocr_states_fsm.json5 --combat-macro recordings/mission12_01.json
+  python -m scripts.paddle_runner_async --source dir:tests/dataset --interval 0   # 离线回放（自动 dry-run）
+说明：
+  暂不支持 combat 录像，需要录像请用同步版 scripts/paddle_runner.py
+"""
+import argparse
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Set, Tuple
+
+import json5
+
+from scripts.paddle_runner import ACTION_MAP, MacroEvent, _pct_to_px, load_macro_events
+from war_drone.adb_async import AsyncAdbClient
+from war_drone.adb_client import AdbClient
+from war_drone.frames import open_source, parse_source_spec
+from war_drone.latency import FrameTrace, LatencyRecorder
+from war_drone.paddle_state_detector import PaddleStateDetector
+
+
+class AsyncMacroPlayer:
+    """combat 宏播放任务；stop() 会取消任务，进行中的 adb 点击随之被 kill。"""
+
+    def __init__(self, adb: AsyncAdbClient, screen_size: Tuple[int, int], events: List[MacroEvent],
+                 loops: int = 1, scale: float = 1.0):
+        self.adb = adb
+        self.W, self.H = screen_size
+        self.events = events
+        self.loops = loops
+        self.scale = scale
+        self._task: Optional[asyncio.Task] = None
+        self._playing = False
+
+    @property
+    def has_events(self) -> bool:
+        return bool(self.events)
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done() and self._playing
+
+    @property
+    def is_scheduled(self) -> bool:
+        return self._task is not None and not self._task.done() and not self._playing
+
+    def start(self, reason: str = "", delay: float = 0.0):
+        if not self.events or (self._task and not self._task.done()):
+            return
+        self._task = asyncio.create_task(self._play(delay), name="combat-macro")
+        if reason:
+            print(f"[INFO] 宏{'预约' if delay > 0 else '启动'}: {reason}" + (f"（{delay:.2f}s 后）" if delay > 0 else ""))
+
+    async def stop(self, reason: str = ""):
+        task, self._task = self._task, None
+        if task is None or task.done():
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        if reason:
+            print(f"[INFO] 宏停止: {reason}")
+
+    async def _play(self, delay: float):
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self._playing = True
+        try:
+            t_next = time.monotonic()
+            for loop_idx in range(self.loops):
+                for idx, ev in enumerate(self.events):
+                    if loop_idx or idx:
+                        # 绝对时间排程，点击耗时不累积误差
+                        t_next += ev.dt * self.scale
+                        wait_s = t_next - time.monotonic()
+                        if wait_s > 0.01:
+                            await asyncio.sleep(wait_s)
+                    label = f"macro[{loop_idx + 1}:{idx + 1}]"
+                    if ev.type == "tap" and ev.pos:
+                        x, y = _pct_to_px(ev.pos, (self.W, self.H))
+                        await self.adb.tap(x, y)
+                        print(f"[ACTION] {label} -> tap ({x},{y})")
+                    elif ev.type == "swipe" and ev.start and ev.end:
+                        dur = ev.duration * self.scale
+                        await self.adb.swipe(_pct_to_px(ev.start, (self.W, self.H)),
+                                             _pct_to_px(ev.end, (self.W, self.H)), dur)
+                        print(f"[ACTION] {label} swipe dur={dur:.2f}s")
+                    t_next = max(t_next, time.monotonic())
+            print("[INFO] combat 宏播放结束")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[ERROR] 宏任务异常: {e}")
+        finally:
+            self._playing = False
+
+
+async def capture_loop(grab, queue: asyncio.Queue, interval: float, stop: asyncio.Event):
+    """按节拍取帧放入队列（图像, trace, 截屏起止 time.time()）；帧源结束时放入 None。"""
+    t_due = time.monotonic()
+    while not stop.is_set():
+        delay = t_due - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        t_due = time.monotonic() + interval
+        t0 = time.time()
+        try:
+            img, trace, exhausted = await grab()
+        except Exception as e:
+            print(f"[WARN] 截屏失败: {e}")
+            await asyncio.sleep(0.2)
+            continue
+        if img is None:
+            if exhausted:
+                await queue.put(None)
+                return
+            continue
+        await queue.put((img, trace, t0, time.time()))
+
+
+async def run(args):
+    with open(args.cfg, "r", encoding="utf-8") as f:
+        cfg = json5.load(f)
+    coords = cfg.get("coords", {})
+    W, H = cfg["screen"]["width"], cfg["screen"]["height"]
+
+    det = PaddleStateDetector(args.cfg, det_dir=args.det_dir, rec_dir=args.rec_dir, cls_dir=args.cls_dir,
+                              lean=True if args.lean else None)
+    ocr_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ocr")
+    loop = asyncio.get_running_loop()
+
+    kind, mode, _ = parse_source_spec(args.source)
+    mode = mode or "png"
+    if kind == "adb" and mode == "auto":
+        print("[WARN] 异步截屏不支持 auto，改用 raw")
+        mode = "raw"
+    aadb = AsyncAdbClient(serial=args.serial, max_concurrency=args.max_adb_concurrency,
+                          screencap_mode=mode if kind == "adb" else "png")
+    src = None
+    n_grab = 0
+    if kind == "adb":
+        async def grab():
+            nonlocal n_grab
+            p0 = time.perf_counter()
+            img = await aadb.screencap()
+            p1 = time.perf_counter()
+            if img is None:
+                return None, None, False
+            n_grab += 1
+            cap = aadb.last_capture
+            decode_ms = cap.decode_ms if cap else 0.0
+            trace = FrameTrace(n_grab, f"adb:{mode}", capture_start=p0, capture_end=p1 - decode_ms / 1000.0)
+            return img, trace.mark("decode", p1), False
+    else:
+        # 其他帧源（屏幕流 / 回放）是同步接口，放到线程中取帧
+        src = open_source(args.source, adb=AdbClient(serial=args.serial), decode_size=(W, H)).start()
+        if src.finite and not args.dry_run:
+            print(f"[INFO] 回放帧源 {src.name}，自动启用 --dry-run")
+            args.dry_run = True
+
+        async def grab():
+            pkt = await asyncio.to_thread(src.next)
+            if pkt is None:
+                return None, None, src.exhausted
+            return pkt.image, pkt.trace, src.exhausted
+
+    macro = AsyncMacroPlayer(aadb, (W, H), [], args.combat_macro_loops, args.macro_sleep_scale)
+    if args.combat_macro:
+        try:
+            macro.events = load_macro_events(args.combat_macro)
+            print(f"[INFO] loaded combat macro {args.combat_macro}, events={len(macro.events)}")
+        except Exception as e:
+            print(f"[WARN] 无法读取 combat 宏 {args.combat_macro}: {e}")
+
+    actions: Set[asyncio.Task] = set()
+    latency = LatencyRecorder()
+    trace: Optional[FrameTrace] = None  # 当前帧的延迟 trace；点击任务接手后置 None
+
+    def fire(coro, label):
+        """点击以任务形式下发，不阻塞下一帧 OCR；当前帧的 trace 在点击完成时打 inject 并记录"""
+        nonlocal trace
+        tr, trace = trace, None
+        if tr is not None:
+            tr.mark("decide")
+
+        async def _run():
+            try:
+                await coro
+                if tr is not None:
+                    tr.mark("inject")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[WARN] {label} 点击失败: {e}")
+            finally:
+                latency.add(tr)
+        task = asyncio.create_task(_run(), name=label)
+        actions.add(task)
+        task.add_done_callback(actions.discard)
+
+    queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+    stop = asyncio.Event()
+    capture_task = asyncio.create_task(capture_loop(grab, queue, args.interval, stop), name="capture")
+
+    prev_state = None
+    combat_count = 0
+    exit_pending = False
+    last_support_click = 0.0
+    frames = 0
+    t_start = time.time()
+    print("[INFO] paddle runner (async) 启动，按 Ctrl+C 退出")
+    try:
+        while True:
+            item = await queue.get()
+            if item is None:
+                print("[INFO] 帧源已结束")
+                break
+            img, trace, t_cap0, t_cap1 = item
+            frames += 1
+            state, dbg = await loop.run_in_executor(ocr_pool, det.predict, img, prev_state)
+            if trace is not None:
+                trace.mark("detect")
+            scores_str = {k: round(v, 2) for k, v in dbg.get("scores", {}).items()}
+            age_ms = (time.time() - t_cap1) * 1000.0
+            print(f"[STATE] {state} scores={scores_str} cap={(t_cap1 - t_cap0) * 1000:.0f}ms age={age_ms:.0f}ms")
+
+            if state not in ("ready", "combat") and macro.is_scheduled:
+                await macro.stop("离开 ready/combat 流程，取消预约")
+            if state != "combat" and macro.is_running:
+                await macro.stop("离开 combat")
+
+            if args.dry_run:
+                latency.add(trace)
+                prev_state = state
+                continue
+
+            pos = ACTION_MAP.get(state)
+            if pos:
+                if state == "settlement":
+                    points = [_pct_to_px(c, (W, H)) for c in dict.fromkeys([tuple(pos), (0.86, 0.86)])]
+                    fire(aadb.tap_batch(points, interval_s=0.05), state)
+                    print(f"[ACTION] {state} -> tap_batch {points}")
+                else:
+                    x, y = _pct_to_px(pos, (W, H))
+                    fire(aadb.tap(x, y), state)
+                    print(f"[ACTION] {state} -> tap ({x},{y})")
+                if state == "ready" and prev_state != "ready" and args.prestart_macro and macro.has_events:
+                    macro.start("点击 ready", delay=args.prestart_delay)
+            elif state == "combat":
+                if prev_state != "combat":
+                    combat_count += 1
+                    print(f"[INFO] 进入 combat #{combat_count}")
+                    if args.max_combat > 0 and combat_count >= args.max_combat:
+                        if macro.has_events:
+                            exit_pending = True
+                            print(f"[INFO] combat 次数 {combat_count} 已达上限，等待宏结束")
+                        else:
+                            print(f"[INFO] combat 次数 {combat_count} 已达上限，结束循环")
+                            break
+                    if macro.has_events:
+                        macro.start("进入 combat")
+                if not macro.is_running and args.combat_auto:
+                    now = time.time()
+                    if now - last_support_click >= args.combat_sleep:
+                        points = [_pct_to_px(coords[f"support{i}"], (W, H))
+                                  for i in range(1, 7) if f"support{i}" in coords]
+                        if points:
+                            fire(aadb.tap_batch(points, interval_s=0.1), "combat->support")
+                            print(f"[ACTION] combat->support -> tap_batch {points}")
+                            last_support_click = now
+
+            if exit_pending and not macro.is_running and not macro.is_scheduled:
+                print(f"[INFO] combat 次数 {combat_count} 已达上限 {args.max_combat}，宏已结束，退出循环")
+                break
+            latency.add(trace)  # 本帧没有点击（有点击时由点击任务记录）
+            prev_state = state
+    finally:
+        print("[INFO] 清理资源...")
+        stop.set()
+        capture_task.cancel()
+        await macro.stop("程序结束")
+        for t in list(actions):
+            t.cancel()
+        await asyncio.gather(capture_task, *actions, return_exceptions=True)
+        if src is not None:
+            src.stop()
+        ocr_pool.shutdown(wait=False)
+        elapsed = time.time() - t_start
+        if frames and elapsed > 0:
+            print(f"[INFO] 共处理 {frames} 帧，{elapsed:.1f}s，{frames / elapsed:.2f} 帧/秒；"
+                  f"adb 并发峰值 {aadb.peak_inflight}，被取消的 adb 进程 {aadb.killed}")
+        if det.frame_change is not None:
+            print(det.frame_change.describe())
+        print(latency.format_summary())
+        if args.latency_json:
+            latency.dump_json(args.latency_json)
+            print(f"[INFO] 延迟明细已写入 {args.latency_json}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--serial", default=None, help="adb 序列号")
+    ap.add_argument("--cfg", default="configs/ocr_states_fsm.json5")
+    ap.add_argument("--det-dir", default=None)
+    ap.add_argument("--rec-dir", default=None)
+    ap.add_argument("--cls-dir", default=None)
+    ap.add_argument("--interval", type=float, default=1.5, help="截屏节拍（秒）；OCR 与下一帧截屏重叠")
+    ap.add_argument("--dry-run", action="store_true", help="只打印状态，不点击")
+    ap.add_argument("--combat-auto", action="store_true", help="combat 状态自动执行支持点击")
+    ap.add_argument("--combat-sleep", type=float, default=0.8, help="combat 连续点击间隔秒")
+    ap.add_argument("--combat-macro", default="recordings/mission12_01.json", help="combat 状态时播放的录制文件（JSON）")
+    ap.add_argument("--combat-macro-loops", type=int, default=1, help="combat 宏循环次数")
+    ap.add_argument("--macro-sleep-scale", type=float, default=1.0, help="宏事件间隔缩放系数")
+    ap.add_argument("--max-combat", type=int, default=0, help="combat 状态执行的最大次数（0=不限制）")
+    ap.add_argument("--prestart-macro", action="store_true", help="点击 ready 后延时播放宏，不等 OCR 判定 combat")
+    ap.add_argument("--prestart-delay", type=float, default=0.0, help="ready 点击后延时多少秒启动宏")
+    ap.add_argument("--max-adb-concurrency", type=int, default=2, help="每台设备同时执行的 adb 命令数上限")
+    ap.add_argument("--source", default="adb:png",
+                    help="帧源：adb[:png|raw]（异步截屏）/ screenrecord / scrcpy / video:<mp4>[@fps] / dir:<目录>[@fps]")
+    ap.add_argument("--quiet", action="store_true", help="减少日志输出（压低 paddleocr 日志）")
+    ap.add_argument("--lean", action="store_true",
+                    help="lean 判定：按上一状态的后继优先评估、领先者无法被追平即停止，不构造调试信息（缺省读配置 lean）")
+    ap.add_argument("--latency-json", default=None, help="退出时把各阶段延迟（截屏→识别→决策→点击）写入 JSON")
+    args = ap.parse_args()
+
+    if args.quiet:
+        logging.getLogger("ppocr").setLevel(logging.ERROR)
+        logging.getLogger("PIL").setLevel(logging.ERROR)
+        logging.getLogger().setLevel(logging.WARNING)
+
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        print("\n[INFO] 已退出")
+
+
+if __name__ == "__main__":
+    main()
@@ -43,8 +43,10 @@ def _load_screen_wh(cfg_path: str = "configs/config.json5"):
     return int(sc["width"]), int(sc["height"])
 
 
-def _run_cmd(cmd):
-    return subprocess.check_output(cmd, text=True, errors="ignore")
+def _run_cmd(adb: AdbClient, args):
+    # 经 AdbClient 执行（--transport socket 时不启动 adb 进程）
+    out = adb._cmd(args, capture_output=True)
+    return bytes(out).decode("utf-8", errors="ignore")
 
 
 def _parse_devices(getevent_lp_output: str):
@@ -83,10 +85,7 @@ def _parse_devices(getevent_lp_output: str):
 
 
 def _auto_pick_device(adb: AdbClient):
-    base = [adb.adb]
-    if adb.serial:
-        base += ["-s", adb.serial]
-    txt = _run_cmd(base + ["shell", "getevent", "-lp"])
+    txt = _run_cmd(adb, ["shell", "getevent", "-lp"])
     devices = _parse_devices(txt)
     # 优先匹配名称包含 touch 的多点设备
     for d in devices:
@@ -103,12 +102,9 @@ def _probe_device_caps(adb: AdbClient, dev_path: str):
     """
     单独探测指定设备的 max_x/max_y（getevent -lp /dev/input/eventX）。
     """
-    base = [adb.adb]
-    if adb.serial:
-        base += ["-s", adb.serial]
     try:
-        txt = _run_cmd(base + ["shell", "getevent", "-lp", dev_path])
-    except subprocess.CalledProcessError:
+        txt = _run_cmd(adb, ["shell", "getevent", "-lp", dev_path])
+    except (subprocess.CalledProcessError, RuntimeError):
         return None, None
     devs = _parse_devices(txt)
     for d in devs:
@@ -144,12 +140,14 @@ def main():
     ap.add_argument("--device", default=None, help="显式指定触摸设备路径，如 /dev/input/event7（可选）")
     ap.add_argument("--out-dir", default="recordings", help="输出目录，默认 recordings")
     ap.add_argument("--debug", action="store_true", help="打印解析到的事件，便于排查录制失败")
+    ap.add_argument("--transport", choices=["exec", "socket"], default="exec",
+                    help="adb 通道：socket=直连 adb server 线协议（getevent 事件流也走 socket）")
     ap.add_argument("--rotate", choices=["auto", "none", "cw", "ccw"], default="auto",
                     help="坐标旋转：auto=根据屏幕/触摸长短边判断；cw=顺时针90°；ccw=逆时针90°")
     ap.add_argument("--stop-key", default="ctrl+q", help="按该键停止录制（Windows 终端），默认 ctrl+q；Ctrl+C 亦可")
     args = ap.parse_args()
 
-    adb = AdbClient(serial=args.serial)
+    adb = AdbClient(serial=args.serial, transport=args.transport)
     cfg_W, cfg_H = _load_screen_wh()
 
     # 选择触摸设备
@@ -163,11 +161,15 @@ def main():
     print(f"[INFO] 使用设备 {dev_info['path']} ({dev_info.get('name','')}) max=({dev_info.get('max_x')},{dev_info.get('max_y')})")
 
     # 读取触摸事件流
-    base = [adb.adb]
-    if adb.serial:
-        base += ["-s", adb.serial]
-    cmd = base + ["shell", "getevent", "-lt", dev_info["path"]]
-    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True, errors="ignore")
+    if args.transport == "socket":
+        ev_sock = adb.wire.open(f"shell:getevent -lt {dev_info['path']}")
+        ev_sock.settimeout(None)  # 事件流可能长时间无输出
+        ev_lines = ev_sock.makefile("r", encoding="utf-8", errors="ignore")
+        proc = None
+    else:
+        cmd = adb._base() + ["shell", "getevent", "-lt", dev_info["path"]]
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True, errors="ignore")
+        ev_lines = proc.stdout
 
     events = []
     start_ts = time.time()
@@ -230,7 +232,7 @@ def main():
     print(f"开始录制：在手机上点击；Ctrl+C 或 stop-key({args.stop_key}) 结束并保存")
     stop_requested = False
     try:
-        for line in proc.stdout:
+        for line in ev_lines:
             # 允许按 stop-key 退出（Windows msvcrt）
             if msvcrt and msvcrt.kbhit():
                 ch = msvcrt.getch()
@@ -330,6 +332,10 @@ def main():
         try:
             if proc and proc.poll() is None:
                 proc.terminate()
+            if proc is None:
+                ev_lines.close()
+                ev_sock.close()
+                adb.close()
         except KeyboardInterrupt:
             pass
 
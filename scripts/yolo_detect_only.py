@@ -7,6 +7,7 @@ import cv2
 import json5
 
 from war_drone.adb_client import AdbClient
+from war_drone.frames import open_source
 from war_drone.combat_ai import filter_detections, pick_target, suggest_swipe
 
 
@@ -26,6 +27,7 @@ def main():
     ap.add_argument("--save-dir", default=None, help="save annotated frames")
     ap.add_argument("--max-frames", type=int, default=0)
     ap.add_argument("--min-box-px", type=int, default=None, help="override min_box_px in cfg")
+    ap.add_argument("--source", default="adb", help="frame source: adb[:png|raw|auto] / screenrecord / video:<mp4> / dir:<folder>")
     args = ap.parse_args()
 
     try:
@@ -48,10 +50,15 @@ def main():
 
     adb = AdbClient(serial=args.serial)
     model = YOLO(args.model)
+    src = open_source(args.source, adb=adb, decode_size=(screen_w, screen_h)).start()
 
     frame_idx = 0
     while True:
-        img = adb.screencap()
+        img = src.screencap()
+        if img is None:
+            if src.exhausted:
+                break
+            continue
         res = model.predict(
             img,
             conf=args.conf,
@@ -103,7 +110,9 @@ def main():
         frame_idx += 1
         if args.max_frames and frame_idx >= args.max_frames:
             break
-        time.sleep(args.interval)
+        if not src.finite:
+            time.sleep(args.interval)
+    src.stop()
 
 
 if __name__ == "__main__":
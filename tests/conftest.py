@@ -1,4 +1,6 @@
 # tests/conftest.py
+import cv2
+import numpy as np
 import pytest
 from war_drone.state_detector import TemplateStateDetector
 
@@ -13,3 +15,42 @@ def detector():
         method="CCORR_NORMED",
         default_thresh=0.85,  # 这里对烟雾测试无影响
     )
+
+
+# 400×300 合成画面：单状态 x，模板 t.png，ROI 以画面中心为锚点
+SYNTH_CFG = ('{screen: {width: 400, height: 300}, coords: {c: [0.5, 0.5]}, '
+             'extra_states: [{name: "x", anchor: "c", templates: ["t.png"], roi_half_size: [150, 120], use_edges: false}]}')
+
+
+class SynthScene:
+    """合成模板 / 画面，写配置与模板到临时目录并构造小识别器（不缓存帧、不用金字塔）。"""
+    CFG = SYNTH_CFG
+
+    def __init__(self, root):
+        self.root = root
+
+    @staticmethod
+    def tmpl(seed: int = 0, shape=(24, 32, 3)) -> np.ndarray:
+        return np.random.default_rng(seed).integers(0, 255, shape, dtype=np.uint8)
+
+    @staticmethod
+    def scene(t: np.ndarray, x: int, y: int, bg: int = 40) -> np.ndarray:
+        img = np.full((300, 400, 3), bg, np.uint8)
+        img[y:y + t.shape[0], x:x + t.shape[1]] = t
+        return img
+
+    def detector_kwargs(self, templates, cfg: str = SYNTH_CFG, **kw):
+        """templates: {文件名: 图}。返回 TemplateStateDetector 的参数（kw 覆盖缺省）。"""
+        for name, t in templates.items():
+            cv2.imwrite(str(self.root / name), t)
+        (self.root / "cfg.json5").write_text(cfg, encoding="utf-8")
+        return dict(dict(cfg_path=str(self.root / "cfg.json5"), templates_dir=str(self.root),
+                         frame_change=False, pyramid_levels=0), **kw)
+
+    def detector(self, templates, cfg: str = SYNTH_CFG, **kw) -> TemplateStateDetector:
+        return TemplateStateDetector(**self.detector_kwargs(templates, cfg, **kw))
+
+
+@pytest.fixture()
+def synth(tmp_path):
+    return SynthScene(tmp_path)
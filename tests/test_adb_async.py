@@ -0,0 +1,104 @@
+"""
+目的：
+- AsyncAdbClient 的同设备并发上限生效（峰值不超过 max_concurrency）
+- 任务取消 / 超时时底层 adb 进程被 kill 并回收
+- 异步截屏（raw）解码正确
+说明：
+- 用一个 Python 脚本冒充 adb：`shell sleep N` 休眠，`exec-out screencap` 输出 raw 帧
+"""
+import asyncio
+import os
+import stat
+import sys
+import time
+
+import pytest
+
+from war_drone.adb_async import AsyncAdbClient
+from war_drone.adb_fake import make_raw_screencap
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="假 adb 脚本依赖 shebang")
+
+FAKE_ADB = """#!{python}
+import os, sys, time
+args = sys.argv[1:]
+if args[:1] == ["-s"]:
+    args = args[2:]
+with open({pidfile!r}, "a") as f:
+    f.write(f"{{os.getpid()}}\\n")
+verb, cmd = args[0], " ".join(args[1:])
+if cmd.startswith("sleep "):
+    time.sleep(float(cmd.split()[1]))
+elif cmd == "screencap":
+    sys.stdout.buffer.write(open({rawfile!r}, "rb").read())
+"""
+
+
+@pytest.fixture()
+def fake_adb(tmp_path):
+    raw = tmp_path / "frame.raw"
+    raw.write_bytes(make_raw_screencap(8, 4, fill=(10, 20, 30, 255)))
+    pidfile = tmp_path / "pids.txt"
+    script = tmp_path / "adb"
+    script.write_text(FAKE_ADB.format(python=sys.executable, pidfile=str(pidfile), rawfile=str(raw)))
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    return str(script), pidfile
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+def test_bounded_concurrency(fake_adb):
+    adb_path, _ = fake_adb
+
+    async def main():
+        c = AsyncAdbClient(serial="dev1", max_concurrency=2, adb=adb_path)
+        t0 = time.monotonic()
+        await asyncio.gather(*(c.shell("sleep 0.3") for _ in range(4)))
+        return c.peak_inflight, time.monotonic() - t0
+
+    peak, elapsed = asyncio.run(main())
+    assert peak == 2
+    assert elapsed >= 0.55  # 4 条 / 并发 2 → 至少两轮
+
+
+def test_cancel_kills_process(fake_adb):
+    adb_path, pidfile = fake_adb
+
+    async def main():
+        c = AsyncAdbClient(serial="dev1", adb=adb_path)
+        task = asyncio.create_task(c.shell("sleep 30"))
+        for _ in range(100):  # 等子进程真正起来
+            await asyncio.sleep(0.05)
+            if pidfile.exists():
+                break
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        with pytest.raises(TimeoutError):
+            await c.shell("sleep 30", timeout=0.5)
+        return c.killed
+
+    t0 = time.monotonic()
+    assert asyncio.run(main()) == 2
+    assert time.monotonic() - t0 < 10
+    for pid in map(int, pidfile.read_text().split()):
+        assert not _alive(pid)
+
+
+def test_async_screencap_raw(fake_adb):
+    adb_path, _ = fake_adb
+
+    async def main():
+        c = AsyncAdbClient(adb=adb_path, screencap_mode="raw")
+        return await c.screencap(), c.last_capture
+
+    img, stat_ = asyncio.run(main())
+    assert img.shape == (4, 8, 3)
+    assert tuple(img[0, 0]) == (30, 20, 10)
+    assert stat_.mode == "raw"
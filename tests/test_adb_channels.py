@@ -0,0 +1,60 @@
+"""
+目的：
+- 截屏与输入走不同通道：慢截屏进行中，点击不需要排队等待
+- 同一设备的客户端共用通道，同类动作按提交顺序执行
+- 通道记录等待耗时；在通道线程内嵌套调用不死锁
+"""
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from war_drone.adb_channels import AdbChannel, device_channels
+from war_drone.adb_client import AdbClient
+
+_PNG = cv2.imencode(".png", np.zeros((4, 4, 3), np.uint8))[1].tobytes()
+
+
+def _fake_client(serial, log):
+    adb = AdbClient(serial=serial)
+
+    def _cmd(args, capture_output=False, timeout=None):
+        if args[0] == "exec-out":
+            time.sleep(0.5)  # 模拟慢截屏
+            return _PNG
+        log.append((time.perf_counter(), " ".join(args)))
+    adb._cmd = _cmd
+    return adb
+
+
+def test_tap_not_blocked_by_screencap():
+    log = []
+    adb = _fake_client("chan-a", log)
+    t = threading.Thread(target=adb.screencap)
+    t.start()
+    time.sleep(0.05)  # 确保截屏已在执行
+    t0 = time.perf_counter()
+    adb.tap(1, 2)
+    assert time.perf_counter() - t0 < 0.2
+    t.join()
+    assert adb.channels.input.stats.max_wait_ms < 100
+    assert adb.channels.capture.stats.count == 1
+
+
+def test_channels_shared_per_device_and_ordered():
+    log = []
+    a, b = _fake_client("chan-b", log), _fake_client("chan-b", log)
+    assert a.channels is b.channels is device_channels("chan-b")
+    assert device_channels("chan-c") is not a.channels
+    futs = [a.channels.input.submit(a._tap, i, 0) if i % 2 else b.channels.input.submit(b._tap, i, 0)
+            for i in range(6)]
+    for f in futs:
+        f.result()
+    assert [cmd for _, cmd in log] == [f"shell input tap {i} 0" for i in range(6)]
+
+
+def test_nested_call_runs_inline():
+    ch = AdbChannel("test")
+    assert ch.call(lambda: ch.call(lambda: 42)) == 42
+    assert ch.stats.count == 1
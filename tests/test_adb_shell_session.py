@@ -0,0 +1,54 @@
+"""
+目的：
+- 验证常驻 shell 会话的结束标记协议：按批执行、顺序输出、一次往返
+- 会话进程被杀后下次调用自动重建
+说明：
+- 用本机 sh 代替 `adb shell`，不需要真机
+"""
+import shutil
+import pytest
+
+from war_drone.adb_shell import AdbShellSession, join_cmds, sleep_cmd, swipe_cmd, tap_cmd
+
+pytestmark = pytest.mark.skipif(shutil.which("sh") is None, reason="没有 sh，跳过会话测试")
+
+
+def test_cmd_builders():
+    assert tap_cmd(10.7, 20) == "input tap 10 20"
+    assert swipe_cmd((1, 2), (3, 4), 0.25) == "input swipe 1 2 3 4 250"
+    assert sleep_cmd(0.1) == "sleep 0.100"
+    assert join_cmds(["a", "", " b "]) == "a; b"
+
+
+def test_run_batch_in_order():
+    with AdbShellSession(["sh"]) as s:
+        assert s.run("echo hello") == "hello"
+        out = s.run_batch(["echo 1", "echo 2", "printf 3"])
+        assert out.splitlines() == ["1", "2", "3"]
+        # 多次调用复用同一进程
+        pid = s._proc.pid
+        s.run("true")
+        assert s._proc.pid == pid
+
+
+def test_restart_after_process_dies():
+    s = AdbShellSession(["sh"])
+    try:
+        s.run("true")
+        s._proc.kill()
+        s._proc.wait()
+        assert s.run("echo back") == "back"
+        assert s.restarts == 1
+    finally:
+        s.close()
+
+
+def test_timeout_kills_session():
+    s = AdbShellSession(["sh"])
+    try:
+        with pytest.raises(TimeoutError):
+            s.run("sleep 5", timeout=0.3)
+        assert not s.alive
+        assert s.run("echo ok") == "ok"
+    finally:
+        s.close()
@@ -0,0 +1,63 @@
+"""
+目的：
+- 线协议客户端对假 adb server：host:version / devices / transport 选设备
+- exec: 截屏（raw / PNG）、shell: 点击，AdbClient(transport="socket") 不启动任何 adb 进程
+- sync: 拉文件（连接复用、失败后可继续）；未知设备返回 FAIL
+"""
+import subprocess
+
+import pytest
+
+from war_drone.adb_client import AdbClient
+from war_drone.adb_fake import FakeAdbServer
+from war_drone.adb_wire import AdbWireClient, AdbWireError, encode_request
+
+
+@pytest.fixture()
+def fake():
+    data = bytes(range(256)) * 1000
+    with FakeAdbServer(screen=(64, 32), files={"/sdcard/combat.mp4": data}, sync_chunk=4096) as srv:
+        srv.payload = data
+        yield srv
+
+
+def test_encode_request():
+    assert encode_request("host:version") == b"000chost:version"
+
+
+def test_host_services(fake):
+    with AdbWireClient(port=fake.port) as w:
+        assert w.version() == 41
+        assert w.devices() == ["fake-0001"]
+        assert bytes(w.shell("echo hi")) == b"hi\n"
+    with AdbWireClient(serial="nope", port=fake.port, pool_size=0) as w:
+        with pytest.raises(AdbWireError, match="not found"):
+            w.shell("true")
+
+
+def test_sync_pull(fake, tmp_path):
+    with AdbWireClient(serial="fake-0001", port=fake.port) as w:
+        assert bytes(w.pull_bytes("/sdcard/combat.mp4")) == fake.payload
+        with pytest.raises(AdbWireError, match="No such file"):
+            w.pull_bytes("/sdcard/missing.mp4")
+        dst = tmp_path / "combat.mp4"
+        assert w.pull("/sdcard/combat.mp4", str(dst)) == len(fake.payload)
+        assert dst.read_bytes() == fake.payload
+
+
+def test_adb_client_socket_transport_no_spawn(fake, monkeypatch):
+    def _no_spawn(*a, **k):
+        raise AssertionError("socket 通道不应启动 adb 进程")
+    monkeypatch.setattr(subprocess, "Popen", _no_spawn)
+
+    adb = AdbClient(serial="fake-0001", transport="socket", adb_port=fake.port, screencap_mode="raw")
+    img = adb.screencap()
+    assert img.shape == (32, 64, 3)
+    assert tuple(img[0, 0]) == (90, 60, 30)  # RGBA(30,60,90) -> BGR
+    adb.set_screencap_mode("png")
+    assert adb.screencap().shape == (32, 64, 3)
+    adb.tap(10, 20)
+    adb.tap_batch([(1, 2), (3, 4)])
+    adb.close()
+    assert fake.inputs == ["input tap 10 20", "input tap 1 2; input tap 3 4"]
+    assert "exec:screencap" in fake.services and "exec:screencap -p" in fake.services
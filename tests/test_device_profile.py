@@ -0,0 +1,80 @@
+"""
+目的：
+- wm size 解析（Override 优先）与横竖方向对齐
+- 设备档案：按高度比缩放像素量 / 模板，device_profiles 覆盖 scale / coords / 原生模板目录；同分辨率为恒等档案
+- 识别器带 screen_size：缩放后的截图仍能识别，模板库按 分辨率 + scale 单独缓存并在下次构造时命中
+"""
+import glob
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from war_drone.device_profile import DeviceProfile, orient_like, parse_wm_size
+from war_drone.state_detector import TemplateStateDetector
+
+CFG = {
+    "screen": {"width": 2670, "height": 1200},
+    "coords": {"list_start": [0.87, 0.85]},
+    "local_search_pad": 12,
+    "extra_states": [{"name": "splash", "anchor": "list_start", "roi_half_size": [320, 140],
+                      "templates": [{"file": "a.png", "roi_half_size": [100, 50]}]}],
+}
+SPLASH = sorted(glob.glob(os.path.join("tests", "dataset", "splash", "*.jpg")))[:2]
+
+
+def test_parse_wm_size_and_orient():
+    assert parse_wm_size("Physical size: 1080x2400\n") == (1080, 2400)
+    assert parse_wm_size("Physical size: 1200x2670\nOverride size: 1080x2400\n") == (1080, 2400)
+    with pytest.raises(ValueError):
+        parse_wm_size("error: no devices")
+    assert orient_like((1080, 2400), (2670, 1200)) == (2400, 1080)
+    assert orient_like((2400, 1080), (2670, 1200)) == (2400, 1080)
+
+
+def test_profile_apply_and_overrides():
+    assert DeviceProfile.from_cfg(CFG, (1200, 2670)).identity
+
+    p = DeviceProfile.from_cfg(CFG, (1080, 2400))
+    assert p.size == (2400, 1080) and p.scale == pytest.approx(0.9)
+    out = p.apply(CFG)
+    assert out["screen"] == {"width": 2400, "height": 1080}
+    assert out["local_search_pad"] == 11
+    st = out["extra_states"][0]
+    assert st["roi_half_size"] == [288, 126]
+    assert st["templates"][0]["roi_half_size"] == [90, 45]
+    assert CFG["extra_states"][0]["roi_half_size"] == [320, 140]  # 原配置不变
+
+    cfg = dict(CFG, device_profiles={"1920x1080": {"scale": 0.8, "coords": {"list_start": [0.9, 0.8]}}})
+    q = DeviceProfile.from_cfg(cfg, (1080, 1920))
+    assert q.scale == 0.8 and q.apply(cfg)["coords"]["list_start"] == [0.9, 0.8]
+    assert q.cache_path("cache") == os.path.join("cache", "templates_1920x1080_s0.800.npz")
+    assert q.cache_path("a/bank.npz") == "a/bank_1920x1080_s0.800.npz"
+
+    bgr, mask = q.scale_template(np.zeros((50, 100, 3), np.uint8), np.full((50, 100), 255, np.uint8))
+    assert bgr.shape == (40, 80, 3) and mask.shape == (40, 80) and set(np.unique(mask)) == {255}
+
+
+def test_native_templates_win(tmp_path):
+    cfg = dict(CFG, device_profiles={"2400x1080": {"templates_dir": str(tmp_path)}})
+    p = DeviceProfile.from_cfg(cfg, (2400, 1080))
+    (tmp_path / "a.png").write_bytes(b"")
+    loader = lambda path: (np.zeros((50, 100, 3), np.uint8), None)
+    assert p.load_template("templates/a.png", loader)[0].shape == (50, 100, 3)  # 原生：不缩放
+    assert p.load_template("templates/b.png", loader)[0].shape == (45, 90, 3)
+
+
+@pytest.mark.skipif(not SPLASH, reason="缺少 tests/dataset/splash 样本")
+def test_detector_scaled_device(tmp_path):
+    kw = dict(frame_change=False, screen_size=(1080, 2400), template_cache=str(tmp_path))
+    det = TemplateStateDetector(**kw)
+    assert det.wh == (2400, 1080) and det.profile is not None
+    cache = tmp_path / "templates_2400x1080_s0.900.npz"
+    assert cache.exists()
+    for p in SPLASH:
+        img = cv2.resize(cv2.imread(p), det.wh, interpolation=cv2.INTER_AREA)
+        assert det.predict(img_bgr=img).name == "splash"
+
+    again = TemplateStateDetector(**kw)
+    assert again.bank.loads == 0 and again.bank.cache_hits > 0
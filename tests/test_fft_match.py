@@ -0,0 +1,58 @@
+"""
+目的：
+- 频域互相关与 cv2.TM_CCORR_NORMED 分数一致：单通道 / 三通道 / 带 mask，含全零（边缘图）区域
+- 识别器 match_backend=fft / auto 与 spatial 的匹配结果一致；未知后端报错
+"""
+import cv2
+import numpy as np
+import pytest
+
+from war_drone.fft_match import FFT, SPATIAL, FFTCorrelator, choose_backend
+from war_drone.state_detector import TemplateStateDetector
+
+RNG = np.random.default_rng(0)
+
+
+def _case(channels, sparse=False):
+    shape = (120, 200) + ((channels,) if channels > 1 else ())
+    roi = RNG.integers(0, 256, shape, dtype=np.uint8)
+    if sparse:  # 类似边缘图：大片为 0
+        roi[roi < 230] = 0
+    tmpl = roi[30:70, 50:110].copy()
+    return roi, tmpl
+
+
+@pytest.mark.parametrize("channels,sparse", [(1, False), (3, False), (1, True)])
+def test_matches_opencv(channels, sparse):
+    roi, tmpl = _case(channels, sparse)
+    mask = np.where(RNG.random(tmpl.shape[:2]) > 0.3, 255, 0).astype(np.uint8)
+    for m in (None, mask):
+        ref = cv2.matchTemplate(roi, tmpl, cv2.TM_CCORR_NORMED, mask=m)
+        got = FFTCorrelator(tmpl, m, roi.shape[:2]).match(roi)
+        assert got.shape == ref.shape
+        ok = np.isfinite(ref)  # OpenCV 在 mask 下全零窗口给 NaN，这里记 0
+        assert np.abs(got[ok] - ref[ok]).max() < 1e-4
+        assert np.unravel_index(got.argmax(), got.shape) == (30, 50)
+
+
+def test_choose_backend():
+    roi, tmpl = _case(3)
+    backend, corr, t_sp, t_fft = choose_backend(tmpl, None, roi.shape[:2],
+                                                lambda r: cv2.matchTemplate(r, tmpl, cv2.TM_CCORR_NORMED))
+    assert backend in (SPATIAL, FFT) and (corr is not None) == (backend == FFT)
+    assert t_sp > 0 and t_fft > 0
+
+
+def test_detector_backends(synth):
+    t = RNG.integers(0, 255, (40, 60, 3), dtype=np.uint8)
+    img = synth.scene(t, 120, 130, bg=30)
+    kw = synth.detector_kwargs({"t.png": t}, local_search_pad=0)
+    ref = TemplateStateDetector(match_backend="spatial", **kw).predict(img_bgr=img)
+    for backend in ("fft", "auto"):
+        det = TemplateStateDetector(match_backend=backend, **kw)
+        got = det.predict(img_bgr=img)
+        assert got.name == ref.name == "x" and got.loc == ref.loc == (120, 130)
+        assert abs(got.score - ref.score) < 1e-4
+    assert det.backend_report and det.backend_report[0]["template"] == "t.png"
+    with pytest.raises(ValueError):
+        TemplateStateDetector(match_backend="gpu", **kw)
@@ -0,0 +1,63 @@
+"""
+目的：
+- Frame 不复制原图；灰度 / 金字塔层 / 边缘图只算一次（同一对象）
+- 裁剪返回视图；金字塔层尺寸逐层减半，层坐标按比例缩放
+- FramePacket.frame 缓存；帧变化检测可直接吃 Frame
+- 重叠 ROI 合并为区域：区域只预处理一次，各 ROI 为区域内视图
+"""
+import cv2
+import numpy as np
+
+from war_drone.frame import EDGE_HI, EDGE_LO, Frame, as_frame, merge_boxes
+from war_drone.frame_change import FrameChangeDetector
+from war_drone.frames.base import FramePacket
+
+
+def _img():
+    img = np.zeros((1200, 2670, 3), np.uint8)
+    cv2.rectangle(img, (400, 300), (900, 700), (40, 200, 90), -1)
+    cv2.putText(img, "START", (1800, 1000), cv2.FONT_HERSHEY_SIMPLEX, 4, (255, 255, 255), 8)
+    return img
+
+
+def test_lazy_memoized_views():
+    img = _img()
+    f = Frame(img)
+    assert f.bgr is img and as_frame(f) is f and as_frame(img).bgr is img
+    assert f.gray is f.gray
+    assert f.edges() is f.edges()
+    assert f.level(1).shape[:2] == (600, 1335)
+    assert f.level(2, gray=True).shape == (300, 667)
+    assert f.level(2) is f.level(2)
+    assert f.resized((2670, 1200)) is img
+
+    roi = f.crop(400, 300, 900, 700)
+    assert np.shares_memory(roi, img)
+    g = cv2.GaussianBlur(cv2.cvtColor(img, cv2.COLOR_BGR2GRAY), (3, 3), 0)
+    assert np.array_equal(f.edges(), cv2.Canny(g, EDGE_LO, EDGE_HI))
+    assert f.crop(400, 300, 900, 700, kind="gray", n=1).shape == (200, 250)
+
+
+def test_packet_frame_and_change_detector():
+    img = _img()
+    pkt = FramePacket(1, img, 0.0, 0.0)
+    assert pkt.frame is pkt.frame and pkt.frame.bgr is img
+
+    fc = FrameChangeDetector()
+    assert fc.cached(pkt.frame, lambda: "a") == "a"
+    assert fc.cached(Frame(img.copy()), lambda: "b") == "a"
+
+
+def test_merge_boxes_and_region_views():
+    a, b, c, d = (2022, 840, 2622, 1200), (2169, 936, 2529, 1176), (0, 0, 10, 10), (8, 8, 100, 100)
+    plan = merge_boxes([a, b, c, d])
+    assert plan[a] == plan[b] == a
+    assert plan[c] == c and plan[d] == d  # 合并后像素更多，不合并
+
+    f = Frame(_img())
+    big = f.crop(*a, kind="edges")
+    sub = f.crop(*b, kind="edges", region=a)
+    assert np.shares_memory(sub, big) and sub.shape == (240, 360)
+    assert f.crop(*b, kind="gray").shape == (240, 360)
+    lvl = f.crop(*b, kind="edges", n=2, region=a)
+    assert np.shares_memory(lvl, f.crop(*a, kind="edges", n=2)) and lvl.shape == (60, 90)
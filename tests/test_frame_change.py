@@ -0,0 +1,75 @@
+"""
+目的：
+- 同一画面（含轻微噪声）复用上次结果，不再调用 compute；画面切换后重新计算
+- max_skip 到达上限强制重算；skip_rate / describe 统计正确
+- dhash 方法、cached_dbg 的 cached 标记、from_cfg 开关
+"""
+import numpy as np
+import pytest
+
+from war_drone.frame_change import FrameChangeDetector
+
+
+def _screen(seed, noise=0):
+    rng = np.random.default_rng(seed)
+    img = np.zeros((360, 640, 3), np.uint8)
+    for _ in range(6):
+        x, y = rng.integers(0, 560), rng.integers(0, 300)
+        img[y:y + 60, x:x + 80] = rng.integers(0, 255, 3)
+    if noise:
+        img = np.clip(img.astype(np.int16) + rng.integers(-noise, noise + 1, img.shape), 0, 255).astype(np.uint8)
+    return img
+
+
+@pytest.mark.parametrize("method", ["mad", "dhash"])
+def test_skip_unchanged_and_recompute_on_change(method):
+    fc = FrameChangeDetector(method=method, max_skip=0)
+    calls = []
+
+    def run(img, tag):
+        return fc.cached(img, lambda: calls.append(tag) or tag)
+
+    a, b = _screen(1), _screen(2)
+    assert run(a, "a") == "a"
+    assert run(_screen(1, noise=3), "a2") == "a"  # 噪声内视为未变化
+    assert fc.last_skipped
+    assert run(b, "b") == "b"
+    assert calls == ["a", "b"]
+    assert fc.checks == 3 and fc.skips == 1
+
+
+def test_max_skip_forces_recompute():
+    fc = FrameChangeDetector(max_skip=2)
+    img = _screen(3)
+    n = []
+    for _ in range(6):
+        fc.cached(img, lambda: n.append(1))
+    assert len(n) == 2  # 1 次初算 + 2 次复用后强制重算 + 再复用 2 次
+    assert fc.skip_rate == pytest.approx(4 / 6)
+    assert "4/6" in fc.describe()
+
+
+def test_cached_dbg_and_from_cfg():
+    fc = FrameChangeDetector.from_cfg({"method": "mad", "thresh": 1.0})
+    img = _screen(4)
+    state, dbg = fc.cached_dbg(img, lambda: ("list", {"scores": {"list": 1.0}}))
+    assert state == "list" and dbg["cached"] is False
+    state, dbg = fc.cached_dbg(img, lambda: ("other", {}))
+    assert state == "list" and dbg["cached"] is True and dbg["scores"] == {"list": 1.0}
+
+    assert FrameChangeDetector.from_cfg(None) is None
+    assert FrameChangeDetector.from_cfg({"enabled": False}) is None
+    assert FrameChangeDetector.from_cfg(fc) is fc
+    with pytest.raises(ValueError):
+        FrameChangeDetector(method="nope")
+
+
+def test_mad_sees_local_change():
+    # 画面只有一小块（约 0.5%）变化：全图平均被稀释到阈值以下，分格最大值仍能发现
+    a = _screen(5)
+    b = a.copy()
+    b[40:70, 100:140] = 255 - b[40:70, 100:140]
+    for grid, recomputed in (((16, 9), True), ((1, 1), False)):
+        fc = FrameChangeDetector(max_skip=0, grid=grid)
+        fc.cached(a, lambda: "a")
+        assert (fc.cached(b, lambda: "b") == "b") is recomputed
@@ -0,0 +1,75 @@
+"""
+目的：
+- FrameTrace 各阶段相减得到分段耗时；缺失阶段并入下一段，未注入时 age/total 以 decide 为终点
+- LatencyRecorder 汇总 p50/p99 与注入计数，dump_json 可读回
+- 帧源输出的 FramePacket 自带 trace（已有 capture / decode 时间戳）
+"""
+import json
+import os
+
+import pytest
+
+from war_drone.frames import DirectorySource, list_images
+from war_drone.latency import FrameTrace, LatencyRecorder
+
+
+def _trace(**stamps):
+    tr = FrameTrace(1, "test", capture_start=stamps.pop("capture_start"), capture_end=stamps.pop("capture_end"))
+    for stage, t in stamps.items():
+        tr.mark(stage, t)
+    return tr
+
+
+def test_trace_spans():
+    tr = _trace(capture_start=0.0, capture_end=0.040, decode=0.050, detect=0.080, decide=0.081, inject=0.101)
+    sp = tr.spans_ms()
+    assert sp["capture"] == pytest.approx(40.0)
+    assert sp["decode"] == pytest.approx(10.0)
+    assert sp["detect"] == pytest.approx(30.0)
+    assert sp["inject"] == pytest.approx(20.0)
+    assert sp["age"] == pytest.approx(61.0)
+    assert sp["total"] == pytest.approx(101.0)
+
+    # 无 decode：解码时间并入 detect；未注入：total 以 decide 为终点
+    tr = _trace(capture_start=0.0, capture_end=0.010, detect=0.030, decide=0.035)
+    sp = tr.spans_ms()
+    assert "decode" not in sp and "inject" not in sp
+    assert sp["detect"] == pytest.approx(20.0)
+    assert sp["total"] == pytest.approx(35.0)
+
+    with pytest.raises(ValueError):
+        tr.mark("nope")
+
+
+def test_recorder_summary_and_json(tmp_path):
+    rec = LatencyRecorder(window=10)
+    for i in range(20):
+        tr = _trace(capture_start=0.0, capture_end=0.01, detect=0.01 + i / 1000.0)
+        if i % 2:
+            tr.mark("decide", 0.03).mark("inject", 0.04)
+        rec.add(tr)
+    rec.add(None)
+    assert rec.frames == 20 and rec.injected == 10
+    s = rec.summary()
+    assert s["detect"]["n"] == 10  # 滚动窗口
+    assert s["detect"]["p50_ms"] >= 10.0
+    assert s["total"]["n"] == 10
+    assert "[LATENCY]" in rec.format_summary()
+
+    path = tmp_path / "lat.json"
+    rec.dump_json(str(path))
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert data["injected"] == 10 and len(data["samples_ms"]["inject"]) == 10
+
+
+def test_source_packet_carries_trace():
+    dataset = os.path.join("tests", "dataset")
+    src = DirectorySource(dataset, paths=list_images(dataset)[:1]).start()
+    try:
+        pkt = src.next()
+    finally:
+        src.stop()
+    assert pkt.trace is not None
+    assert {"capture_start", "capture_end", "decode"} <= set(pkt.trace.stamps)
+    pkt.trace.mark("detect")
+    assert pkt.trace.spans_ms()["detect"] >= 0.0
@@ -0,0 +1,44 @@
+"""
+目的：
+- 局部搜索：画面不变 / 小幅移动时在上次位置附近命中，结果与整 ROI 搜索一致
+- 目标移出局部窗口后分数不足，回退整 ROI 仍能找到；命中率统计正确
+"""
+import cv2
+import numpy as np
+
+KW = dict(method="CCOEFF_NORMED", default_thresh=0.8)
+
+
+def test_local_hit_and_fallback(synth):
+    t = synth.tmpl()
+    det = synth.detector({"t.png": t}, local_search_pad=8, **KW)
+    ref = synth.detector({"t.png": t}, local_search_pad=0, **KW)
+
+    for x, y in [(150, 120), (150, 120), (155, 117), (60, 50)]:
+        img = synth.scene(t, x, y)
+        got, want = det.predict(img_bgr=img), ref.predict(img_bgr=img)
+        assert got.name == want.name == "x"
+        assert got.loc == want.loc == (x, y)
+
+    st = det.local_search_stats()
+    # 首帧整 ROI；第 2、3 帧局部命中；第 4 帧移出窗口 → 局部未命中后回退
+    assert (st["hits"], st["misses"]) == (2, 1)
+    assert abs(st["hit_ratio"] - 2 / 3) < 1e-9
+    assert ref.local_search_stats()["hits"] == 0
+
+
+def test_local_hit_uses_template_thresh(synth):
+    # 状态阈值按融合分数配得很低（0.3）；局部命中仍按单模板的 default_thresh（0.8）判断
+    t = synth.tmpl()
+    det = synth.detector({"t.png": t}, cfg=synth.CFG.replace('use_edges: false}', 'use_edges: false, thresh: 0.3}'),
+                         local_search_pad=8, **KW)
+    det.predict(img_bgr=synth.scene(t, 150, 120))
+
+    # 旧位置留下一个残影（约 0.5~0.8 分），真正的目标在别处
+    noise = np.random.default_rng(1).integers(0, 255, t.shape, dtype=np.uint8)
+    ghost = cv2.addWeighted(t, 0.5, noise, 0.5, 0)
+    img = synth.scene(ghost, 150, 120)
+    img[50:50 + t.shape[0], 60:60 + t.shape[1]] = t
+    r = det.predict(img_bgr=img)
+    assert r.loc == (60, 50) and r.score > 0.99
+    assert det.local_search_stats()["misses"] == 1
@@ -0,0 +1,83 @@
+"""
+目的：
+- 文本框排序（上→下、同一行左→右）与透视裁剪尺寸
+- ocr_tiles：逐 ROI 检测、全部文本行只调用一次识别器，结果按 ROI 归还并按 drop_score 过滤
+- recognize_tiles（rec_only）：不调检测，小图缩放到识别器输入高度后一次识别
+- 整帧检测：文本框按重叠分给 ROI，只识别被分到的框（跨 ROI 的框只识别一次）
+"""
+import numpy as np
+
+from war_drone.ocr_batch import (assign_boxes, ocr_full_frame, ocr_tiles, recognize_tiles, roi_rect, rotate_crop,
+                                 sorted_boxes)
+
+
+def _box(x, y, w, h):
+    return np.float32([[x, y], [x + w, y], [x + w, y + h], [x, y + h]])
+
+
+class _Reader:
+    """按小图宽度返回固定文本框，识别结果为框宽度（只需 ocr_batch 用到的属性）。"""
+    use_angle_cls = False
+    drop_score = 0.5
+
+    def __init__(self):
+        self.rec_calls = []
+
+    def text_detector(self, img):
+        h, w = img.shape[:2]
+        return ([_box(w // 2, 2, w // 2 - 1, h - 4), _box(1, 2, w // 2 - 2, h - 4)] if w > 20 else []), 0.0
+
+    def text_recognizer(self, crops):
+        self.rec_calls.append(len(crops))
+        return [(f"w{c.shape[1]}", 0.9 if c.shape[1] > 10 else 0.1) for c in crops], 0.0
+
+
+def test_sorted_boxes_and_crop():
+    boxes = [_box(50, 3, 10, 10), _box(0, 0, 10, 10), _box(0, 40, 10, 10)]
+    assert [tuple(b[0]) for b in sorted_boxes(boxes)] == [(0, 0), (50, 3), (0, 40)]
+    img = np.zeros((60, 80, 3), np.uint8)
+    assert rotate_crop(img, _box(5, 5, 30, 10)).shape == (10, 30, 3)
+    assert rotate_crop(img, _box(5, 5, 10, 30)).shape == (10, 30, 3)  # 竖长行转 90°
+
+
+def test_ocr_tiles_single_recognizer_call():
+    reader = _Reader()
+    tiles = {"a": np.zeros((20, 60, 3), np.uint8), "b": np.zeros((20, 100, 3), np.uint8),
+             "tiny": np.zeros((20, 10, 3), np.uint8), "empty": np.zeros((0, 0, 3), np.uint8)}
+    times = {}
+    out = ocr_tiles(reader, tiles, times=times)
+    assert reader.rec_calls == [4]
+    assert out == {"a": [("w28", 0.9), ("w29", 0.9)], "b": [("w48", 0.9), ("w49", 0.9)], "tiny": [], "empty": []}
+    assert set(times) == {"det", "rec"}
+
+
+def test_recognize_tiles_skips_detection():
+    reader = _Reader()
+    reader.text_detector = None  # rec_only 不应调用检测
+    tiles = {"a": np.zeros((96, 200, 3), np.uint8), "b": np.zeros((24, 30, 3), np.uint8),
+             "empty": np.zeros((0, 0, 3), np.uint8)}
+    out = recognize_tiles(reader, tiles)
+    assert reader.rec_calls == [2]
+    assert out == {"a": ("w100", 0.9), "b": ("w60", 0.9), "empty": ("", 0.0)}  # 高度缩放到 48
+
+
+def test_assign_boxes_by_overlap():
+    assert roi_rect([0.5, 0.5, 0.2, 0.1], (1000, 500)) == (400, 225, 600, 275)
+    rects = {"a": (0, 0, 100, 50), "b": (90, 0, 200, 50)}
+    boxes = [_box(10, 10, 40, 20), _box(80, 10, 20, 20), _box(300, 10, 20, 20)]
+    assert assign_boxes(boxes, rects) == {"a": [0, 1], "b": [1]}
+    assert assign_boxes(boxes, rects, min_overlap=0.8) == {"a": [0, 1], "b": []}
+
+
+def test_ocr_full_frame_recognizes_assigned_boxes_once():
+    class _FrameReader(_Reader):
+        def text_detector(self, img):
+            self.det_shape = img.shape
+            return [_box(5, 5, 20, 10), _box(45, 5, 10, 10), _box(200, 100, 20, 10)], 0.0  # 半尺寸坐标
+
+    reader = _FrameReader()
+    frame = np.zeros((300, 600, 3), np.uint8)
+    out = ocr_full_frame(reader, frame, {"a": (0, 0, 120, 60), "b": (85, 0, 200, 60)}, scale=0.5)
+    assert reader.det_shape == (150, 300, 3)
+    assert reader.rec_calls == [2]  # 第三个框不在任何 ROI 里，不识别
+    assert out == {"a": [("w40", 0.9), ("w20", 0.9)], "b": [("w20", 0.9)]}
@@ -0,0 +1,89 @@
+"""
+目的：
+- 评估顺序：上一状态 → 后继 → 弹窗 → 其余，去重且忽略不认识的名字
+- 分数上限：规则数 + 辅助模板×0.5，rival_ceiling 只收紧不放宽
+- 提前结束：领先者严格大于剩余上限才停，判定结果（含同分 → unknown）与全量评估一致
+- load_fsm：state_fsm 中拼错的状态名（转移 / 弹窗 / rival_ceiling 键）报错
+"""
+import itertools
+
+import pytest
+
+from war_drone import ocr_order
+
+STATES = [
+    {"name": "main_menu", "ocr": [{}, {}]},
+    {"name": "ready", "ocr": [{}, {}, {}]},
+    {"name": "combat", "ocr": [{}], "aux_templates": [{}]},
+    {"name": "free_gift", "ocr": [{}]},
+    {"name": "weapon", "ocr": [{}, {}]},
+]
+NAMES = [s["name"] for s in STATES]
+TRANSITIONS = {"main_menu": ["ready", "weapon"], "ready": ["combat", "main_menu", "ghost"]}
+POPUPS = ["free_gift"]
+
+
+def test_eval_order():
+    assert ocr_order.eval_order(NAMES, TRANSITIONS, POPUPS, "ready") == \
+        ["ready", "combat", "main_menu", "free_gift", "weapon"]
+    assert ocr_order.eval_order(NAMES, TRANSITIONS, POPUPS, None) == \
+        ["free_gift", "main_menu", "ready", "combat", "weapon"]
+    assert ocr_order.eval_order(NAMES, TRANSITIONS, POPUPS, "unknown")[0] == "free_gift"
+
+
+def test_score_bounds_and_decide():
+    assert ocr_order.score_bounds(STATES) == {"main_menu": 2, "ready": 3, "combat": 1.5, "free_gift": 1, "weapon": 2}
+    b = ocr_order.score_bounds(STATES, {"default": 1, "ready": 2, "free_gift": 5})
+    assert b == {"main_menu": 1, "ready": 2, "combat": 1, "free_gift": 1, "weapon": 1}
+    assert ocr_order.decide({"a": 2, "b": 1}) == "a"
+    assert ocr_order.decide({"a": 2, "b": 2}) == "unknown"
+    assert ocr_order.decide({"a": 0}) == ocr_order.decide({}) == "unknown"
+
+
+def test_evaluate_matches_full():
+    bounds = ocr_order.score_bounds(STATES)
+    order = ocr_order.eval_order(NAMES, TRANSITIONS, POPUPS, "main_menu")
+    # 每个状态的分数取 0..上限 的所有组合（0.5 步长），提前结束的判定都与全量一致
+    grids = [[x * 0.5 for x in range(int(bounds[n] * 2) + 1)] for n in order]
+    early = 0
+    for combo in itertools.product(*grids):
+        truth = dict(zip(order, combo))
+        scores, n = ocr_order.evaluate(order, truth.__getitem__, bounds)
+        assert ocr_order.decide(scores) == ocr_order.decide(truth)
+        early += n < len(order)
+    assert early > 0
+
+    calls = []
+    scores, n = ocr_order.evaluate(order, lambda name: calls.append(name) or (2.0 if name == "main_menu" else 0.0),
+                                   ocr_order.score_bounds(STATES, {"default": 1}))
+    assert n == 1 and calls == ["main_menu"] and ocr_order.decide(scores) == "main_menu"
+
+
+def test_popup_over_prev_state():
+    # piggy_full 盖在 main_menu 上：底下 main_menu 的 2 条规则仍命中，弹窗 3 条全中
+    states = STATES + [{"name": "piggy_full", "ocr": [{}, {}, {}]}]
+    popups = POPUPS + ["piggy_full"]
+    truth = dict.fromkeys([s["name"] for s in states], 0.0)
+    truth.update(main_menu=2.0, piggy_full=3.0)
+    order = ocr_order.eval_order(truth, TRANSITIONS, popups, "main_menu")
+
+    bounds = ocr_order.score_bounds(states, {"default": 1}, exact=popups)
+    assert bounds["piggy_full"] == 3 and bounds["weapon"] == 1
+    scores, n = ocr_order.evaluate(order, truth.__getitem__, bounds)
+    assert ocr_order.decide(scores) == ocr_order.decide(truth) == "piggy_full"
+    assert n < len(order)  # 弹窗评估后其余仍可跳过
+
+    # 弹窗也被收紧到 1 时，main_menu 2 分就会提前结束，弹窗永远不会被评估
+    capped = ocr_order.score_bounds(states, {"default": 1})
+    assert ocr_order.decide(ocr_order.evaluate(order, truth.__getitem__, capped)[0]) == "main_menu"
+
+
+def test_load_fsm():
+    cfg = {"state_fsm": {"transitions": {"main_menu": ["ready"]}, "popups": ["free_gift"],
+                         "rival_ceiling": {"default": 1, "ready": 2}}}
+    assert ocr_order.load_fsm(cfg, NAMES) == ({"main_menu": ["ready"]}, ["free_gift"], {"default": 1.0, "ready": 2.0})
+    assert ocr_order.load_fsm({}, NAMES) == ({}, [], {})
+    for bad in ({"transitions": {"main_menu": ["raedy"]}}, {"transitions": {"mainmenu": []}},
+                {"popups": ["free_gfit"]}, {"rival_ceiling": {"redy": 1}}):
+        with pytest.raises(ValueError):
+            ocr_order.load_fsm({"state_fsm": bad}, NAMES)
@@ -0,0 +1,93 @@
+"""
+目的：
+- score_many：路径 / ndarray 混合输入得到 N×S 分数矩阵，argmax / 位置正确
+- 进程池结果与串行一致；CSV / NPZ 写出后可读回
+- 未定义的状态报错
+- 真实数据集：score_many 每行与 _score_state 的候选分数 / 位置 / 模板一致
+"""
+import csv
+import glob
+
+import cv2
+import numpy as np
+import pytest
+
+from war_drone.frame import Frame
+from war_drone.score_matrix import ScoreMatrix
+from war_drone.state_detector import TemplateStateDetector
+
+CFG = ('{screen: {width: 400, height: 300}, coords: {a: [0.3, 0.5], b: [0.7, 0.5]}, extra_states: ['
+       '{name: "x", anchor: "a", templates: ["x.png"], roi_half_size: [100, 100], use_edges: false},'
+       '{name: "y", anchor: "b", templates: ["y.png"], roi_half_size: [100, 100], use_edges: false}]}')
+
+
+@pytest.fixture()
+def setup(synth, tmp_path):
+    tx, ty = synth.tmpl(1), synth.tmpl(2)
+    det = synth.detector({"x.png": tx, "y.png": ty}, cfg=CFG, method="CCOEFF_NORMED")
+    paths = []
+    for i, (t, x, y) in enumerate([(tx, 90, 140), (ty, 250, 120), (tx, 60, 100)]):
+        p = str(tmp_path / f"img{i}.png")
+        cv2.imwrite(p, synth.scene(t, x, y))
+        paths.append(p)
+    return det, paths, synth.scene(ty, 260, 150)
+
+
+def test_matrix_and_outputs(setup, tmp_path):
+    det, paths, arr = setup
+    m = det.score_many(paths + [arr], states=["x", "y"])
+    assert m.scores.shape == (4, 2) and m.names[-1] == "#3"
+    assert m.best_states == ["x", "y", "x", "y"]
+    assert m.best_locs.tolist() == [[90, 140], [250, 120], [60, 100], [260, 150]]
+    assert np.all(m.best_scores > 0.99)
+
+    m.to_csv(str(tmp_path / "out" / "s.csv"), gt=["x", "y", "x", "y"])
+    rows = list(csv.reader(open(tmp_path / "out" / "s.csv", encoding="utf-8")))
+    assert rows[0][:4] == ["path", "gt", "score_x", "score_y"] and rows[2][4] == "y"
+    m.save_npz(str(tmp_path / "s.npz"))
+    back = ScoreMatrix.load_npz(str(tmp_path / "s.npz"))
+    assert np.array_equal(back.scores, m.scores) and back.names == m.names and back.templates == m.templates
+
+
+def test_process_pool_matches_serial(setup):
+    det, paths, _ = setup
+    a = det.score_many(paths)
+    b = det.score_many(paths, processes=2, chunksize=1)
+    assert a.states == det.state_order
+    assert np.array_equal(a.scores, b.scores) and np.array_equal(a.locs, b.locs)
+
+
+def test_unknown_state(setup):
+    det, paths, _ = setup
+    with pytest.raises(ValueError):
+        det.score_many(paths, states=["z"])
+
+
+def test_score_many_leaves_local_search_alone(synth):
+    tx = synth.tmpl(1)
+    det = synth.detector({"x.png": tx, "y.png": synth.tmpl(2)}, cfg=CFG, method="CCOEFF_NORMED",
+                         local_search_pad=8)
+    det.predict(img_bgr=synth.scene(tx, 90, 140))
+    remembered = dict(det._last_loc)
+    m = det.score_many([synth.scene(tx, 60, 100)], states=["x"])
+    assert m.best_locs.tolist() == [[60, 100]]
+    assert det.local_search_pad == 8 and det._last_loc == remembered
+    assert det.local_search_stats()["hits"] == det.local_search_stats()["misses"] == 0
+
+
+DATASET = sorted(glob.glob("tests/dataset/*/*.jpg"))
+
+
+@pytest.mark.skipif(not DATASET, reason="缺少 tests/dataset/<state>/*.jpg 样本")
+def test_rows_match_score_state_on_dataset():
+    det = TemplateStateDetector(cfg_path="configs/config.json5", templates_dir="templates",
+                                frame_change=False)
+    paths = DATASET[::3]  # 每种画面都覆盖到即可
+    m = det.score_many(paths)
+    for i, path in enumerate(paths):
+        frame = Frame(cv2.imread(path))
+        for j, st in enumerate(m.states):
+            d = det._score_state(frame, st, local=False)
+            want = (d.score, tuple(d.loc), d.template) if d is not None else (0.0, (-1, -1), "")  # 无可用模板记 0 分
+            assert m.scores[i, j] == pytest.approx(want[0], abs=1e-6), f"{path} {st}"
+            assert (tuple(m.locs[i, j]), m.templates[i][j]) == want[1:], f"{path} {st}"
@@ -0,0 +1,54 @@
+"""
+目的：
+- 用本地 H.264 文件代替真机 screenrecord，验证屏幕流帧源：
+  * 解码到指定分辨率，latest() 返回最新帧 + 时间戳 + 帧号
+  * 文件读完（相当于 screenrecord 到达时间上限）后自动重启，帧号继续递增
+  * screencap() 与 AdbClient.screencap() 同接口，每次返回更新的帧
+说明：
+- 需要 ffmpeg（生成测试视频 + 解码），没有则跳过
+"""
+import shutil
+import subprocess
+import time
+import pytest
+
+from war_drone.screen_stream import ScreenrecordStream
+
+FFMPEG = shutil.which("ffmpeg")
+pytestmark = pytest.mark.skipif(FFMPEG is None, reason="没有 ffmpeg，跳过屏幕流测试")
+
+
+@pytest.fixture(scope="module")
+def h264_file(tmp_path_factory):
+    path = tmp_path_factory.mktemp("stream") / "demo.h264"
+    subprocess.check_call([
+        FFMPEG, "-loglevel", "error", "-f", "lavfi", "-i", "testsrc=size=320x144:rate=30",
+        "-t", "0.5", "-c:v", "libx264", "-pix_fmt", "yuv420p", "-f", "h264", str(path),
+    ])
+    return str(path)
+
+
+def test_stream_decodes_and_restarts(h264_file):
+    with ScreenrecordStream(source_file=h264_file, decode_size=(160, 72), restart_backoff=0.05) as s:
+        frame = s.screencap(timeout=5.0)
+        assert frame is not None and frame.shape == (72, 160, 3)
+        _, ts, fid = s.latest()
+        assert fid >= 1 and ts > 0
+
+        # 0.5s@30fps 约 15 帧；等到跨过一次重启
+        deadline = time.time() + 10
+        while s.restarts < 1 and time.time() < deadline:
+            time.sleep(0.05)
+        assert s.restarts >= 1
+        nxt = s.screencap(timeout=5.0)
+        assert nxt is not None
+        assert s.frame_id > fid
+
+
+def test_stream_gives_up_after_spawn_failures(tmp_path):
+    s = ScreenrecordStream(source_file=str(tmp_path / "missing.h264"), decode_size=(160, 72),
+                           restart_backoff=0.01, max_spawn_failures=3)
+    with s:
+        with pytest.raises(RuntimeError, match="连续 3 次启动失败"):
+            s.screencap(timeout=10.0)
+    assert s.restarts == 3
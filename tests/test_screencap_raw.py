@@ -0,0 +1,60 @@
+"""
+目的：
+- 验证 raw screencap 头部解析（Android 9+ 16 字节 / 旧版 12 字节）
+- 像素区为零拷贝视图；BGR 与 ROI 裁剪按需转换且颜色正确
+- 自动模式选择器能选出耗时更低的一方
+"""
+import struct
+import numpy as np
+import pytest
+
+from war_drone.screencap import CaptureStat, ScreencapModeSelector, parse_raw_screencap
+
+
+def _raw_bytes(w, h, header16=True, fmt=1):
+    rgba = np.zeros((h, w, 4), np.uint8)
+    rgba[..., 0] = 200  # R
+    rgba[..., 1] = 100  # G
+    rgba[..., 2] = 50   # B
+    rgba[..., 3] = 255
+    rgba[0, 0] = (1, 2, 3, 255)
+    head = struct.pack("<IIII", w, h, fmt, 1) if header16 else struct.pack("<III", w, h, fmt)
+    return head + rgba.tobytes()
+
+
+@pytest.mark.parametrize("header16", [True, False])
+def test_parse_header_and_zero_copy(header16):
+    data = _raw_bytes(8, 4, header16=header16)
+    f = parse_raw_screencap(data)
+    assert (f.width, f.height, f.fmt) == (8, 4, 1)
+    assert f.header_size == (16 if header16 else 12)
+    px = f.pixels
+    assert px.shape == (4, 8, 4)
+    assert np.shares_memory(px, np.frombuffer(data, np.uint8))
+
+
+def test_bgr_and_lazy_crop():
+    f = parse_raw_screencap(_raw_bytes(8, 4))
+    crop = f.crop_bgr(0, 0, 2, 2)
+    assert crop.shape == (2, 2, 3)
+    assert tuple(crop[0, 0]) == (3, 2, 1)
+    assert tuple(crop[1, 1]) == (50, 100, 200)
+    assert f._bgr is None  # 只裁 ROI 时不转换整帧
+    bgr = f.bgr()
+    assert bgr.shape == (4, 8, 3)
+    assert f.bgr() is bgr
+
+
+def test_bad_length_rejected():
+    with pytest.raises(ValueError):
+        parse_raw_screencap(_raw_bytes(8, 4)[:-10])
+
+
+def test_mode_selector_picks_faster():
+    sel = ScreencapModeSelector(probe_frames=2, reprobe_every=0)
+    cost = {"raw": 30.0, "png": 120.0}
+    for _ in range(10):
+        m = sel.next_mode()
+        sel.record(CaptureStat(m, 0, cost[m], 0.0))
+    assert sel.current == "raw"
+    assert sel.next_mode() == "raw"
@@ -135,3 +135,26 @@ def test_negatives_folder_should_not_match_any():
         assert max_score <= NEG_THRESH, \
             (f"[背景/异常被误判] {path}\n"
              f"  最高分={max_score:.3f} (> {NEG_THRESH})")
+
+# 金字塔（由粗到细）与全分辨率匹配的一致性：正样本分数/位置应基本相同，最终判定完全一致
+PYRAMID_SCORE_TOL = 0.02
+PYRAMID_LOC_TOL = 2
+
+@pytest.mark.skipif(not _have_dataset(), reason="缺少 tests/dataset/<state>/*.jpg 批量样本，已跳过此数据集测试")
+def test_pyramid_matches_full_resolution():
+    full = TemplateStateDetector(cfg_path="configs/config.json5", templates_dir="templates",
+                                 frame_change=False, pyramid_levels=0)
+    pyr = TemplateStateDetector(cfg_path="configs/config.json5", templates_dir="templates",
+                                frame_change=False)  # 按配置 pyramid_levels
+    assert any(v > 0 for v in pyr.pyramid_levels.values())
+
+    paths = sorted(glob.glob(os.path.join(DATA_ROOT, "*", "*.jpg")))
+    for path in paths:
+        img = _read_bgr(path)
+        a, b = full.predict(img_bgr=img), pyr.predict(img_bgr=img)
+        assert a.name == b.name, f"[金字塔判定不一致] {path} full={a.name} pyramid={b.name}"
+        if a.score >= POS_THRESH_PER_STATE.get(a.name, GLOBAL_POS_THRESH):
+            assert abs(a.score - b.score) <= PYRAMID_SCORE_TOL, \
+                f"[金字塔分数偏差] {path} full={a.score:.3f} pyramid={b.score:.3f}"
+            assert max(abs(a.loc[0] - b.loc[0]), abs(a.loc[1] - b.loc[1])) <= PYRAMID_LOC_TOL, \
+                f"[金字塔位置偏差] {path} full={a.loc} pyramid={b.loc}"
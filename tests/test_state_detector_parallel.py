@@ -0,0 +1,44 @@
+"""
+目的：
+- workers>1 的并发状态评估与串行结果完全一致（状态名 / 分数 / 位置 / 模板）
+- OpenCV 线程数保护：自动模式按 CPU 数 / workers 只调小；显式值照设；<0 不干预
+"""
+import glob
+import os
+
+import cv2
+import pytest
+
+from war_drone.frame import Frame
+from war_drone.state_detector import TemplateStateDetector, _limit_cv_threads
+
+PATHS = sorted(glob.glob(os.path.join("tests", "dataset", "*", "*.jpg")))[::4]
+
+
+@pytest.mark.skipif(not PATHS, reason="缺少 tests/dataset 样本")
+def test_parallel_matches_serial():
+    saved = cv2.getNumThreads()
+    # 固定后端：auto 按各实例的微基准选 spatial / fft，两个实例可能选得不同，分数差 1e-8 级
+    serial = TemplateStateDetector(frame_change=False, match_backend="spatial")
+    par = TemplateStateDetector(frame_change=False, workers=3, match_backend="spatial")
+    try:
+        for p in PATHS:
+            img = cv2.imread(p)
+            frame = Frame(img)
+            assert par._score_states(frame) == serial._score_states(frame)
+            assert par.predict(img_bgr=img) == serial.predict(img_bgr=img)
+    finally:
+        par.close()
+        cv2.setNumThreads(saved)
+
+
+def test_limit_cv_threads():
+    saved = cv2.getNumThreads()
+    try:
+        cv2.setNumThreads(4)
+        assert _limit_cv_threads(2, -1) == 4
+        assert _limit_cv_threads(2, 3) == 3
+        cv2.setNumThreads(1)
+        assert _limit_cv_threads(1) == 1  # 自动模式不会调大
+    finally:
+        cv2.setNumThreads(saved)
@@ -0,0 +1,46 @@
+"""
+目的：
+- predict(prev_state=...) 的转移先验排序 + 提前结束与全量评估判定一致（dataset 回放）
+- 上一状态就是当前页时只评估 1 个状态；共用模板的兄弟状态在顺序中相邻
+- state_fsm 中出现未定义的状态时报错
+"""
+import glob
+import os
+
+import cv2
+import pytest
+
+from war_drone.state_detector import TemplateStateDetector
+
+PATHS = sorted(glob.glob(os.path.join("tests", "dataset", "*", "*.jpg")))[::3]
+
+
+@pytest.fixture(scope="module")
+def det():
+    return TemplateStateDetector(frame_change=False, local_search_pad=0)
+
+
+def test_order_and_siblings(det):
+    order = det.fsm_order("combat")
+    assert order[:3] == ["combat", "settlement", "settlement_noads"]
+    assert sorted(order) == sorted(det.state_order)
+    assert det.fsm_order("unknown") == det.fsm_order(None)
+
+
+@pytest.mark.skipif(not PATHS, reason="缺少 tests/dataset 样本")
+def test_ordered_matches_full(det):
+    for p in PATHS:
+        img = cv2.imread(p)
+        full = det.predict(img_bgr=img)
+        assert det.last_states_evaluated == len(det.state_order)
+        gt = os.path.basename(os.path.dirname(p))
+        for prev in (gt, "list", "unknown"):
+            assert det.predict(img_bgr=img, prev_state=prev).name == full.name, (p, prev)
+        if full.name in ("list", "prebattle", "splash"):
+            det.predict(img_bgr=img, prev_state=full.name)
+            assert det.last_states_evaluated == 1, p
+
+
+def test_unknown_state_in_fsm():
+    with pytest.raises(ValueError):
+        TemplateStateDetector(frame_change=False, state_fsm={"transitions": {"list": ["lobby"]}})
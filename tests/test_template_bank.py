@@ -0,0 +1,87 @@
+"""
+目的：
+- 模板库构造时读盘一次，get 不再读盘；PNG mtime 变化后自动重载
+- .npz 缓存命中时跳过读盘，模板改动后缓存条目失效
+- 模板条目字符串 / {file, weight} 规范化；mask 尺寸不符时忽略 mask
+- 灰度模板自动识别（单通道匹配），彩色模板不算
+"""
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from war_drone.state_detector import _load_template_and_mask, _prep_edges
+from war_drone.template_bank import TemplateBank, normalize_template_spec
+
+
+def _write_tmpl(path, value=128, size=(40, 30)):
+    img = np.full((size[1], size[0], 3), value, np.uint8)
+    cv2.rectangle(img, (5, 5), (20, 20), (255, 255, 255), -1)
+    cv2.imwrite(str(path), img)
+
+
+def _bank(paths, **kw):
+    return TemplateBank(_load_template_and_mask, _prep_edges, paths=paths, **kw)
+
+
+def test_preload_and_mtime_reload(tmp_path):
+    p = tmp_path / "a.png"
+    _write_tmpl(p)
+    bank = _bank([str(p), str(tmp_path / "missing.png")], reload_interval=0.0)
+    assert bank.loads == 1 and len(bank) == 1
+    e = bank.get(str(p))
+    assert e.bgr.shape == (30, 40, 3) and e.edges.ndim == 2
+    assert bank.get(str(tmp_path / "missing.png")) is None
+    bank.get(str(p))
+    assert bank.loads == 1
+
+    _write_tmpl(p, value=10, size=(50, 30))
+    st = os.stat(p)
+    os.utime(p, (st.st_atime, st.st_mtime + 5))
+    assert bank.get(str(p)).bgr.shape == (30, 50, 3)
+    assert bank.reloads == 1
+
+
+def test_npz_cache(tmp_path):
+    a, b = tmp_path / "a.png", tmp_path / "b.png"
+    _write_tmpl(a)
+    _write_tmpl(b, value=60)
+    cv2.imwrite(str(tmp_path / "b_mask.png"), np.full((30, 40), 255, np.uint8))
+    cache = str(tmp_path / "cache" / "bank.npz")
+    first = _bank([str(a), str(b)], cache_path=cache)
+    assert first.loads == 2 and os.path.exists(cache)
+
+    second = _bank([str(a), str(b)], cache_path=cache)
+    assert second.loads == 0 and second.cache_hits == 2
+    assert np.array_equal(second.get(str(b)).mask, first.get(str(b)).mask)
+    assert np.array_equal(second.get(str(a)).edges, first.get(str(a)).edges)
+
+    st = os.stat(a)
+    os.utime(a, (st.st_atime, st.st_mtime + 5))
+    third = _bank([str(a), str(b)], cache_path=cache)
+    assert third.loads == 1 and third.cache_hits == 1
+
+
+def test_spec_and_bad_mask(tmp_path):
+    assert normalize_template_spec("x.png", "t") == (os.path.join("t", "x.png"), {})
+    assert normalize_template_spec({"file": "y.png", "weight": 0.5}, "t") == (os.path.join("t", "y.png"), {"weight": 0.5})
+    with pytest.raises(ValueError):
+        normalize_template_spec({"weight": 1.0})
+
+    p = tmp_path / "c.png"
+    _write_tmpl(p)
+    cv2.imwrite(str(tmp_path / "c_mask.png"), np.full((10, 10), 255, np.uint8))
+    assert _bank([str(p)]).get(str(p)).mask is None
+
+
+def test_gray_template(tmp_path):
+    g, c = tmp_path / "g.png", tmp_path / "c.png"
+    _write_tmpl(g)
+    img = np.zeros((30, 40, 3), np.uint8)
+    img[..., 2] = 200
+    cv2.imwrite(str(c), img)
+    bank = _bank([str(g), str(c)])
+    assert bank.get(str(g)).is_gray and not bank.get(str(c)).is_gray
+    assert bank.get(str(g)).image("gray").shape == (30, 40)
+    assert bank.get(str(g)).image("gray", 1).shape == (15, 20)
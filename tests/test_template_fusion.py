@@ -0,0 +1,52 @@
+"""
+目的：
+- fuse_scores 各组合方式：max / and_min_top2 / and_min / sum / wmean；缺失模板按 0 分
+- 未知 combine_mode 在构造时报错
+- combat（生命条 + 目标文字 sum 融合）在 dataset 上全部识别，负样本不误判
+"""
+import glob
+import os
+
+import cv2
+import pytest
+
+from war_drone.state_detector import TemplateStateDetector, fuse_scores
+
+M = [(0.9, (1, 1), "a"), (0.6, (2, 2), "b")]
+
+
+def test_fuse_modes():
+    assert fuse_scores(M, "max") == (0.9, (1, 1), "a")
+    assert fuse_scores(M, "and_min_top2")[0] == 0.6
+    assert fuse_scores(M, "and_min")[0] == 0.6
+    s, loc, t = fuse_scores(M, "sum", {"a": 0.2, "b": 1.0})
+    assert s == pytest.approx(0.78) and t == "b"  # 位置取加权贡献最大的模板
+    assert fuse_scores(M, "wmean", {"a": 1.0, "b": 1.0})[0] == pytest.approx(0.75)
+
+
+def test_missing_template_counts_zero():
+    w = {"a": 1.0, "b": 1.0, "c": 2.0}
+    assert fuse_scores(M, "sum", w)[0] == pytest.approx(1.5)
+    assert fuse_scores(M, "wmean", w)[0] == pytest.approx(0.375)
+    assert fuse_scores(M, "and_min", w)[0] == 0.0
+
+
+def test_bad_combine_mode(tmp_path):
+    cfg = tmp_path / "cfg.json5"
+    cfg.write_text('{screen: {width: 100, height: 100}, coords: {a: [0.5, 0.5]}, '
+                   'extra_states: [{name: "x", anchor: "a", templates: [], combine_mode: "avg"}]}', encoding="utf-8")
+    with pytest.raises(ValueError):
+        TemplateStateDetector(cfg_path=str(cfg), templates_dir=str(tmp_path), frame_change=False)
+
+
+COMBAT = sorted(glob.glob(os.path.join("tests", "dataset", "combat", "*.jpg")))
+NEG = sorted(glob.glob(os.path.join("tests", "dataset", "negatives", "*.jpg")))
+
+
+@pytest.mark.skipif(not COMBAT, reason="缺少 tests/dataset 样本")
+def test_combat_sum_fusion():
+    det = TemplateStateDetector(frame_change=False)
+    for p in COMBAT:
+        assert det.predict(img_bgr=cv2.imread(p)).name == "combat", p
+    for p in NEG:
+        assert det.predict(img_bgr=cv2.imread(p)).name != "combat", p
@@ -0,0 +1,138 @@
+"""
+asyncio 版 AdbClient：
+- async screencap / screencap_raw / tap / tap_batch / swipe / shell，底层为 asyncio 子进程
+- 每台设备（按 serial）共用一个信号量，限制同时在跑的 adb 命令数
+- 超时或任务被取消时 kill 对应 adb 进程并回收，不留孤儿进程
+- PNG 解码 / raw 转 BGR 放到线程池，不阻塞事件循环
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+import weakref
+from typing import List, Optional, Sequence
+
+import cv2
+import numpy as np
+
+from war_drone.adb_client import default_adb_path
+from war_drone.adb_shell import join_cmds, sleep_cmd, swipe_cmd, tap_cmd
+from war_drone.screencap import CaptureStat, RawFrame, parse_raw_screencap
+
+# 事件循环 -> {serial: 信号量}；同一设备的多个客户端共享并发上限
+_DEVICE_SEMAPHORES: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, asyncio.Semaphore]]" = \
+    weakref.WeakKeyDictionary()
+
+
+def _device_semaphore(serial: Optional[str], limit: int) -> asyncio.Semaphore:
+    sems = _DEVICE_SEMAPHORES.setdefault(asyncio.get_running_loop(), {})
+    key = serial or ""
+    if key not in sems:
+        sems[key] = asyncio.Semaphore(limit)
+    return sems[key]
+
+
+class AsyncAdbClient:
+    def __init__(self, serial=None, max_concurrency: int = 2, screencap_mode: str = "png",
+                 default_timeout: float = 10.0, adb: Optional[str] = None):
+        if screencap_mode not in ("png", "raw"):
+            raise ValueError(f"screencap_mode 只能是 png / raw: {screencap_mode}")
+        self.serial = serial
+        self.adb = adb or default_adb_path()
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.screencap_mode = screencap_mode
+        self.default_timeout = float(default_timeout)
+        self.last_capture: Optional[CaptureStat] = None
+        self.inflight = 0
+        self.peak_inflight = 0
+        self.killed = 0  # 因超时/取消被 kill 的进程数
+
+    def _base(self) -> List[str]:
+        base = [self.adb]
+        if self.serial:
+            base += ["-s", self.serial]
+        return base
+
+    async def _exec(self, args: Sequence[str], timeout: Optional[float] = None) -> bytes:
+        timeout = self.default_timeout if timeout is None else float(timeout)
+        async with _device_semaphore(self.serial, self.max_concurrency):
+            proc = await asyncio.create_subprocess_exec(
+                *self._base(), *args,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+            self.inflight += 1
+            self.peak_inflight = max(self.peak_inflight, self.inflight)
+            try:
+                out, _ = await asyncio.wait_for(proc.communicate(), timeout=timeout)
+            except asyncio.TimeoutError:
+                await self._kill(proc)
+                raise TimeoutError(f"adb {' '.join(args)[:80]} 超时")
+            except BaseException:
+                # 任务取消（或其他异常）：进程必须随之结束
+                await self._kill(proc)
+                raise
+            finally:
+                self.inflight -= 1
+        if proc.returncode:
+            raise RuntimeError(f"adb {' '.join(args)[:80]} 返回 {proc.returncode}")
+        return out
+
+    async def _kill(self, proc: asyncio.subprocess.Process):
+        if proc.returncode is None:
+            try:
+                proc.kill()
+            except ProcessLookupError:
+                pass
+            self.killed += 1
+        # 回收进程；取消期间也要等它退出
+        await asyncio.shield(proc.wait())
+
+    # ---------- 命令 ----------
+
+    async def shell(self, cmd: str, timeout: Optional[float] = None) -> str:
+        out = await self._exec(["shell", cmd], timeout=timeout)
+        return out.decode("utf-8", errors="ignore")
+
+    async def screencap_raw(self, timeout: Optional[float] = None) -> RawFrame:
+        t0 = time.perf_counter()
+        data = await self._exec(["exec-out", "screencap"], timeout=timeout)
+        frame = parse_raw_screencap(data)
+        self.last_capture = CaptureStat("raw", len(data), (time.perf_counter() - t0) * 1000.0, 0.0)
+        return frame
+
+    async def screencap(self, timeout: Optional[float] = None) -> Optional[np.ndarray]:
+        """返回 BGR ndarray；解码在线程池中进行。"""
+        loop = asyncio.get_running_loop()
+        if self.screencap_mode == "raw":
+            frame = await self.screencap_raw(timeout=timeout)
+            t0 = time.perf_counter()
+            img = await loop.run_in_executor(None, frame.bgr)
+            self.last_capture.decode_ms = (time.perf_counter() - t0) * 1000.0
+            return img
+        t0 = time.perf_counter()
+        data = await self._exec(["exec-out", "screencap", "-p"], timeout=timeout)
+        t1 = time.perf_counter()
+        img = await loop.run_in_executor(None, cv2.imdecode, np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        self.last_capture = CaptureStat("png", len(data), (t1 - t0) * 1000.0, (time.perf_counter() - t1) * 1000.0)
+        return img
+
+    async def input_batch(self, cmds: Sequence[str], timeout: Optional[float] = None):
+        cmds = [c for c in cmds if c]
+        if cmds:
+            await self._exec(["shell", join_cmds(cmds)], timeout=timeout)
+
+    async def tap(self, x: int, y: int):
+        await self._exec(["shell", tap_cmd(x, y)], timeout=5.0)
+
+    async def tap_batch(self, points, interval_s: float = 0.0):
+        cmds = []
+        for i, (x, y) in enumerate(points):
+            if i and interval_s > 0:
+                cmds.append(sleep_cmd(interval_s))
+            cmds.append(tap_cmd(x, y))
+        await self.input_batch(cmds, timeout=5.0 + interval_s * len(cmds))
+
+    async def swipe(self, start, end, duration_s: float = 0.3):
+        await self._exec(["shell", swipe_cmd(start, end, duration_s)], timeout=max(3.0, float(duration_s) + 2.0))
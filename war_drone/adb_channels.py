@@ -0,0 +1,118 @@
+"""
+按设备拆分的 adb 通道：capture（截屏）与 input（点击/滑动）各自一条队列 + 工作线程 + 锁。
+- 宏线程的点击只在 input 队列里排队，不会卡在主循环 10s 超时的截屏后面
+- 同一 serial 的多个客户端共用同一组通道（device_channels），同类动作在设备上仍按顺序执行
+- 每个通道记录排队等待 / 执行耗时（滚动窗口），退出时可打印
+"""
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional
+
+from war_drone.latency import percentile
+
+CHANNEL_NAMES = ("capture", "input")
+
+
+class ChannelStats:
+    """滚动窗口的等待 / 执行耗时（毫秒）。"""
+
+    def __init__(self, window: int = 200):
+        self._lock = threading.Lock()
+        self.wait_ms = deque(maxlen=window)
+        self.run_ms = deque(maxlen=window)
+        self.count = 0
+        self.max_wait_ms = 0.0
+
+    def record(self, wait_ms: float, run_ms: float):
+        with self._lock:
+            self.wait_ms.append(wait_ms)
+            self.run_ms.append(run_ms)
+            self.count += 1
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+    def summary(self) -> Dict[str, float]:
+        with self._lock:
+            waits, runs = list(self.wait_ms), list(self.run_ms)
+            return {
+                "count": self.count,
+                "wait_p50_ms": percentile(waits, 50),
+                "wait_p99_ms": percentile(waits, 99),
+                "wait_max_ms": self.max_wait_ms,
+                "run_p50_ms": percentile(runs, 50),
+                "run_p99_ms": percentile(runs, 99),
+            }
+
+    def describe(self) -> str:
+        s = self.summary()
+        return (f"n={s['count']} wait p50={s['wait_p50_ms']:.1f} p99={s['wait_p99_ms']:.1f} "
+                f"max={s['wait_max_ms']:.1f}ms run p50={s['run_p50_ms']:.1f} p99={s['run_p99_ms']:.1f}ms")
+
+
+class AdbChannel:
+    """单条通道：FIFO 队列 + 一个守护工作线程，动作在线程里串行执行。"""
+
+    def __init__(self, name: str, window: int = 200):
+        self.name = name
+        self.stats = ChannelStats(window)
+        self.lock = threading.RLock()  # 需要跨多个动作独占通道时使用
+        self._q: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._worker, name=f"adb-{name}", daemon=True)
+        self._thread.start()
+
+    def _worker(self):
+        while True:
+            fut, fn, args, kwargs, t_enq = self._q.get()
+            if not fut.set_running_or_notify_cancel():
+                continue
+            t0 = time.perf_counter()
+            try:
+                with self.lock:
+                    fut.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                fut.set_exception(e)
+            finally:
+                t1 = time.perf_counter()
+                self.stats.record((t0 - t_enq) * 1000.0, (t1 - t0) * 1000.0)
+
+    @property
+    def pending(self) -> int:
+        return self._q.qsize()
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        fut: Future = Future()
+        self._q.put((fut, fn, args, kwargs, time.perf_counter()))
+        return fut
+
+    def call(self, fn: Callable, *args, **kwargs):
+        """排队执行并等待结果；在本通道工作线程内调用时直接执行（避免自等待死锁）。"""
+        if threading.current_thread() is self._thread:
+            return fn(*args, **kwargs)
+        return self.submit(fn, *args, **kwargs).result()
+
+
+class DeviceChannels:
+    def __init__(self, serial: Optional[str]):
+        self.serial = serial
+        self.capture = AdbChannel("capture")
+        self.input = AdbChannel("input")
+
+    def describe(self) -> str:
+        return "\n".join(f"[ADB] {name:7s} {getattr(self, name).stats.describe()}" for name in CHANNEL_NAMES)
+
+
+_REGISTRY: Dict[str, DeviceChannels] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def device_channels(serial: Optional[str]) -> DeviceChannels:
+    """同一设备共用一组通道（serial=None 视为默认设备）。"""
+    key = serial or ""
+    with _REGISTRY_LOCK:
+        if key not in _REGISTRY:
+            _REGISTRY[key] = DeviceChannels(serial)
+        return _REGISTRY[key]
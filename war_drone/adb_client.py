@@ -2,25 +2,104 @@
 import os
 import subprocess
 import random
+import time
 import numpy as np
 import cv2
 
+from war_drone.adb_channels import DeviceChannels, device_channels
+from war_drone.adb_wire import AdbWireClient
+from war_drone.device_profile import parse_wm_size
+from war_drone.adb_shell import AdbShellSession, join_cmds, swipe_cmd, sleep_cmd, tap_cmd
+from war_drone.screencap import CaptureStat, RawFrame, ScreencapModeSelector, parse_raw_screencap
+
+INPUT_MODES = ("exec", "session")
+TRANSPORTS = ("exec", "socket")
+SCREENCAP_MODES = ("png", "raw", "auto")
+
+
+def default_adb_path() -> str:
+    adb = r"C:\Android\platform-tools\adb.exe"  # 你的 adb 路径
+    # 也允许仅用 "adb"（已配到 PATH）
+    return adb if os.path.exists(adb) else "adb"
+
+
 class AdbClient:
-    def __init__(self, serial=None):
+    def __init__(self, serial=None, input_mode: str = "exec", screencap_mode: str = "png",
+                 transport: str = "exec", adb_port: int = 5037):
         self.serial = serial
-        self.adb = r"C:\Android\platform-tools\adb.exe"  # 你的 adb 路径
-        if not os.path.exists(self.adb):
-            # 也允许仅用 "adb"（已配到 PATH）
-            self.adb = "adb"
+        self.adb = default_adb_path()
+        # exec: 每次动作 fork 一个 adb 进程；session: 常驻 adb shell，命令写入 stdin
+        if input_mode not in INPUT_MODES:
+            raise ValueError(f"input_mode 只能是 {INPUT_MODES}: {input_mode}")
+        self.input_mode = input_mode
+        self._session = None
+        # exec: 每条命令启动 adb 进程；socket: 直接走 adb server 线协议（AdbWireClient），无进程开销
+        if transport not in TRANSPORTS:
+            raise ValueError(f"transport 只能是 {TRANSPORTS}: {transport}")
+        self.transport = transport
+        self.adb_port = int(adb_port)
+        self._wire = None
+        # 截屏 / 输入分两条通道（各自队列 + 锁 + 等待耗时统计），同一设备共用
+        self.channels: DeviceChannels = device_channels(serial)
+        # png: screencap -p（手机端编码）；raw: 原始帧缓冲；auto: 按实测耗时自动选择
+        self.set_screencap_mode(screencap_mode)
+        self.last_capture: CaptureStat = None  # 最近一帧的 bytes / 毫秒
+
+    def set_screencap_mode(self, mode: str):
+        if mode not in SCREENCAP_MODES:
+            raise ValueError(f"screencap_mode 只能是 {SCREENCAP_MODES}: {mode}")
+        self.screencap_mode = mode
+        self._mode_selector = ScreencapModeSelector() if mode == "auto" else None
 
-    def _cmd(self, args, capture_output=False):
+    def _base(self):
         base = [self.adb]
+        if self.adb_port != 5037:
+            base += ["-P", str(self.adb_port)]
         if self.serial:
             base += ["-s", self.serial]
-        base += args
+        return base
+
+    def _cmd(self, args, capture_output=False, timeout=None):
+        if self.transport == "socket" and args and args[0] in ("shell", "exec-out", "pull"):
+            return self._wire_cmd(args, capture_output, timeout)
+        base = self._base() + args
         if capture_output:
-            return subprocess.check_output(base)
-        subprocess.check_call(base)
+            return subprocess.check_output(base, timeout=timeout)
+        subprocess.check_call(base, timeout=timeout)
+
+    def _wire_cmd(self, args, capture_output=False, timeout=None):
+        """与 _cmd 同语义的线协议实现：shell / exec-out 返回输出，pull 返回字节数。"""
+        verb, rest = args[0], list(args[1:])
+        if verb == "pull":
+            return self.wire.pull(rest[0], rest[1], timeout=timeout)
+        cmd = " ".join(rest)
+        out = self.wire.exec_out(cmd, timeout) if verb == "exec-out" else self.wire.shell(cmd, timeout)
+        return out if capture_output else None
+
+    @property
+    def wire(self) -> AdbWireClient:
+        if self._wire is None:
+            self._wire = AdbWireClient(serial=self.serial, port=self.adb_port)
+            self._wire.prewarm()
+        return self._wire
+
+    @property
+    def session(self) -> AdbShellSession:
+        if self._session is None:
+            self._session = AdbShellSession(self._base() + ["shell"])
+        return self._session
+
+    def channel_stats(self) -> str:
+        """capture / input 两条通道的排队等待与执行耗时"""
+        return self.channels.describe()
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+        if self._wire is not None:
+            self._wire.close()
+            self._wire = None
 
     def launch_package(self, pkg: str):
         # monkey 拉起桌面入口
@@ -28,14 +107,89 @@ class AdbClient:
         print("args:", args[2:])
         self._cmd(args)
 
+    def screen_size(self):
+        """设备分辨率 (w, h)，取自 `wm size`（有 Override 时以其为准；自然方向，横屏游戏需自行转向）。"""
+        out = self._cmd(["shell", "wm", "size"], capture_output=True, timeout=10)
+        return parse_wm_size(bytes(out).decode("utf-8", "replace"))
+
     def screencap(self):
         # 返回 OpenCV BGR ndarray
-        data = self._cmd(["exec-out", "screencap", "-p"], capture_output=True)
-        img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        return self.channels.capture.call(self._screencap)
+
+    def _screencap(self):
+        mode = self._mode_selector.next_mode() if self._mode_selector else self.screencap_mode
+        if mode == "raw":
+            frame = self._screencap_raw()
+            t0 = time.perf_counter()
+            img = frame.bgr()
+            self.last_capture.decode_ms = (time.perf_counter() - t0) * 1000.0
+        else:
+            t0 = time.perf_counter()
+            data = self._cmd(["exec-out", "screencap", "-p"], capture_output=True)
+            t1 = time.perf_counter()
+            img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+            self.last_capture = CaptureStat("png", len(data), (t1 - t0) * 1000.0,
+                                            (time.perf_counter() - t1) * 1000.0)
+        if self._mode_selector:
+            self._mode_selector.record(self.last_capture)
         return img
 
+    def screencap_raw(self) -> RawFrame:
+        """原始帧缓冲（不经 PNG），像素为零拷贝视图，BGR/ROI 按需转换。"""
+        return self.channels.capture.call(self._screencap_raw)
+
+    def _screencap_raw(self) -> RawFrame:
+        t0 = time.perf_counter()
+        data = self._cmd(["exec-out", "screencap"], capture_output=True)
+        frame = parse_raw_screencap(data)
+        self.last_capture = CaptureStat("raw", len(data), (time.perf_counter() - t0) * 1000.0, 0.0)
+        return frame
+
+    # ---------- 输入注入 ----------
+
+    def input_batch(self, cmds, timeout: float = 10.0):
+        """
+        一次往返按顺序执行多条 shell 命令（tap_cmd/swipe_cmd/sleep_cmd 生成）。
+        session 模式写入常驻会话；exec 模式合并为一条 `adb shell "a; b; c"`。
+        """
+        cmds = [c for c in cmds if c]
+        if cmds:
+            self.channels.input.call(self._input_batch, cmds, timeout)
+
+    def _input_batch(self, cmds, timeout: float):
+        if self.input_mode == "session":
+            self.session.run_batch(cmds, timeout=timeout)
+        else:
+            self._cmd(["shell", join_cmds(cmds)], timeout=timeout)
+
     def tap(self, x: int, y: int):
+        self.channels.input.call(self._tap, x, y)
+
+    def _tap(self, x: int, y: int):
+        if self.input_mode == "session":
+            self.session.run(tap_cmd(x, y))
+            return
         self._cmd(["shell", "input", "tap", str(x), str(y)])
 
+    def tap_batch(self, points, interval_s: float = 0.0):
+        """多点依次点击，一次往返；interval_s 为设备端两次点击之间的间隔。"""
+        cmds = []
+        for i, (x, y) in enumerate(points):
+            if i and interval_s > 0:
+                cmds.append(sleep_cmd(interval_s))
+            cmds.append(tap_cmd(x, y))
+        self.input_batch(cmds, timeout=5.0 + interval_s * len(cmds))
+
+    def swipe(self, start, end, duration_s: float = 0.3):
+        self.channels.input.call(self._swipe, start, end, duration_s)
+
+    def _swipe(self, start, end, duration_s: float):
+        cmd = swipe_cmd(start, end, duration_s)
+        timeout = max(3.0, float(duration_s) + 2.0)
+        if self.input_mode == "session":
+            self.session.run(cmd, timeout=timeout)
+            return
+        self._cmd(["shell"] + cmd.split(), timeout=timeout)
+
     def rand_int(self, a, b):
         return random.randint(int(a), int(b))
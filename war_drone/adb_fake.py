@@ -0,0 +1,170 @@
+"""
+本地假 adb server（测试 / 基准用）：在 127.0.0.1 随机端口上实现 AdbWireClient 用到的协议子集。
+- host:version / host:devices / host:transport:<serial> / host:transport-any
+- shell:<cmd> / exec:<cmd>：由 handler(cmd) -> bytes 生成输出，写完即关闭连接
+- sync: RECV：从 files 字典（远端路径 -> bytes）读取
+默认 handler：`screencap` 返回 raw 帧（16 字节头 + RGBA），`screencap -p` 返回 PNG，`input ...` 记入 inputs。
+"""
+from __future__ import annotations
+
+import socketserver
+import struct
+import threading
+from typing import Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+
+def make_raw_screencap(w: int, h: int, fill=(0, 0, 0, 255)) -> bytes:
+    rgba = np.empty((h, w, 4), np.uint8)
+    rgba[:] = fill
+    return struct.pack("<IIII", w, h, 1, 1) + rgba.tobytes()
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    server: "_Server"
+
+    def _recv_exact(self, n: int) -> bytes:
+        buf = b""
+        while len(buf) < n:
+            chunk = self.request.recv(n - len(buf))
+            if not chunk:
+                raise ConnectionError("client closed")
+            buf += chunk
+        return buf
+
+    def _recv_request(self) -> str:
+        n = int(self._recv_exact(4), 16)
+        return self._recv_exact(n).decode("utf-8")
+
+    def _okay(self, block: Optional[bytes] = None):
+        out = b"OKAY"
+        if block is not None:
+            out += f"{len(block):04x}".encode("ascii") + block
+        self.request.sendall(out)
+
+    def _fail(self, msg: str):
+        data = msg.encode("utf-8")
+        self.request.sendall(b"FAIL" + f"{len(data):04x}".encode("ascii") + data)
+
+    def handle(self):
+        fake: FakeAdbServer = self.server.fake
+        try:
+            req = self._recv_request()
+            fake._log(req)
+            if req == "host:version":
+                return self._okay(f"{fake.version:04x}".encode("ascii"))
+            if req == "host:devices":
+                return self._okay("".join(f"{s}\tdevice\n" for s in fake.serials).encode("utf-8"))
+            if req.startswith("host:transport"):
+                serial = req.split(":", 2)[2] if req.startswith("host:transport:") else None
+                if serial is not None and serial not in fake.serials:
+                    return self._fail(f"device '{serial}' not found")
+                if not fake.serials:
+                    return self._fail("no devices/emulators found")
+                self._okay()
+                self._device_service(fake, self._recv_request())
+                return
+            self._fail(f"unknown host service: {req}")
+        except ConnectionError:
+            pass
+
+    def _device_service(self, fake: "FakeAdbServer", service: str):
+        fake._log(service)
+        if service.startswith(("shell:", "exec:")):
+            cmd = service.split(":", 1)[1]
+            self._okay()
+            self.request.sendall(fake.handler(cmd))
+            return
+        if service == "sync:":
+            self._okay()
+            self._sync_loop(fake)
+            return
+        self._fail(f"unknown service: {service}")
+
+    def _sync_loop(self, fake: "FakeAdbServer"):
+        while True:
+            head = self._recv_exact(8)
+            kind, n = head[:4], struct.unpack("<I", head[4:])[0]
+            if kind == b"QUIT":
+                return
+            path = self._recv_exact(n).decode("utf-8")
+            if kind != b"RECV":
+                return
+            fake._log(f"RECV {path}")
+            data = fake.files.get(path)
+            if data is None:
+                msg = b"No such file or directory"
+                self.request.sendall(b"FAIL" + struct.pack("<I", len(msg)) + msg)
+                continue
+            for i in range(0, len(data), fake.sync_chunk):
+                chunk = data[i:i + fake.sync_chunk]
+                self.request.sendall(b"DATA" + struct.pack("<I", len(chunk)) + chunk)
+            self.request.sendall(b"DONE" + struct.pack("<I", 0))
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    fake: "FakeAdbServer"
+
+
+class FakeAdbServer:
+    def __init__(self, serials=("fake-0001",), screen=(320, 144),
+                 handler: Optional[Callable[[str], bytes]] = None, files: Optional[Dict[str, bytes]] = None,
+                 version: int = 41, sync_chunk: int = 64 * 1024):
+        self.serials = list(serials)
+        self.screen = tuple(screen)
+        self.handler = handler or self._default_handler
+        self.files: Dict[str, bytes] = dict(files or {})
+        self.version = int(version)
+        self.sync_chunk = int(sync_chunk)
+        self.services: List[str] = []   # 收到的全部请求（含 host:*）
+        self.inputs: List[str] = []     # 收到的 input 命令
+        self._lock = threading.Lock()
+        self._raw = make_raw_screencap(*self.screen, fill=(30, 60, 90, 255))
+        ok, png = cv2.imencode(".png", np.full((self.screen[1], self.screen[0], 3), (90, 60, 30), np.uint8))
+        self._png = png.tobytes()
+        self._server: Optional[_Server] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def _log(self, req: str):
+        with self._lock:
+            self.services.append(req)
+
+    def _default_handler(self, cmd: str) -> bytes:
+        if cmd == "screencap":
+            return self._raw
+        if cmd == "screencap -p":
+            return self._png
+        if cmd.startswith("input "):
+            with self._lock:
+                self.inputs.append(cmd)
+            return b""
+        if cmd.startswith("echo "):
+            return cmd[5:].encode("utf-8") + b"\n"
+        return b""
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> "FakeAdbServer":
+        self._server = _Server(("127.0.0.1", 0), _Handler)
+        self._server.fake = self
+        self._thread = threading.Thread(target=self._server.serve_forever, name="FakeAdbServer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
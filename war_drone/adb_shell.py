@@ -0,0 +1,154 @@
+"""
+常驻 adb shell 会话：
+- 启动一次 `adb shell`，之后把命令写进它的 stdin，省掉每次 fork adb 进程的 80~200ms
+- 每批命令末尾追加 echo 结束标记，读到标记即视为本批执行完毕（一次往返）
+- 会话进程意外退出/超时会自动重建，调用方无感
+"""
+from __future__ import annotations
+
+import itertools
+import queue
+import subprocess
+import threading
+import time
+from typing import List, Optional, Sequence, Tuple
+
+_EOC = "__WD_EOC_"
+
+
+def tap_cmd(x: int, y: int) -> str:
+    return f"input tap {int(x)} {int(y)}"
+
+
+def swipe_cmd(start: Tuple[int, int], end: Tuple[int, int], duration_s: float = 0.3) -> str:
+    x1, y1 = start
+    x2, y2 = end
+    dur_ms = int(max(1, float(duration_s) * 1000))
+    return f"input swipe {int(x1)} {int(y1)} {int(x2)} {int(y2)} {dur_ms}"
+
+
+def sleep_cmd(seconds: float) -> str:
+    # toybox sleep 支持小数秒
+    return f"sleep {max(0.0, float(seconds)):.3f}"
+
+
+def join_cmds(cmds: Sequence[str]) -> str:
+    return "; ".join(c.strip() for c in cmds if c and c.strip())
+
+
+class AdbShellSession:
+    """线程安全的常驻 shell 会话；base_cmd 形如 [adb, -s, serial, "shell"]。"""
+
+    def __init__(self, base_cmd: List[str], default_timeout: float = 5.0):
+        self.base_cmd = list(base_cmd)
+        self.default_timeout = float(default_timeout)
+        self._lock = threading.Lock()
+        self._proc: Optional[subprocess.Popen] = None
+        self._lines: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._seq = itertools.count(1)
+        self.restarts = 0
+
+    # ---------- 进程管理 ----------
+
+    def _start(self):
+        self._proc = subprocess.Popen(
+            self.base_cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            bufsize=0,
+        )
+        self._lines = queue.Queue()
+        threading.Thread(
+            target=self._pump, args=(self._proc, self._lines), name="AdbShellReader", daemon=True
+        ).start()
+
+    @staticmethod
+    def _pump(proc: subprocess.Popen, lines: "queue.Queue[Optional[str]]"):
+        try:
+            for raw in iter(proc.stdout.readline, b""):
+                lines.put(raw.decode("utf-8", errors="ignore").rstrip("\r\n"))
+        except Exception:
+            pass
+        finally:
+            lines.put(None)  # EOF
+
+    def _ensure(self):
+        if self._proc is None or self._proc.poll() is not None:
+            if self._proc is not None:
+                self.restarts += 1
+            self._start()
+
+    def _kill(self):
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            if proc.stdin:
+                proc.stdin.close()
+        except Exception:
+            pass
+        try:
+            proc.kill()
+            proc.wait(timeout=2.0)
+        except Exception:
+            pass
+
+    @property
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    # ---------- 执行 ----------
+
+    def run(self, cmd: str, timeout: Optional[float] = None) -> str:
+        return self.run_batch([cmd], timeout=timeout)
+
+    def run_batch(self, cmds: Sequence[str], timeout: Optional[float] = None) -> str:
+        """
+        一次往返执行多条命令（按顺序），返回合并后的输出文本。
+        超时或会话断开时抛 TimeoutError / RuntimeError，并在下次调用时重建会话。
+        """
+        body = join_cmds(cmds)
+        timeout = self.default_timeout if timeout is None else float(timeout)
+        with self._lock:
+            self._ensure()
+            marker = f"{_EOC}{next(self._seq)}__"
+            line = f"{body}; echo {marker}\n" if body else f"echo {marker}\n"
+            try:
+                self._proc.stdin.write(line.encode("utf-8"))
+                self._proc.stdin.flush()
+            except (BrokenPipeError, OSError) as e:
+                self._kill()
+                raise RuntimeError(f"adb shell 会话已断开: {e}") from e
+
+            out: List[str] = []
+            deadline = time.monotonic() + timeout
+            while True:
+                remain = deadline - time.monotonic()
+                if remain <= 0:
+                    self._kill()
+                    raise TimeoutError(f"adb shell 会话执行超时: {body[:80]}")
+                try:
+                    got = self._lines.get(timeout=remain)
+                except queue.Empty:
+                    continue
+                if got is None:
+                    self._kill()
+                    raise RuntimeError("adb shell 会话意外退出")
+                if got.endswith(marker):
+                    # 命令输出可能没有换行，标记会贴在最后一行末尾
+                    head = got[: -len(marker)]
+                    if head:
+                        out.append(head)
+                    return "\n".join(out)
+                out.append(got)
+
+    def close(self):
+        with self._lock:
+            self._kill()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,276 @@
+"""
+ADB 线协议客户端：直接用 socket 连本机 adb server（默认 127.0.0.1:5037），不再每次 fork adb 进程。
+- host:transport:<serial> / host:transport-any 选定设备
+- shell:<cmd> / exec:<cmd> 执行命令，输出 recv_into 直接写进预分配缓冲（按上次大小预估，避免反复扩容）
+- sync: RECV 拉文件（sync 连接常驻复用）
+- 连接池：提前完成 transport 切换的空闲 socket，热路径只剩“发服务名 + 读结果”
+
+协议格式：请求为 4 位十六进制长度 + 内容；应答 OKAY 或 FAIL + 4 位十六进制长度 + 错误信息。
+"""
+from __future__ import annotations
+
+import socket
+import struct
+import threading
+from typing import Dict, List, Optional
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 5037
+_SYNC_CHUNK = 64 * 1024
+
+
+class AdbWireError(RuntimeError):
+    pass
+
+
+def encode_request(payload: str) -> bytes:
+    data = payload.encode("utf-8")
+    return f"{len(data):04x}".encode("ascii") + data
+
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray(n)
+    view = memoryview(buf)
+    got = 0
+    while got < n:
+        k = sock.recv_into(view[got:])
+        if not k:
+            raise AdbWireError(f"adb server 提前断开（期望 {n} 字节，收到 {got}）")
+        got += k
+    return bytes(buf)
+
+
+def _read_status(sock: socket.socket, what: str):
+    status = _recv_exact(sock, 4)
+    if status == b"OKAY":
+        return
+    if status == b"FAIL":
+        n = int(_recv_exact(sock, 4), 16)
+        msg = _recv_exact(sock, n).decode("utf-8", errors="ignore")
+        raise AdbWireError(f"{what} 失败: {msg}")
+    raise AdbWireError(f"{what} 应答异常: {status!r}")
+
+
+def _read_hex_block(sock: socket.socket) -> bytes:
+    n = int(_recv_exact(sock, 4), 16)
+    return _recv_exact(sock, n)
+
+
+def read_to_eof(sock: socket.socket, size_hint: int = 0) -> bytearray:
+    """读到对端关闭，数据直接写进 bytearray（不足时翻倍扩容），返回截断到实际长度的缓冲。"""
+    buf = bytearray(max(size_hint + 4096, 64 * 1024))  # 留余量：刚好装满时不必为读 EOF 扩容
+    view = memoryview(buf)
+    got = 0
+    while True:
+        if got == len(buf):
+            view.release()
+            buf.extend(bytes(len(buf)))
+            view = memoryview(buf)
+        k = sock.recv_into(view[got:])
+        if not k:
+            break
+        got += k
+    view.release()
+    del buf[got:]
+    return buf
+
+
+class AdbWireClient:
+    """
+    线程安全：每次调用独占一条 socket（transport 切换后的连接只能承载一个服务）。
+    pool_size 条已切好 transport 的空闲连接在后台补齐。
+    """
+
+    def __init__(self, serial: Optional[str] = None, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 timeout: float = 10.0, pool_size: int = 2):
+        self.serial = serial
+        self.host = host
+        self.port = int(port)
+        self.timeout = float(timeout)
+        self.pool_size = max(0, int(pool_size))
+        self._pool: List[socket.socket] = []
+        self._pool_lock = threading.Lock()
+        self._refilling = False
+        self._sync: Optional[socket.socket] = None
+        self._sync_lock = threading.Lock()
+        self._size_hint: Dict[str, int] = {}
+        self.connects = 0  # 新建连接数（含池补充），用于观察复用情况
+
+    # ---------- 连接 ----------
+
+    def _connect(self) -> socket.socket:
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        except OSError as e:
+            raise AdbWireError(f"无法连接 adb server {self.host}:{self.port}（先执行 adb start-server）: {e}") from e
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.connects += 1
+        return sock
+
+    def _host_request(self, payload: str) -> socket.socket:
+        sock = self._connect()
+        try:
+            sock.sendall(encode_request(payload))
+            _read_status(sock, payload)
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+    def _transported(self) -> socket.socket:
+        target = f"host:transport:{self.serial}" if self.serial else "host:transport-any"
+        return self._host_request(target)
+
+    def _acquire(self) -> socket.socket:
+        sock = None
+        with self._pool_lock:
+            if self._pool:
+                sock = self._pool.pop()
+        if self.pool_size:
+            self._refill_async()
+        return sock if sock is not None else self._transported()
+
+    def _refill_async(self):
+        with self._pool_lock:
+            if self._refilling or len(self._pool) >= self.pool_size:
+                return
+            self._refilling = True
+        threading.Thread(target=self._refill, name="AdbWirePool", daemon=True).start()
+
+    def _refill(self):
+        try:
+            while True:
+                with self._pool_lock:
+                    if len(self._pool) >= self.pool_size:
+                        return
+                sock = self._transported()
+                with self._pool_lock:
+                    self._pool.append(sock)
+        except Exception:
+            pass  # 设备暂不可用：下次 _acquire 直接新建并抛出真实错误
+        finally:
+            with self._pool_lock:
+                self._refilling = False
+
+    def prewarm(self):
+        """同步补满连接池（启动时调用，首帧不付连接开销）。"""
+        self._refill()
+
+    def close(self):
+        with self._pool_lock:
+            pool, self._pool = self._pool, []
+        for s in pool:
+            s.close()
+        with self._sync_lock:
+            self._close_sync()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- host 服务 ----------
+
+    def version(self) -> int:
+        sock = self._host_request("host:version")
+        try:
+            return int(_read_hex_block(sock), 16)
+        finally:
+            sock.close()
+
+    def devices(self) -> List[str]:
+        sock = self._host_request("host:devices")
+        try:
+            text = _read_hex_block(sock).decode("utf-8", errors="ignore")
+        finally:
+            sock.close()
+        return [ln.split("\t")[0] for ln in text.splitlines() if "\tdevice" in ln]
+
+    # ---------- 设备服务 ----------
+
+    def open(self, service: str) -> socket.socket:
+        """打开设备服务（如 "shell:getevent -lt"），返回 socket，由调用方读取并关闭。"""
+        sock = self._acquire()
+        try:
+            sock.sendall(encode_request(service))
+            _read_status(sock, service)
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+    def _run(self, service: str, timeout: Optional[float]) -> bytearray:
+        sock = self.open(service)
+        try:
+            sock.settimeout(self.timeout if timeout is None else timeout)
+            out = read_to_eof(sock, self._size_hint.get(service, 0))
+        except socket.timeout as e:
+            raise TimeoutError(f"adb {service[:80]} 超时") from e
+        finally:
+            sock.close()
+        self._size_hint[service] = len(out)
+        return out
+
+    def exec_out(self, cmd: str, timeout: Optional[float] = None) -> bytearray:
+        """exec:（二进制安全，无 pty 换行转换），对应 `adb exec-out`。"""
+        return self._run(f"exec:{cmd}", timeout)
+
+    def shell(self, cmd: str, timeout: Optional[float] = None) -> bytearray:
+        """shell:（stdout/stderr 合并），对应 `adb shell`。"""
+        return self._run(f"shell:{cmd}", timeout)
+
+    # ---------- sync ----------
+
+    def _close_sync(self):
+        if self._sync is not None:
+            try:
+                self._sync.sendall(b"QUIT" + struct.pack("<I", 0))
+            except OSError:
+                pass
+            self._sync.close()
+            self._sync = None
+
+    def _recv_file(self, sock: socket.socket, remote: str, sink) -> int:
+        path = remote.encode("utf-8")
+        sock.sendall(b"RECV" + struct.pack("<I", len(path)) + path)
+        total = 0
+        buf = bytearray(_SYNC_CHUNK)
+        view = memoryview(buf)
+        while True:
+            head = _recv_exact(sock, 8)
+            kind, n = head[:4], struct.unpack("<I", head[4:])[0]
+            if kind == b"DONE":
+                return total
+            if kind == b"FAIL":
+                raise AdbWireError(f"pull {remote} 失败: {_recv_exact(sock, n).decode('utf-8', errors='ignore')}")
+            if kind != b"DATA" or n > _SYNC_CHUNK:
+                raise AdbWireError(f"sync 应答异常: {kind!r} {n}")
+            got = 0
+            while got < n:
+                k = sock.recv_into(view[got:n])
+                if not k:
+                    raise AdbWireError("sync 连接提前断开")
+                got += k
+            sink(view[:n])
+            total += n
+
+    def _pull(self, remote: str, sink, timeout: Optional[float]) -> int:
+        with self._sync_lock:
+            try:
+                if self._sync is None:
+                    self._sync = self.open("sync:")
+                self._sync.settimeout(self.timeout if timeout is None else timeout)
+                return self._recv_file(self._sync, remote, sink)
+            except Exception:
+                self._close_sync()  # 出错后连接状态不确定，下次重建
+                raise
+
+    def pull(self, remote: str, local: str, timeout: Optional[float] = None) -> int:
+        with open(local, "wb") as f:
+            return self._pull(remote, f.write, timeout)
+
+    def pull_bytes(self, remote: str, timeout: Optional[float] = None) -> bytearray:
+        out = bytearray()
+        self._pull(remote, out.extend, timeout)
+        return out
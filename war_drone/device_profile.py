@@ -0,0 +1,134 @@
+"""
+设备分辨率档案：配置与模板都按基准机（configs 里的 screen，小米14 2670x1200）编写，
+启动时按连接设备的分辨率（adb shell wm size）生成档案，一次性缩放像素量与模板。
+- 相对坐标（coords / roi_offset_pct）不变；像素量（roi_half_size、local_search_pad）与模板按 scale 缩放
+- scale 缺省按高度比（横屏游戏 UI 以高度为基准，宽度多出来的部分是两侧留白）；可按分辨率在
+  device_profiles 里覆盖 scale / coords（异形屏、模拟器黑边等）
+- 缩放后的模板库按 分辨率 + scale 存成独立 .npz，热路径不再缩放
+- 细边缘模板（按钮文字）非整数倍缩放后边缘会错位、分数下降；可在 device_profiles 里给 templates_dir，
+  该目录下同名的原生截取模板优先使用且不缩放
+"""
+from __future__ import annotations
+
+import copy
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+_SIZE_RE = re.compile(r"(Physical|Override) size:\s*(\d+)\s*x\s*(\d+)")
+SCALE_BY = ("height", "width", "min")
+
+
+def parse_wm_size(text: str) -> Tuple[int, int]:
+    """解析 `wm size` 输出；有 Override size 时以它为准。返回 (w, h)（设备自然方向）。"""
+    sizes = {kind: (int(w), int(h)) for kind, w, h in _SIZE_RE.findall(text)}
+    if not sizes:
+        raise ValueError(f"无法解析 wm size 输出: {text!r}")
+    return sizes.get("Override", sizes.get("Physical"))
+
+
+def orient_like(size: Tuple[int, int], ref: Tuple[int, int]) -> Tuple[int, int]:
+    """把 (w, h) 转成与 ref 相同的横 / 竖方向（wm size 报的是自然方向，游戏是横屏）。"""
+    w, h = size
+    if (w >= h) != (ref[0] >= ref[1]):
+        return h, w
+    return w, h
+
+
+def size_key(wh: Tuple[int, int]) -> str:
+    return f"{int(wh[0])}x{int(wh[1])}"
+
+
+@dataclass
+class DeviceProfile:
+    base: Tuple[int, int]     # 配置编写时的分辨率
+    size: Tuple[int, int]     # 目标设备分辨率（与 base 同方向）
+    scale: float              # 像素量 / 模板的缩放比
+    coords: Dict[str, Any] = field(default_factory=dict)  # 该分辨率下覆盖的锚点
+    templates_dir: Optional[str] = None  # 该分辨率原生截取的模板（同名优先，不缩放）
+
+    @classmethod
+    def from_cfg(cls, cfg: Dict, size: Tuple[int, int]) -> "DeviceProfile":
+        """按配置 screen 与 device_profiles 生成档案；size 可为设备自然方向。"""
+        base = (int(cfg["screen"]["width"]), int(cfg["screen"]["height"]))
+        size = orient_like((int(size[0]), int(size[1])), base)
+        over = dict(cfg.get("device_profiles", {}).get(size_key(size), {}))
+        scale_by = over.get("scale_by", cfg.get("device_scale_by", "height"))
+        if scale_by not in SCALE_BY:
+            raise ValueError(f"device_scale_by 只能是 {SCALE_BY}: {scale_by}")
+        sx, sy = size[0] / base[0], size[1] / base[1]
+        auto = {"height": sy, "width": sx, "min": min(sx, sy)}[scale_by]
+        return cls(base, size, float(over.get("scale", auto)), dict(over.get("coords", {})),
+                   over.get("templates_dir"))
+
+    @property
+    def identity(self) -> bool:
+        return (self.size == self.base and abs(self.scale - 1.0) < 1e-6 and not self.coords
+                and not self.templates_dir)
+
+    @property
+    def key(self) -> str:
+        return f"{size_key(self.size)}_s{self.scale:.3f}"
+
+    def px(self, v) -> int:
+        return max(1, int(round(float(v) * self.scale)))
+
+    def half_size(self, hs) -> Tuple[int, int]:
+        return self.px(hs[0]), self.px(hs[1])
+
+    def apply(self, cfg: Dict) -> Dict:
+        """返回缩放后的配置副本：screen / coords / 各像素量。"""
+        out = copy.deepcopy(cfg)
+        out["screen"] = {**out.get("screen", {}), "width": self.size[0], "height": self.size[1]}
+        out["coords"] = {**out.get("coords", {}), **self.coords}
+        for s in out.get("extra_states", []):
+            if "roi_half_size" in s:
+                s["roi_half_size"] = list(self.half_size(s["roi_half_size"]))
+            for t in s.get("templates", []):
+                if isinstance(t, dict) and "roi_half_size" in t:
+                    t["roi_half_size"] = list(self.half_size(t["roi_half_size"]))
+        if out.get("local_search_pad"):
+            out["local_search_pad"] = self.px(out["local_search_pad"])
+        return out
+
+    def native_path(self, path: str) -> Optional[str]:
+        """templates_dir 下的同名原生模板（存在时），否则 None。缓存按基准模板的修改时间失效，改原生模板后需删缓存。"""
+        if not self.templates_dir:
+            return None
+        p = os.path.join(self.templates_dir, os.path.basename(path))
+        return p if os.path.exists(p) else None
+
+    def load_template(self, path: str, loader):
+        """loader(path) -> (bgr, mask)：有原生模板用原生的，否则读基准模板并缩放。"""
+        native = self.native_path(path)
+        if native is not None:
+            return loader(native)
+        return self.scale_template(*loader(path))
+
+    def scale_template(self, bgr: Optional[np.ndarray], mask: Optional[np.ndarray]):
+        """模板 / mask 缩放到设备分辨率（mask 用最近邻，保持二值）。"""
+        if bgr is None or abs(self.scale - 1.0) < 1e-6:
+            return bgr, mask
+        h, w = bgr.shape[:2]
+        size = (max(1, int(round(w * self.scale))), max(1, int(round(h * self.scale))))
+        interp = cv2.INTER_AREA if self.scale < 1.0 else cv2.INTER_LINEAR
+        bgr = cv2.resize(bgr, size, interpolation=interp)
+        if mask is not None:
+            mask = cv2.resize(mask, size, interpolation=cv2.INTER_NEAREST)
+        return bgr, mask
+
+    def cache_path(self, cache: str) -> str:
+        """每个 分辨率 + scale 一份模板库缓存：dir/ → dir/templates_<key>.npz；a.npz → a_<key>.npz。"""
+        root, ext = os.path.splitext(cache)
+        if ext.lower() != ".npz":
+            return os.path.join(cache, f"templates_{self.key}.npz")
+        return f"{root}_{self.key}{ext}"
+
+    def describe(self) -> str:
+        return (f"{size_key(self.size)}（基准 {size_key(self.base)}，scale={self.scale:.3f}"
+                f"{'，覆盖 coords ' + ','.join(self.coords) if self.coords else ''}"
+                f"{'，原生模板 ' + self.templates_dir if self.templates_dir else ''}）")
@@ -0,0 +1,119 @@
+"""
+频域归一化互相关（与 cv2.TM_CCORR_NORMED 分数兼容）：大模板 × 大 ROI 时替代空间域 matchTemplate。
+- 模板（乘 mask 后）的频谱按 ROI 尺寸预先算好，匹配时只做 ROI 的正变换 + 一次逆变换
+- 多通道：各通道频谱相乘后求和，再做一次逆变换（与 OpenCV 多通道求和一致）
+- 归一化分母：无 mask 时窗口能量用积分图；有 mask 时用 ΣI² 与 mask 的频域互相关
+- 分母为 0 的位置与 OpenCV 相同处理（记 0）；数值误差 ~1e-5
+- choose_backend：对给定 (模板, ROI 尺寸) 做一次微基准，选空间域或频域中较快者
+"""
+from __future__ import annotations
+
+import time
+from typing import Callable, Optional, Tuple
+
+import cv2
+import numpy as np
+
+SPATIAL, FFT = "spatial", "fft"
+BACKENDS = (SPATIAL, FFT, "auto")
+FFT_MIN_GAIN = 1.1  # 频域至少快 10% 才选用（避免抖动导致来回切换）
+
+
+def _channels(img: np.ndarray):
+    return [img] if img.ndim == 2 else cv2.split(img)
+
+
+class FFTCorrelator:
+    """固定模板 + 固定 ROI 尺寸的 CCORR_NORMED 频域实现。"""
+
+    def __init__(self, tmpl: np.ndarray, mask: Optional[np.ndarray], roi_shape: Tuple[int, int]):
+        self.th, self.tw = tmpl.shape[:2]
+        self.rh, self.rw = int(roi_shape[0]), int(roi_shape[1])
+        if self.th > self.rh or self.tw > self.rw:
+            raise ValueError(f"模板 {self.tw}x{self.th} 大于 ROI {self.rw}x{self.rh}")
+        self.dh, self.dw = cv2.getOptimalDFTSize(self.rh), cv2.getOptimalDFTSize(self.rw)
+        self.channels = 1 if tmpl.ndim == 2 else tmpl.shape[2]
+
+        m = None if mask is None else (mask > 0).astype(np.float32)
+        if m is not None and m.ndim == 3:
+            m = m[..., 0]
+        self.masked = m is not None
+        t_specs, norm2 = [], 0.0
+        for c in _channels(tmpl):
+            tc = c.astype(np.float32)
+            if m is not None:
+                tc = tc * m
+            norm2 += float(np.dot(tc.ravel().astype(np.float64), tc.ravel().astype(np.float64)))
+            t_specs.append(self._spectrum(tc))
+        self.t_specs = t_specs
+        self.t_norm = float(np.sqrt(norm2))
+        self.m_spec = self._spectrum(m) if m is not None else None
+
+    def _spectrum(self, a: np.ndarray) -> np.ndarray:
+        pad = cv2.copyMakeBorder(a, 0, self.dh - a.shape[0], 0, self.dw - a.shape[1], cv2.BORDER_CONSTANT, value=0)
+        return cv2.dft(pad)
+
+    def _corr(self, spec: np.ndarray, t_spec: np.ndarray) -> np.ndarray:
+        return cv2.mulSpectrums(spec, t_spec, 0, conjB=True)
+
+    def _inverse(self, spec: np.ndarray) -> np.ndarray:
+        out = cv2.idft(spec, flags=cv2.DFT_SCALE | cv2.DFT_REAL_OUTPUT)
+        return out[:self.rh - self.th + 1, :self.rw - self.tw + 1]
+
+    def match(self, roi: np.ndarray) -> np.ndarray:
+        """返回与 cv2.matchTemplate(roi, tmpl, TM_CCORR_NORMED[, mask]) 同尺寸的结果图（float32）。"""
+        if roi.shape[:2] != (self.rh, self.rw):
+            raise ValueError(f"ROI 尺寸 {roi.shape[:2]} 与预计算的 {(self.rh, self.rw)} 不符")
+        num_spec = None
+        energy = None
+        for c, t_spec in zip(_channels(roi), self.t_specs):
+            cf = c.astype(np.float32)
+            s = self._corr(self._spectrum(cf), t_spec)
+            num_spec = s if num_spec is None else num_spec + s
+            sq = cf * cf
+            energy = sq if energy is None else energy + sq
+        num = self._inverse(num_spec)
+
+        if self.masked:
+            win = self._inverse(self._corr(self._spectrum(energy), self.m_spec))
+        else:
+            ii = cv2.integral(energy, sdepth=cv2.CV_64F)
+            th, tw = self.th, self.tw
+            win = (ii[th:, tw:] - ii[:-th, tw:] - ii[th:, :-tw] + ii[:-th, :-tw]).astype(np.float32)
+        den = np.sqrt(np.maximum(win, 0.0)) * np.float32(self.t_norm)
+
+        # 与 OpenCV 一致：|num| < den 正常归一化；略超（数值误差）截为 ±1；其余（含 den≈0）记 0
+        out = np.zeros_like(num)
+        ok = den > 1e-3
+        np.divide(num, den, out=out, where=ok)
+        over = ok & (np.abs(out) >= 1.0)
+        out[over] = np.where(np.abs(out[over]) < 1.125, np.sign(out[over]), 0.0)
+        return out
+
+
+def _best_time(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000.0
+
+
+def choose_backend(tmpl: np.ndarray, mask: Optional[np.ndarray], roi_shape: Tuple[int, int],
+                   spatial: Callable[[np.ndarray], np.ndarray], repeat: int = 3
+                   ) -> Tuple[str, Optional[FFTCorrelator], float, float]:
+    """
+    一次性微基准：在随机 ROI 上比较 spatial(roi) 与频域匹配的耗时。
+    返回 (后端, 频域相关器或 None, 空间域 ms, 频域 ms)。
+    """
+    shape = tuple(roi_shape[:2]) + tmpl.shape[2:]
+    roi = np.random.default_rng(0).integers(0, 256, shape, dtype=np.uint8).astype(tmpl.dtype)
+    corr = FFTCorrelator(tmpl, mask, roi_shape)
+    spatial(roi)  # 预热
+    corr.match(roi)
+    t_sp = _best_time(lambda: spatial(roi), repeat)
+    t_fft = _best_time(lambda: corr.match(roi), repeat)
+    if t_fft * FFT_MIN_GAIN < t_sp:
+        return FFT, corr, t_sp, t_fft
+    return SPATIAL, None, t_sp, t_fft
@@ -0,0 +1,155 @@
+"""
+共享帧对象：包装一帧 BGR，按需计算并缓存灰度 / 金字塔层 / 边缘图，
+同一轮循环里的多个识别器共用，避免各自重复 cvtColor / 缩放 / Canny。
+- Frame(img) 不复制原图；所有派生图只算一次
+- level(n)：第 n 层金字塔（0=原图，1=1/2，2=1/4 …），INTER_AREA 逐层缩小
+- edges(level)：灰度 → 3x3 高斯 → Canny（与 TemplateStateDetector 预处理一致）；crop(kind="edges") 只算 ROI
+- crop(..., region=)：重叠的 ROI 共用一块合并区域（merge_boxes），区域只预处理一次，各 ROI 拿视图
+- 识别器入口用 as_frame() 同时接受 ndarray 和 Frame
+"""
+from __future__ import annotations
+
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+EDGE_LO, EDGE_HI = 60, 120
+
+Box = Tuple[int, int, int, int]  # (x1, y1, x2, y2) 原图像素坐标
+
+
+class Frame:
+    __slots__ = ("bgr", "_cache", "_lock")
+
+    def __init__(self, bgr: np.ndarray):
+        self.bgr = bgr
+        self._cache: Dict[Tuple, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def shape(self):
+        return self.bgr.shape
+
+    @property
+    def wh(self) -> Tuple[int, int]:
+        return self.bgr.shape[1], self.bgr.shape[0]
+
+    def _memo(self, key: Tuple, fn):
+        # 计算放在锁外：多个线程并发评估不同 ROI 时互不阻塞（同一 key 偶尔重复计算一次，结果相同）
+        out = self._cache.get(key)
+        if out is None:
+            out = fn()
+            with self._lock:
+                out = self._cache.setdefault(key, out)
+        return out
+
+    # ---------- 派生图 ----------
+
+    def level(self, n: int = 0, gray: bool = False) -> np.ndarray:
+        """金字塔第 n 层（边长 / 2**n）；gray=True 返回灰度层。"""
+        if n <= 0:
+            return self.gray if gray else self.bgr
+
+        def build():
+            prev = self.level(n - 1, gray)
+            h, w = prev.shape[:2]
+            return cv2.resize(prev, (max(1, w // 2), max(1, h // 2)), interpolation=cv2.INTER_AREA)
+        return self._memo(("level", n, gray), build)
+
+    @property
+    def gray(self) -> np.ndarray:
+        return self._memo(("gray",), lambda: cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY)
+                          if self.bgr.ndim == 3 else self.bgr)
+
+    def edges(self, n: int = 0) -> np.ndarray:
+        return self._memo(("edges", n), lambda: _canny(self.level(n, gray=True)))
+
+    def resized(self, size: Tuple[int, int]) -> np.ndarray:
+        """缩放到指定 (w, h)（预览 / 解码尺寸对齐），同尺寸直接返回原图。"""
+        w, h = int(size[0]), int(size[1])
+        if (w, h) == self.wh:
+            return self.bgr
+        return self._memo(("resized", w, h), lambda: cv2.resize(self.bgr, (w, h), interpolation=cv2.INTER_AREA))
+
+    # ---------- 裁剪（视图，不复制） ----------
+
+    def crop(self, x1: int, y1: int, x2: int, y2: int, kind: str = "bgr", n: int = 0,
+             region: Optional[Box] = None) -> np.ndarray:
+        """
+        按原图坐标裁剪；kind 为 bgr / gray / edges。
+        - n=0 的 bgr 返回视图；gray / edges 只在该框内做转换 / Canny（整帧 Canny 在 2670x1200 上约 25ms），按框缓存
+        - n>0 返回该框的局部金字塔第 n 层（框内逐层减半，不缩放整帧），层内坐标 = 框内坐标 // 2**n
+        - region 为包含该框的合并区域时：区域整体预处理一次（按区域缓存），返回其中的视图。
+          n>0 时框在区域内的偏移按 2**n 取整，层内坐标与单独裁剪相比最多差 1 个粗层像素
+        """
+        if region is not None and tuple(region) != (x1, y1, x2, y2):
+            rx1, ry1, rx2, ry2 = region
+            base = self.crop(rx1, ry1, rx2, ry2, kind, n)
+            s = 2 ** max(0, n)
+            return base[(y1 - ry1) // s:(y2 - ry1) // s, (x1 - rx1) // s:(x2 - rx1) // s]
+        if n > 0:
+            def build_level():
+                prev = self.crop(x1, y1, x2, y2, "gray" if kind == "edges" else kind, n - 1)
+                h, w = prev.shape[:2]
+                return cv2.resize(prev, (max(1, w // 2), max(1, h // 2)), interpolation=cv2.INTER_AREA)
+            base_kind = "gray" if kind == "edges" else kind
+            lvl = self._memo(("roi", base_kind, n, x1, y1, x2, y2), build_level)
+            if kind != "edges":
+                return lvl
+            return self._memo(("roi", "edges", n, x1, y1, x2, y2), lambda: _canny(lvl))
+        if kind == "edges":
+            return self._memo(("roi", "edges", 0, x1, y1, x2, y2), lambda: _canny(self.crop(x1, y1, x2, y2, "gray")))
+        if kind == "gray":
+            # 整帧灰度已算过就取视图，否则只转换该框（结果逐像素相同）
+            full = self._cache.get(("gray",))
+            if full is not None or self.bgr.ndim == 2:
+                return self.gray[y1:y2, x1:x2]
+            return self._memo(("roi", "gray", 0, x1, y1, x2, y2),
+                              lambda: cv2.cvtColor(self.bgr[y1:y2, x1:x2], cv2.COLOR_BGR2GRAY))
+        return self.bgr[y1:y2, x1:x2]
+
+
+def merge_boxes(boxes: Iterable[Box]) -> Dict[Box, Box]:
+    """
+    把重叠的框合并为区域，返回 {框: 所属区域}。
+    只在合并后的外接矩形面积不超过两者单独面积之和时合并（预处理的像素不会变多）。
+    """
+    regions: List[Box] = []
+    for b in dict.fromkeys(boxes):
+        cur = b
+        merged = True
+        while merged:
+            merged = False
+            for i, r in enumerate(regions):
+                if _overlap(cur, r) and _area(_union(cur, r)) <= _area(cur) + _area(r):
+                    cur = _union(cur, regions.pop(i))
+                    merged = True
+                    break
+        regions.append(cur)
+    return {b: next(r for r in regions if _contains(r, b)) for b in dict.fromkeys(boxes)}
+
+
+def _area(b: Box) -> int:
+    return max(0, b[2] - b[0]) * max(0, b[3] - b[1])
+
+
+def _union(a: Box, b: Box) -> Box:
+    return min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])
+
+
+def _overlap(a: Box, b: Box) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def _contains(r: Box, b: Box) -> bool:
+    return r[0] <= b[0] and r[1] <= b[1] and r[2] >= b[2] and r[3] >= b[3]
+
+
+def _canny(gray: np.ndarray) -> np.ndarray:
+    return cv2.Canny(cv2.GaussianBlur(gray, (3, 3), 0), EDGE_LO, EDGE_HI)
+
+
+def as_frame(img: Union[np.ndarray, Frame]) -> Frame:
+    return img if isinstance(img, Frame) else Frame(img)
@@ -0,0 +1,133 @@
+"""
+帧变化检测：画面没变时复用上一次识别结果，跳过 OCR / 模板匹配。
+- mad  ：灰度缩略图按 grid 分格，各格平均绝对差的最大值（0~255），<= thresh 视为未变化；
+         取最大格而不是全图平均，按钮 / 小弹窗这类局部变化不会被大片未变区域稀释
+- dhash：差分哈希（(hash_size+1)×hash_size 灰度图左右比较），汉明距离 <= thresh 视为未变化
+         只有 hash_size² 位，只反映整体结构，局部变化（按钮出现）常在噪声范围内，实机优先用 mad
+- 参照帧是“上次真正识别时”的缩略图，缓慢渐变累积超过阈值也会触发重算
+- max_skip：连续复用达到上限后强制重算一次（0=不限）
+"""
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Dict, Optional, Union
+
+import cv2
+import numpy as np
+
+from war_drone.frame import Frame
+
+METHODS = ("mad", "dhash")
+DEFAULT_THRESH = {"mad": 2.0, "dhash": 3}
+
+
+def thumbnail(img: np.ndarray, size=(64, 36)) -> np.ndarray:
+    """缩成小灰度图（INTER_AREA 自带平均，抗噪）；Frame 直接复用其灰度图。"""
+    if isinstance(img, Frame):
+        img = img.gray
+    g = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    return cv2.resize(g, tuple(size), interpolation=cv2.INTER_AREA)
+
+
+def dhash(img: np.ndarray, hash_size: int = 8) -> np.ndarray:
+    """差分哈希，返回 bool 数组（hash_size*hash_size 位）。"""
+    t = thumbnail(img, (hash_size + 1, hash_size)).astype(np.int16)
+    return (t[:, 1:] > t[:, :-1]).ravel()
+
+
+def mean_abs_diff(a: np.ndarray, b: np.ndarray) -> float:
+    return float(cv2.absdiff(a, b).mean())
+
+
+def cell_abs_diff(a: np.ndarray, b: np.ndarray, grid=(16, 9)) -> float:
+    """按 grid（列, 行）分格求平均绝对差，返回最大的一格；grid=(1, 1) 即全图平均。"""
+    d = cv2.absdiff(a, b).astype(np.float32)
+    return float(cv2.resize(d, tuple(grid), interpolation=cv2.INTER_AREA).max())
+
+
+class FrameChangeDetector:
+    def __init__(self, method: str = "mad", thresh: Optional[float] = None, thumb_size=(64, 36),
+                 hash_size: int = 8, max_skip: int = 20, grid=(16, 9)):
+        if method not in METHODS:
+            raise ValueError(f"未知帧变化检测方法: {method}（可选 {'/'.join(METHODS)}）")
+        self.method = method
+        self.thresh = float(DEFAULT_THRESH[method] if thresh is None else thresh)
+        self.thumb_size = (int(thumb_size[0]), int(thumb_size[1]))
+        self.hash_size = int(hash_size)
+        self.grid = (int(grid[0]), int(grid[1]))
+        self.max_skip = int(max_skip)
+        self._lock = threading.Lock()
+        self._ref = None          # 上次真正识别时的缩略图 / 哈希
+        self._result: Any = None
+        self._has_result = False
+        self._run_skips = 0       # 当前连续复用次数
+        self.checks = 0
+        self.skips = 0
+        self.last_diff = 0.0
+        self.last_skipped = False  # 最近一次 cached() 是否复用了旧结果
+
+    @classmethod
+    def from_cfg(cls, cfg: Union[None, bool, Dict[str, Any], "FrameChangeDetector"]) -> Optional["FrameChangeDetector"]:
+        """配置段 frame_change: {method, thresh, max_skip, thumb_size, hash_size, grid}；None/False/enabled:false 表示关闭。"""
+        if isinstance(cfg, FrameChangeDetector):
+            return cfg
+        if not cfg:
+            return None
+        if cfg is True:
+            return cls()
+        cfg = dict(cfg)
+        if not cfg.pop("enabled", True):
+            return None
+        return cls(**cfg)
+
+    def _signature(self, img: np.ndarray) -> np.ndarray:
+        if self.method == "dhash":
+            return dhash(img, self.hash_size)
+        return thumbnail(img, self.thumb_size)
+
+    def _distance(self, a: np.ndarray, b: np.ndarray) -> float:
+        if self.method == "dhash":
+            return float(np.count_nonzero(a != b))
+        return cell_abs_diff(a, b, self.grid)
+
+    def cached_dbg(self, img: np.ndarray, compute: Callable[[], Any]):
+        """用于返回 (state, dbg) 的识别器：dbg 中附带 cached 标记。"""
+        state, dbg = self.cached(img, compute)
+        return state, dict(dbg, cached=self.last_skipped)
+
+    def reset(self):
+        with self._lock:
+            self._ref = None
+            self._result = None
+            self._has_result = False
+            self._run_skips = 0
+
+    def cached(self, img: np.ndarray, compute: Callable[[], Any]) -> Any:
+        """画面与参照帧差异在阈值内则返回上次结果，否则调用 compute() 并更新参照帧。"""
+        sig = self._signature(img)
+        with self._lock:
+            self.checks += 1
+            if self._has_result and self._ref is not None and self._ref.shape == sig.shape:
+                self.last_diff = self._distance(sig, self._ref)
+                unchanged = self.last_diff <= self.thresh
+                if unchanged and (self.max_skip <= 0 or self._run_skips < self.max_skip):
+                    self._run_skips += 1
+                    self.skips += 1
+                    self.last_skipped = True
+                    return self._result
+            self.last_skipped = False
+        result = compute()
+        with self._lock:
+            self._ref = sig
+            self._result = result
+            self._has_result = True
+            self._run_skips = 0
+        return result
+
+    @property
+    def skip_rate(self) -> float:
+        return self.skips / self.checks if self.checks else 0.0
+
+    def describe(self) -> str:
+        return (f"[FRAME] {self.method} thresh={self.thresh:g} 复用 {self.skips}/{self.checks} "
+                f"({self.skip_rate * 100:.1f}%)")
@@ -0,0 +1,84 @@
+"""
+可插拔帧源：runner 通过 --source 选择取帧方式，便于离线回放基准测试。
+
+--source 写法：
+  adb / adb:png / adb:raw / adb:auto      轮询 adb 截屏
+  screenrecord[:1280x576]                  screenrecord H.264 连续流（可选手机端编码尺寸）
+  scrcpy                                   scrcpy 视频流（需 scrcpy-client）
+  video:<path.mp4>[@fps]                   视频文件回放（默认视频自身帧率）
+  dir:<folder>[@fps]                       数据集图片目录回放（默认尽快输出）
+  fps 写 max 或 0 表示不节流；直接给目录 / .mp4 路径也可以。
+"""
+from __future__ import annotations
+
+import os
+from typing import Optional, Tuple
+
+from war_drone.frames.base import FramePacket, FrameSource
+from war_drone.frames.live import AdbScreencapSource, ScreenrecordSource, ScrcpySource
+from war_drone.frames.replay import DirectorySource, VideoFileSource, list_images
+
+__all__ = [
+    "FramePacket",
+    "FrameSource",
+    "AdbScreencapSource",
+    "ScreenrecordSource",
+    "ScrcpySource",
+    "DirectorySource",
+    "VideoFileSource",
+    "list_images",
+    "open_source",
+    "parse_source_spec",
+]
+
+VIDEO_EXTS = (".mp4", ".mkv", ".avi", ".mov", ".h264")
+
+
+def _split_fps(arg: str) -> Tuple[str, Optional[float]]:
+    if "@" not in arg:
+        return arg, None
+    path, fps = arg.rsplit("@", 1)
+    if fps.lower() in ("max", "0", ""):
+        return path, 0.0
+    return path, float(fps)
+
+
+def parse_source_spec(spec: str) -> Tuple[str, str, Optional[float]]:
+    """'dir:tests/dataset@10' → ('dir', 'tests/dataset', 10.0)"""
+    spec = (spec or "adb").strip()
+    kind, sep, arg = spec.partition(":")
+    if kind in ("adb", "screenrecord", "scrcpy") or (kind in ("video", "dir") and sep):
+        arg, fps = _split_fps(arg)
+        return kind, arg, fps
+    # 直接给路径
+    path, fps = _split_fps(spec)
+    if os.path.isdir(path):
+        return "dir", path, fps
+    if os.path.splitext(path)[1].lower() in VIDEO_EXTS:
+        return "video", path, fps
+    raise ValueError(f"无法识别的帧源: {spec}")
+
+
+def open_source(spec: str, adb=None, decode_size=None, loop: bool = False) -> FrameSource:
+    """
+    按 --source 字符串创建帧源（未 start）。
+    adb：实时帧源需要的 AdbClient；decode_size：screenrecord 解码尺寸 (W, H)。
+    """
+    kind, arg, fps = parse_source_spec(spec)
+    if kind == "adb":
+        if adb is None:
+            raise ValueError("adb 帧源需要 AdbClient")
+        return AdbScreencapSource(adb, mode=arg or None)
+    if kind == "screenrecord":
+        if arg and os.path.isfile(arg):
+            return ScreenrecordSource(source_file=arg, decode_size=decode_size)
+        return ScreenrecordSource(adb=adb, decode_size=decode_size, record_size=arg or None)
+    if kind == "scrcpy":
+        return ScrcpySource(serial=getattr(adb, "serial", None))
+    if kind == "video":
+        if arg.lower().endswith(".h264"):
+            return ScreenrecordSource(source_file=arg, decode_size=decode_size)
+        return VideoFileSource(arg, fps=fps, loop=loop)
+    if kind == "dir":
+        return DirectorySource(arg, fps=fps or 0.0, loop=loop)
+    raise ValueError(f"未知帧源类型: {kind}")
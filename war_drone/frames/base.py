@@ -0,0 +1,112 @@
+"""
+帧源统一接口：
+- FramePacket：一帧图像 + 帧号 + 采集起止时间戳
+- FrameSource：latest() 取最近一帧（不阻塞），next() 取比上次更新的一帧（必要时阻塞/采集）
+- screencap()：与 AdbClient.screencap() 同名，返回 BGR ndarray，旧代码可直接替换
+- FramePacket.frame：包装同一图像的共享 Frame（war_drone.frame），识别器间复用派生图
+- 每个 FramePacket 带一份 FrameTrace（war_drone.latency），下游继续打 detect/decide/inject 时间戳
+"""
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from war_drone.frame import Frame
+from war_drone.latency import FrameTrace
+
+
+@dataclass
+class FramePacket:
+    frame_id: int
+    image: np.ndarray            # BGR
+    t_capture_start: float       # time.time()
+    t_capture_end: float
+    source: str = ""
+    meta: Dict[str, Any] = field(default_factory=dict)
+    trace: Optional[FrameTrace] = None
+
+    @property
+    def timestamp(self) -> float:
+        return self.t_capture_end
+
+    @property
+    def shape(self):
+        return self.image.shape
+
+    @cached_property
+    def frame(self) -> Frame:
+        """共享 Frame（灰度 / 金字塔 / 边缘图按需计算，同一帧的多个识别器共用）。"""
+        return Frame(self.image)
+
+
+class FrameSource:
+    """
+    帧源基类。子类实现其一：
+    - 拉取式：_grab() 同步采集一帧（adb 截屏、目录/视频回放）
+    - 推送式：后台线程产生帧，覆盖 latest()/next()
+    """
+    name = "base"
+    finite = False   # 回放类帧源会结束
+
+    def __init__(self):
+        self._frame_id = 0
+        self._last: Optional[FramePacket] = None
+        self.exhausted = False
+
+    # ---------- 生命周期 ----------
+
+    def start(self) -> "FrameSource":
+        return self
+
+    def stop(self):
+        pass
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ---------- 取帧 ----------
+
+    def _grab(self) -> Optional[np.ndarray]:
+        raise NotImplementedError
+
+    def _packet(self, img: np.ndarray, t0: float, t1: float, p0: Optional[float] = None,
+                decode_ms: float = 0.0, **meta) -> FramePacket:
+        """t0/t1 为 time.time()；p0 为采集开始的 perf_counter（不给则按 t1-t0 反推），decode_ms 为其中的解码耗时。"""
+        self._frame_id += 1
+        p1 = time.perf_counter()
+        if p0 is None:
+            p0 = p1 - (t1 - t0)
+        trace = FrameTrace(self._frame_id, self.name, capture_start=p0, capture_end=p1 - decode_ms / 1000.0)
+        trace.mark("decode", p1)
+        pkt = FramePacket(self._frame_id, img, t0, t1, source=self.name, meta=meta, trace=trace)
+        self._last = pkt
+        return pkt
+
+    def latest(self) -> Optional[FramePacket]:
+        """最近一帧；拉取式帧源尚未采集过时会采集一次。"""
+        if self._last is None:
+            return self.next()
+        return self._last
+
+    def next(self, timeout: float = 5.0) -> Optional[FramePacket]:
+        """比上次返回更新的一帧；回放结束返回 None 并置 exhausted。"""
+        t0, p0 = time.time(), time.perf_counter()
+        img = self._grab()
+        if img is None:
+            return None
+        return self._packet(img, t0, time.time(), p0=p0)
+
+    def screencap(self) -> Optional[np.ndarray]:
+        pkt = self.next()
+        return None if pkt is None else pkt.image
+
+    @property
+    def frame_id(self) -> int:
+        return self._frame_id
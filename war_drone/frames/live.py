@@ -0,0 +1,94 @@
+"""
+实时帧源：adb 截屏（PNG / raw）、screenrecord 屏幕流、scrcpy。
+"""
+from __future__ import annotations
+
+import time
+from typing import Optional
+
+from war_drone.frames.base import FramePacket, FrameSource
+
+
+class AdbScreencapSource(FrameSource):
+    """轮询 adb 截屏；mode 为 png / raw / auto（会设置到 AdbClient.screencap_mode）。"""
+
+    def __init__(self, adb, mode: Optional[str] = None):
+        super().__init__()
+        self.adb = adb
+        if mode and mode != adb.screencap_mode:
+            adb.set_screencap_mode(mode)
+        self.mode = adb.screencap_mode
+        self.name = f"adb:{self.mode}"
+
+    def next(self, timeout: float = 5.0) -> Optional[FramePacket]:
+        t0, p0 = time.time(), time.perf_counter()
+        img = self.adb.screencap()
+        t1 = time.time()
+        if img is None:
+            return None
+        cap = self.adb.last_capture
+        return self._packet(img, t0, t1, p0=p0, decode_ms=cap.decode_ms if cap else 0.0,
+                            capture=cap.describe() if cap else "")
+
+
+class _PushSource(FrameSource):
+    """后台线程产生帧的帧源：next() 等待比上次更新的帧。"""
+
+    def _wait(self, after_id: int, timeout: float):
+        raise NotImplementedError
+
+    def next(self, timeout: float = 5.0) -> Optional[FramePacket]:
+        got = self._wait(self._last_src_id, timeout)
+        if got is None:
+            return None
+        img, ts, src_id = got
+        if img is None or src_id <= self._last_src_id:
+            return None
+        self._last_src_id = src_id
+        # 推送式帧源的“采集开始”取不到，按到达时间记；capture 段即帧在缓冲里等待的时间
+        p_arrive = time.perf_counter() - max(0.0, time.time() - ts)
+        return self._packet(img, ts, ts, p0=p_arrive, src_frame_id=src_id)
+
+
+class ScreenrecordSource(_PushSource):
+    name = "screenrecord"
+
+    def __init__(self, adb=None, decode_size=None, record_size=None, source_file=None, **kw):
+        super().__init__()
+        from war_drone.screen_stream import ScreenrecordStream
+        self.stream = ScreenrecordStream(adb=adb, decode_size=decode_size, record_size=record_size,
+                                         source_file=source_file, **kw)
+        self._last_src_id = 0
+
+    def start(self):
+        self.stream.start()
+        return self
+
+    def stop(self):
+        self.stream.stop()
+
+    def _wait(self, after_id, timeout):
+        return self.stream.wait_newer(after_id, timeout=timeout)
+
+
+class ScrcpySource(_PushSource):
+    """包装 war_drone.scrcpy_grabber.ScrcpyFrameGrabber（需要 scrcpy-client）。"""
+    name = "scrcpy"
+
+    def __init__(self, serial=None, max_fps=30, max_size=1280, bitrate=8_000_000):
+        super().__init__()
+        from war_drone.scrcpy_grabber import ScrcpyFrameGrabber
+        self.grabber = ScrcpyFrameGrabber(device_serial=serial, max_fps=max_fps,
+                                          max_size=max_size, bitrate=bitrate)
+        self._last_src_id = 0
+
+    def start(self):
+        if not self.grabber.start():
+            raise RuntimeError("scrcpy 启动失败")
+        return self
+
+    def stop(self):
+        self.grabber.stop()
+
+    def _wait(self, after_id, timeout):
+        return self.grabber.wait_newer(after_id, timeout=timeout)
@@ -0,0 +1,126 @@
+"""
+离线回放帧源：
+- DirectorySource：目录下的数据集图片（如 tests/dataset/<state>/*.jpg），逐张解码，不一次性读入内存
+- VideoFileSource：mp4 等视频文件（如 CombatVideoRecorder 录下的 combat_*.mp4）
+fps>0 按固定帧率节流；fps=0 尽快输出（吞吐基准用）。
+"""
+from __future__ import annotations
+
+import glob
+import os
+import time
+from typing import List, Optional, Sequence
+
+import cv2
+
+from war_drone.frames.base import FramePacket, FrameSource
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class _PacedSource(FrameSource):
+    finite = True
+
+    def __init__(self, fps: float = 0.0, loop: bool = False):
+        super().__init__()
+        self.fps = float(fps or 0.0)
+        self.loop = bool(loop)
+        self._t_start: Optional[float] = None
+        self._delivered = 0
+
+    def _pace(self):
+        if self.fps <= 0:
+            return
+        if self._t_start is None:
+            self._t_start = time.monotonic()
+        due = self._t_start + self._delivered / self.fps
+        delay = due - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _read(self):
+        """返回 (img, meta) 或 None（到尾）。"""
+        raise NotImplementedError
+
+    def _rewind(self):
+        raise NotImplementedError
+
+    def next(self, timeout: float = 5.0) -> Optional[FramePacket]:
+        if self.exhausted:
+            return None
+        self._pace()
+        t0, p0 = time.time(), time.perf_counter()
+        got = self._read()
+        if got is None and self.loop:
+            self._rewind()
+            got = self._read()
+        if got is None:
+            self.exhausted = True
+            return None
+        img, meta = got
+        self._delivered += 1
+        return self._packet(img, t0, time.time(), p0=p0, **meta)
+
+
+def list_images(root: str, exts: Sequence[str] = IMAGE_EXTS) -> List[str]:
+    paths = [p for p in glob.glob(os.path.join(root, "**", "*"), recursive=True)
+             if os.path.splitext(p)[1].lower() in exts]
+    return sorted(paths)
+
+
+class DirectorySource(_PacedSource):
+    """按文件名顺序回放目录（递归）中的图片；meta 带 path 和 label（上级目录名）。"""
+
+    def __init__(self, root: str, fps: float = 0.0, loop: bool = False, paths: Optional[Sequence[str]] = None):
+        super().__init__(fps=fps, loop=loop)
+        self.root = root
+        self.paths = list(paths) if paths is not None else list_images(root)
+        if not self.paths:
+            raise FileNotFoundError(f"目录中没有图片: {root}")
+        self.name = f"dir:{root}"
+        self._idx = 0
+
+    def __len__(self):
+        return len(self.paths)
+
+    def _read(self):
+        while self._idx < len(self.paths):
+            path = self.paths[self._idx]
+            self._idx += 1
+            img = cv2.imread(path, cv2.IMREAD_COLOR)
+            if img is None:
+                print(f"[WARN] 无法读取图片，跳过: {path}")
+                continue
+            return img, {"path": path, "label": os.path.basename(os.path.dirname(path))}
+        return None
+
+    def _rewind(self):
+        self._idx = 0
+
+
+class VideoFileSource(_PacedSource):
+    """视频文件回放；fps=None 按视频自身帧率，0 尽快输出。"""
+
+    def __init__(self, path: str, fps: Optional[float] = None, loop: bool = False):
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise FileNotFoundError(f"无法打开视频: {path}")
+        native = float(self.cap.get(cv2.CAP_PROP_FPS) or 0.0)
+        super().__init__(fps=native if fps is None else fps, loop=loop)
+        self.path = path
+        self.name = f"video:{path}"
+        self._pos = 0
+
+    def _read(self):
+        ok, frame = self.cap.read()
+        if not ok or frame is None:
+            return None
+        self._pos += 1
+        return frame, {"path": self.path, "pos": self._pos - 1}
+
+    def _rewind(self):
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        self._pos = 0
+
+    def stop(self):
+        self.cap.release()
@@ -0,0 +1,129 @@
+"""
+端到端延迟埋点：截屏 → 解码 → 识别 → 决策 → 注入。
+- FrameTrace：每帧一份，各阶段打 time.perf_counter() 时间戳（跨线程传递）
+- LatencyRecorder：按阶段维护滚动窗口，输出 p50/p90/p99，退出时打印或写 JSON
+
+阶段耗时按相邻时间戳相减：
+  capture = capture_end - capture_start     decode = decode - capture_end
+  detect  = detect - decode                 decide = decide - detect
+  inject  = inject - decide
+  age     = inject（或 decide）- capture_end   帧被用于动作时已经“旧”了多久
+  total   = inject（或 decide）- capture_start
+缺失的阶段并入下一个阶段；未注入（只打到 decide）的帧照常计入前面各阶段。
+"""
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+STAGES = ("capture_start", "capture_end", "decode", "detect", "decide", "inject")
+SPANS = ("capture", "decode", "detect", "decide", "inject", "age", "total")
+
+
+def percentile(values: List[float], q: float) -> float:
+    """最近秩百分位（q 取 0~100）；空序列为 0。"""
+    if not values:
+        return 0.0
+    vs = sorted(values)
+    return vs[min(len(vs) - 1, max(0, int(round(q / 100.0 * (len(vs) - 1)))))]
+
+
+class FrameTrace:
+    __slots__ = ("frame_id", "source", "stamps")
+
+    def __init__(self, frame_id: int = 0, source: str = "", capture_start: Optional[float] = None,
+                 capture_end: Optional[float] = None):
+        self.frame_id = frame_id
+        self.source = source
+        self.stamps: Dict[str, float] = {}
+        if capture_start is not None:
+            self.stamps["capture_start"] = capture_start
+        if capture_end is not None:
+            self.stamps["capture_end"] = capture_end
+
+    def mark(self, stage: str, t: Optional[float] = None) -> "FrameTrace":
+        if stage not in STAGES:
+            raise ValueError(f"未知阶段: {stage}")
+        self.stamps[stage] = time.perf_counter() if t is None else t
+        return self
+
+    def spans_ms(self) -> Dict[str, float]:
+        st = self.stamps
+        out: Dict[str, float] = {}
+        prev = None
+        for stage in STAGES:
+            if stage not in st:
+                continue
+            if prev is not None:
+                out[stage if stage != "capture_end" else "capture"] = (st[stage] - st[prev]) * 1000.0
+            prev = stage
+        end = st.get("inject", st.get("decide"))
+        if end is not None:
+            if "capture_end" in st:
+                out["age"] = (end - st["capture_end"]) * 1000.0
+            if "capture_start" in st:
+                out["total"] = (end - st["capture_start"]) * 1000.0
+        return out
+
+
+class LatencyRecorder:
+    """线程安全；window 为每阶段保留的最近样本数。"""
+
+    def __init__(self, window: int = 1000):
+        self.window = int(window)
+        self._lock = threading.Lock()
+        self._spans: Dict[str, deque] = {name: deque(maxlen=self.window) for name in SPANS}
+        self.frames = 0
+        self.injected = 0
+
+    def add(self, trace: Optional[FrameTrace]):
+        if trace is None:
+            return
+        spans = trace.spans_ms()
+        with self._lock:
+            self.frames += 1
+            if "inject" in trace.stamps:
+                self.injected += 1
+            for name, ms in spans.items():
+                self._spans[name].append(ms)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            data = {name: list(v) for name, v in self._spans.items()}
+        out = {}
+        for name in SPANS:
+            vs = data[name]
+            if not vs:
+                continue
+            out[name] = {
+                "n": len(vs),
+                "mean_ms": sum(vs) / len(vs),
+                "p50_ms": percentile(vs, 50),
+                "p90_ms": percentile(vs, 90),
+                "p99_ms": percentile(vs, 99),
+                "max_ms": max(vs),
+            }
+        return out
+
+    def format_summary(self) -> str:
+        rows = [f"[LATENCY] frames={self.frames} injected={self.injected}",
+                f"{'stage':8s} {'n':>6s} {'mean':>8s} {'p50':>8s} {'p90':>8s} {'p99':>8s} {'max':>8s} (ms)"]
+        for name, s in self.summary().items():
+            rows.append(f"{name:8s} {s['n']:6d} {s['mean_ms']:8.1f} {s['p50_ms']:8.1f} "
+                        f"{s['p90_ms']:8.1f} {s['p99_ms']:8.1f} {s['max_ms']:8.1f}")
+        return "\n".join(rows)
+
+    def dump_json(self, path: str):
+        with self._lock:
+            raw = {name: list(v) for name, v in self._spans.items()}
+        payload = {
+            "frames": self.frames,
+            "injected": self.injected,
+            "summary": self.summary(),
+            "samples_ms": raw,
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+PaddleOCR 批量识别（PaddleOCR 2.x 的 TextSystem 接口：text_detector / text_recognizer / text_classifier）。
+- 每个 ROI 小图单独做文本检测，所有小图的文本行合成一个列表一次送入识别器
+  （识别器内部按宽高比排序、每 rec_batch_num 行一批，等价于按宽度分桶）
+- 结果按 ROI key 归还；按 drop_score 过滤，与 PaddleOCR.ocr(det=True, rec=True) 一致
+- recognize_tiles：只含一行字的紧凑 ROI 跳过检测，整图缩放到识别器输入高度后直接识别（同样一次批量）
+- ocr_full_frame：缩小后的整帧只做一次文本检测，文本框按重叠比例分给各 ROI，只识别落在所需 ROI 里的框
+- 本模块不直接依赖 paddle，reader 只需具备上述属性
+"""
+from __future__ import annotations
+
+import time
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+Texts = List[Tuple[str, float]]
+
+
+def supports_batched(reader) -> bool:
+    return hasattr(reader, "text_detector") and hasattr(reader, "text_recognizer")
+
+
+def sorted_boxes(boxes) -> list:
+    """文本框按 上→下、左→右 排序（同一行 y 差 <10px 的按 x），与 PaddleOCR 相同。"""
+    out = sorted(boxes, key=lambda b: (b[0][1], b[0][0]))
+    for i in range(len(out) - 1):
+        for j in range(i, -1, -1):
+            if abs(out[j + 1][0][1] - out[j][0][1]) < 10 and out[j + 1][0][0] < out[j][0][0]:
+                out[j], out[j + 1] = out[j + 1], out[j]
+            else:
+                break
+    return out
+
+
+def rotate_crop(img: np.ndarray, box) -> np.ndarray:
+    """按四边形文本框透视裁出文本行；竖长的行转 90°（与 PaddleOCR get_rotate_crop_image 一致）。"""
+    pts = np.asarray(box, np.float32)
+    w = int(max(np.linalg.norm(pts[0] - pts[1]), np.linalg.norm(pts[2] - pts[3])))
+    h = int(max(np.linalg.norm(pts[0] - pts[3]), np.linalg.norm(pts[1] - pts[2])))
+    dst = np.float32([[0, 0], [w, 0], [w, h], [0, h]])
+    crop = cv2.warpPerspective(img, cv2.getPerspectiveTransform(pts, dst), (w, h),
+                               borderMode=cv2.BORDER_REPLICATE, flags=cv2.INTER_CUBIC)
+    if crop.shape[0] >= 1.5 * crop.shape[1]:
+        crop = np.rot90(crop)
+    return crop
+
+
+def roi_rect(rel, wh: Tuple[int, int]) -> Tuple[int, int, int, int]:
+    """相对 ROI [cx, cy, w, h] → 像素框 (x1, y1, x2, y2)，与 crop_rel 的裁剪范围一致。"""
+    cx, cy, w, h = rel
+    W, H = wh
+    ww, hh = int(w * W), int(h * H)
+    x1 = max(0, int(cx * W - ww / 2))
+    y1 = max(0, int(cy * H - hh / 2))
+    return x1, y1, min(W, x1 + ww), min(H, y1 + hh)
+
+
+def assign_boxes(boxes, rects: Dict[str, Tuple[int, int, int, int]],
+                 min_overlap: float = 0.5) -> Dict[str, List[int]]:
+    """文本框（整帧坐标）外接矩形与 ROI 的交集占框面积 ≥ min_overlap 即归入该 ROI（可同时归入多个）。返回 {roi: [框下标]}。"""
+    out: Dict[str, List[int]] = {k: [] for k in rects}
+    for i, box in enumerate(boxes):
+        pts = np.asarray(box, np.float32)
+        bx1, by1 = pts.min(axis=0)
+        bx2, by2 = pts.max(axis=0)
+        area = max(1e-6, float((bx2 - bx1) * (by2 - by1)))
+        for key, (x1, y1, x2, y2) in rects.items():
+            iw = min(bx2, x2) - max(bx1, x1)
+            ih = min(by2, y2) - max(by1, y1)
+            if iw > 0 and ih > 0 and iw * ih / area >= min_overlap:
+                out[key].append(i)
+    return out
+
+
+def rec_height(reader, default: int = 48) -> int:
+    shape = getattr(getattr(reader, "text_recognizer", None), "rec_image_shape", None)
+    return int(shape[1]) if shape and len(shape) >= 2 else default
+
+
+def fit_rec_height(tile: np.ndarray, height: int) -> np.ndarray:
+    """等比缩放到识别器输入高度（宽度由识别器按批内最大宽高比补齐）。"""
+    h, w = tile.shape[:2]
+    if h == height:
+        return tile
+    width = max(1, int(round(w * height / float(h))))
+    interp = cv2.INTER_AREA if h > height else cv2.INTER_CUBIC
+    return cv2.resize(tile, (width, height), interpolation=interp)
+
+
+def _add_ms(times: Optional[Dict[str, float]], key: str, t0: float):
+    if times is not None:
+        times[key] = times.get(key, 0.0) + (time.perf_counter() - t0) * 1000.0
+
+
+def ocr_tiles(reader, tiles: Dict[str, np.ndarray], cls: bool = True,
+              times: Optional[Dict[str, float]] = None) -> Dict[str, Texts]:
+    """
+    tiles: {roi_key: BGR 小图}。逐图检测，全部文本行一次识别。返回 {roi_key: [(text, conf), ...]}。
+    times 给出时累加各阶段耗时（det / cls / rec，毫秒）。
+    """
+    out: Dict[str, Texts] = {k: [] for k in tiles}
+    crops, owners = [], []
+    t0 = time.perf_counter()
+    for key, tile in tiles.items():
+        if tile is None or tile.size == 0:
+            continue
+        boxes, _ = reader.text_detector(tile)
+        if boxes is None or len(boxes) == 0:
+            continue
+        for box in sorted_boxes(boxes):
+            crops.append(rotate_crop(tile, box))
+            owners.append(key)
+    _add_ms(times, "det", t0)
+    if not crops:
+        return out
+
+    if cls and getattr(reader, "use_angle_cls", False):
+        t0 = time.perf_counter()
+        crops, _, _ = reader.text_classifier(crops)
+        _add_ms(times, "cls", t0)
+    t0 = time.perf_counter()
+    rec, _ = reader.text_recognizer(crops)
+    _add_ms(times, "rec", t0)
+
+    drop = float(getattr(reader, "drop_score", 0.5))
+    for key, (txt, conf) in zip(owners, rec):
+        if float(conf) >= drop:
+            out[key].append((txt, float(conf)))
+    return out
+
+
+def recognize_tiles(reader, tiles: Dict[str, np.ndarray],
+                    times: Optional[Dict[str, float]] = None) -> Dict[str, Tuple[str, float]]:
+    """
+    只识别不检测：每个 ROI 小图当作一行文本，缩放到识别器输入高度后一次批量识别。
+    返回 {roi_key: (text, conf)}；空图为 ("", 0.0)。times 给出时累加 rec_only 耗时（毫秒）。
+    """
+    out: Dict[str, Tuple[str, float]] = {k: ("", 0.0) for k in tiles}
+    keys = [k for k, t in tiles.items() if t is not None and t.size]
+    if not keys:
+        return out
+    t0 = time.perf_counter()
+    height = rec_height(reader)
+    rec, _ = reader.text_recognizer([fit_rec_height(tiles[k], height) for k in keys])
+    _add_ms(times, "rec_only", t0)
+    for key, (txt, conf) in zip(keys, rec):
+        out[key] = (txt, float(conf))
+    return out
+
+
+def ocr_full_frame(reader, bgr: np.ndarray, rects: Dict[str, Tuple[int, int, int, int]], scale: float = 0.5,
+                   min_overlap: float = 0.5, cls: bool = True,
+                   times: Optional[Dict[str, float]] = None) -> Dict[str, Texts]:
+    """
+    整帧缩小 scale 倍做一次文本检测；框映射回原图后按重叠分给 rects 中的 ROI，
+    只裁剪（原分辨率）并识别被分到的框，一次批量。一个框分给多个 ROI 时只识别一次。
+    """
+    out: Dict[str, Texts] = {k: [] for k in rects}
+    if not rects:
+        return out
+    t0 = time.perf_counter()
+    small = bgr if scale >= 1.0 else cv2.resize(bgr, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    boxes, _ = reader.text_detector(small)
+    _add_ms(times, "det", t0)
+    if boxes is None or len(boxes) == 0:
+        return out
+    boxes = [np.asarray(b, np.float32) / min(scale, 1.0) for b in sorted_boxes(boxes)]
+    owners = assign_boxes(boxes, rects, min_overlap)
+    used = sorted({i for idx in owners.values() for i in idx})
+    if not used:
+        return out
+    crops = [rotate_crop(bgr, boxes[i]) for i in used]
+
+    if cls and getattr(reader, "use_angle_cls", False):
+        t0 = time.perf_counter()
+        crops, _, _ = reader.text_classifier(crops)
+        _add_ms(times, "cls", t0)
+    t0 = time.perf_counter()
+    rec, _ = reader.text_recognizer(crops)
+    _add_ms(times, "rec", t0)
+
+    drop = float(getattr(reader, "drop_score", 0.5))
+    by_box = dict(zip(used, rec))
+    for key, idx in owners.items():
+        for i in idx:
+            txt, conf = by_box[i]
+            if float(conf) >= drop:
+                out[key].append((txt, float(conf)))
+    return out
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+OCR 状态判定的评估顺序与提前结束（PaddleStateDetector / OcrStateDetector 共用，lean 模式）。
+- 顺序：上一状态 → 其后继（配置 state_fsm.transitions）→ 弹窗（state_fsm.popups）→ 其余（配置顺序）
+- 分数上限：OCR 规则数 + 辅助模板数 × 0.5（与打分规则一致）；rival_ceiling 可收紧，弹窗除外
+  （弹窗盖在页面上时，底下页面的文字仍可能被识别满分，弹窗必须能凭全部规则胜出）
+- 领先者分数严格大于所有未评估状态的上限时停止：未评估状态无法追平，判定结果（含同分 → unknown）与全量评估相同
+"""
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+UNKNOWN = "unknown"
+AUX_SCORE = 0.5
+
+
+def load_fsm(cfg: Dict[str, Any], state_names: Iterable[str]
+             ) -> Tuple[Dict[str, List[str]], List[str], Dict[str, float]]:
+    """
+    读取配置 state_fsm 段，返回 (transitions, popups, rival_ceiling)。
+    其中引用的状态名（含 rival_ceiling 的键，default 除外）必须已定义，否则 ValueError
+    （拼错的弹窗不会被优先评估、拼错的上限会让 default 生效，不能静默忽略）。
+    """
+    fsm = cfg.get("state_fsm", {})
+    transitions = {k: list(v) for k, v in fsm.get("transitions", {}).items()}
+    popups = list(fsm.get("popups", []))
+    rival_ceiling = {k: float(v) for k, v in fsm.get("rival_ceiling", {}).items()}
+    known = set(state_names)
+    for name in (list(transitions) + [t for v in transitions.values() for t in v] + popups
+                 + [k for k in rival_ceiling if k != "default"]):
+        if name not in known:
+            raise ValueError(f"state_fsm 中的状态未定义: {name}")
+    return transitions, popups, rival_ceiling
+
+
+def head_states(transitions: Dict[str, List[str]], popups: List[str], prev_state: Optional[str]) -> List[str]:
+    """优先评估的状态：上一状态 → 其后继 → 弹窗（去重）。"""
+    head = ([prev_state] + list(transitions.get(prev_state, [])) if prev_state else []) + list(popups)
+    return list(dict.fromkeys(head))
+
+
+def eval_order(names: Iterable[str], transitions: Dict[str, List[str]], popups: List[str],
+               prev_state: Optional[str]) -> List[str]:
+    """按 上一状态 → 后继 → 弹窗 → 其余 排列状态名；不认识的名字忽略。"""
+    names = list(names)
+    known = set(names)
+    return list(dict.fromkeys([n for n in head_states(transitions, popups, prev_state) if n in known] + names))
+
+
+def max_score(state: Dict[str, Any]) -> float:
+    return len(state.get("ocr", [])) + AUX_SCORE * len(state.get("aux_templates", []))
+
+
+def score_bounds(states: List[Dict[str, Any]], rival_ceiling: Optional[Dict[str, float]] = None,
+                 exact: Iterable[str] = ()) -> Dict[str, float]:
+    """
+    未评估状态的分数上限：max_score（精确）；rival_ceiling {default, <state>} 可按经验收紧
+    （页面不在屏幕上时最多误命中多少分），收紧后提前结束依赖该经验值可靠。
+    exact 中的状态（弹窗）不收紧，始终用 max_score。
+    """
+    ceiling = dict(rival_ceiling or {})
+    default = float(ceiling.pop("default", float("inf")))
+    exact = set(exact)
+    return {st["name"]: max_score(st) if st["name"] in exact
+            else min(max_score(st), float(ceiling.get(st["name"], default))) for st in states}
+
+
+def decide(scores: Dict[str, float]) -> str:
+    """最高分且唯一、且 > 0 的状态；否则 unknown。"""
+    best = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+    if not best or best[0][1] <= 0:
+        return UNKNOWN
+    if len(best) >= 2 and best[0][1] == best[1][1]:
+        return UNKNOWN
+    return best[0][0]
+
+
+def evaluate(order: List[str], score_fn: Callable[[str], float],
+             bounds: Dict[str, float]) -> Tuple[Dict[str, float], int]:
+    """按 order 逐个打分，领先者已不可能被追平时停止。返回 (已评估状态的分数, 评估数)。"""
+    scores: Dict[str, float] = {}
+    lead = 0.0
+    for i, name in enumerate(order):
+        scores[name] = score_fn(name)
+        lead = max(lead, scores[name])
+        rest = order[i + 1:]
+        if rest and lead > max(bounds.get(n, 0.0) for n in rest):
+            break
+    return scores, len(scores)
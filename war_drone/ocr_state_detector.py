@@ -5,6 +5,10 @@ import numpy as np
 from typing import List, Dict, Any, Tuple
 import easyocr
 
+from war_drone import ocr_order
+from war_drone.frame import Frame, as_frame
+from war_drone.frame_change import FrameChangeDetector
+
 # ============== 工具 ==============
 def crop_rel(img, rel: List[float], wh: Tuple[int, int]):
     """
@@ -20,13 +24,13 @@ def crop_rel(img, rel: List[float], wh: Tuple[int, int]):
 def preprocess_for_ocr(tile_bgr, max_width=800, binarize=False):
     """
     轻处理：限制宽度、转灰、去噪、CLAHE；可选 OTSU 二值化。
-    保持和 probe 一致，避免 conf 波动。
+    保持和 probe 一致，避免 conf 波动。tile 已是灰度（来自 Frame.gray）时跳过转灰。
     """
     h, w = tile_bgr.shape[:2]
     if w > max_width:
         scale = max_width / float(w)
         tile_bgr = cv2.resize(tile_bgr, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
-    g = cv2.cvtColor(tile_bgr, cv2.COLOR_BGR2GRAY)
+    g = cv2.cvtColor(tile_bgr, cv2.COLOR_BGR2GRAY) if tile_bgr.ndim == 3 else tile_bgr
     g = cv2.medianBlur(g, 3)
     clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
     g = clahe.apply(g)
@@ -58,13 +62,25 @@ class OcrStateDetector:
     - OCR 命中一条规则 +1 分
     - 每个 aux_template 达阈值 +0.5 分
     - 最高分为最终状态；同分或最高分<=0 → "unknown"
+    - 同一帧内同一 (ROI, 语言) 只 OCR 一次
+    - lean 模式：不构造调试信息，按 上一状态 → 后继 → 弹窗 → 其余 评估，领先者无法被追平即停止
     """
-    def __init__(self, cfg_path="configs/ocr_states.json5"):
+    def __init__(self, cfg_path="configs/ocr_states.json5", frame_change=None, lean=None):
         self.cfg = json5.load(open(cfg_path, "r", encoding="utf-8"))
         self.WH = (self.cfg["screen"]["width"], self.cfg["screen"]["height"])
         self.rois: Dict[str, List[float]] = self.cfg["rois"]
         self.states: List[Dict[str, Any]] = self.cfg["states"]
 
+        # 画面未变化时复用上次结果（参数优先，其次配置 frame_change 段）
+        self.frame_change = FrameChangeDetector.from_cfg(
+            frame_change if frame_change is not None else self.cfg.get("frame_change"))
+
+        # lean：生产用（参数优先，其次配置 lean）；评估顺序与分数上限见 war_drone.ocr_order
+        self.lean = bool(lean if lean is not None else self.cfg.get("lean", False))
+        self.transitions, self.popups, rival_ceiling = ocr_order.load_fsm(self.cfg, [st["name"] for st in self.states])
+        self.score_bounds = ocr_order.score_bounds(self.states, rival_ceiling, exact=self.popups)
+        self.last_rois_ocr = 0  # 最近一帧 OCR 的 (ROI, 语言) 数
+
         # 加载模板
         self.templates: Dict[str, np.ndarray] = {}
         for t in self.cfg.get("templates", []):
@@ -83,7 +99,7 @@ class OcrStateDetector:
         return self._readers[lang]
 
     def _texts_in_roi(self, img, roi_key: str, lang: str) -> List[Tuple[str, float]]:
-        tile = crop_rel(img, self.rois[roi_key], self.WH)
+        tile = crop_rel(as_frame(img).gray, self.rois[roi_key], self.WH)
         tile = preprocess_for_ocr(tile, max_width=800, binarize=False)
         reader = self._get_reader(lang)
         res = reader.readtext(tile)
@@ -92,12 +108,19 @@ class OcrStateDetector:
             out.append((txt, float(conf)))
         return out
 
+    def _roi_texts(self, img, roi_key: str, lang: str, memo: Dict[Tuple[str, str], Tuple[list, list]]):
+        """本帧该 ROI 的 (原始文本, 规范化文本)，同一 (ROI, 语言) 只识别一次。"""
+        key = (roi_key, lang)
+        if key not in memo:
+            texts = self._texts_in_roi(img, roi_key, lang)
+            memo[key] = (texts, [(_norm_text(t), c) for (t, c) in texts])
+        return memo[key]
+
     # ---------- 模板 ----------
     def _aux_template_score(self, img, roi_key: str, tmpl_name: str) -> float:
         if tmpl_name not in self.templates:
             return 0.0
-        tile = crop_rel(img, self.rois[roi_key], self.WH)
-        gray_big = cv2.cvtColor(tile, cv2.COLOR_BGR2GRAY)
+        gray_big = crop_rel(as_frame(img).gray, self.rois[roi_key], self.WH)
         gray_sml = cv2.cvtColor(self.templates[tmpl_name], cv2.COLOR_BGR2GRAY)
         return match_ncc(gray_big, gray_sml)
 
@@ -140,7 +163,39 @@ class OcrStateDetector:
         return False
 
     # ---------- 预测 ----------
-    def predict(self, img_bgr: np.ndarray) -> Tuple[str, Dict[str, Any]]:
+    def predict(self, img_bgr, prev_state: str = None) -> Tuple[str, Dict[str, Any]]:
+        """
+        img_bgr 为 ndarray 或共享 Frame；画面未变化（frame_change）时直接返回上次结果，dbg["cached"]=True。
+        lean 模式下 prev_state 决定评估顺序，dbg 只有 scores（已评估的状态）/ evaluated / rois_ocr。
+        """
+        img_bgr = as_frame(img_bgr)
+        if self.frame_change is None:
+            return self._predict(img_bgr, prev_state)
+        return self.frame_change.cached_dbg(img_bgr, lambda: self._predict(img_bgr, prev_state))
+
+    def _state_score(self, img_bgr: Frame, st: Dict[str, Any], memo, tmpl_roi_map) -> float:
+        """lean 模式的打分：与 _predict 相同，只是不记录命中细节。"""
+        s = 0.0
+        for rule in st.get("ocr", []):
+            if self._eval_ocr_rule(self._roi_texts(img_bgr, rule["roi"], rule.get("lang", "ch_sim"), memo)[1], rule):
+                s += 1.0
+        for aux in st.get("aux_templates", []):
+            roi_key = tmpl_roi_map.get(aux["template"])
+            if roi_key and self._aux_template_score(img_bgr, roi_key, aux["template"]) >= float(aux.get("min_score", 0.7)):
+                s += ocr_order.AUX_SCORE
+        return s
+
+    def _predict_lean(self, img_bgr: Frame, prev_state: str = None) -> Tuple[str, Dict[str, Any]]:
+        by_name = {st["name"]: st for st in self.states}
+        tmpl_roi_map = {t["name"]: t["roi"] for t in self.cfg.get("templates", [])}
+        memo: Dict[Tuple[str, str], Tuple[list, list]] = {}
+        order = ocr_order.eval_order(by_name, self.transitions, self.popups, prev_state)
+        scores, n = ocr_order.evaluate(order, lambda name: self._state_score(img_bgr, by_name[name], memo, tmpl_roi_map),
+                                       self.score_bounds)
+        self.last_rois_ocr = len(memo)
+        return ocr_order.decide(scores), {"scores": scores, "evaluated": n, "rois_ocr": self.last_rois_ocr}
+
+    def _predict(self, img_bgr: Frame, prev_state: str = None) -> Tuple[str, Dict[str, Any]]:
         """
         返回 (state_name, debug_info)
         打分策略：
@@ -148,8 +203,11 @@ class OcrStateDetector:
           - 每个 aux_template 达阈值 +0.5
           - 取最高分；同分或<=0 返回 unknown
         """
+        if self.lean:
+            return self._predict_lean(img_bgr, prev_state)
         scores: Dict[str, float] = {}
         dbg: Dict[str, Any] = {}
+        memo: Dict[Tuple[str, str], Tuple[list, list]] = {}  # 本帧 (ROI, 语言) → OCR 结果
 
         # 方便按模板名查 ROI
         tmpl_roi_map = { t["name"]: t["roi"] for t in self.cfg.get("templates", []) }
@@ -163,10 +221,9 @@ class OcrStateDetector:
             for rule in st.get("ocr", []):
                 roi = rule["roi"]
                 lang = rule.get("lang", "ch_sim")
-                texts = self._texts_in_roi(img_bgr, roi, lang)  # [(txt, conf), ...]
+                texts, normed = self._roi_texts(img_bgr, roi, lang, memo)  # [(txt, conf), ...] 及规范化文本
 
                 # 记录原始与规范化文本，便于调试
-                normed = [(_norm_text(t), c) for (t, c) in texts]
                 details["ocr_raw"].setdefault(roi, {
                     "raw": [(t, c) for (t, c) in texts],
                     "norm": normed,
@@ -205,9 +262,5 @@ class OcrStateDetector:
             dbg[name] = details
 
         # 取最高分
-        best = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
-        if not best or best[0][1] <= 0:
-            return "unknown", {"scores": scores, "details": dbg}
-        if len(best) >= 2 and best[0][1] == best[1][1]:
-            return "unknown", {"scores": scores, "details": dbg}
-        return best[0][0], {"scores": scores, "details": dbg}
+        self.last_rois_ocr = len(memo)
+        return ocr_order.decide(scores), {"scores": scores, "details": dbg, "rois_ocr": self.last_rois_ocr}
@@ -1,13 +1,19 @@
 # -*- coding: utf-8 -*-
 """
 基于 PaddleOCR 的简易状态判定器，按 configs/ocr_states_fsm.json5 读取 ROI/规则。
+- 同一帧内每个 ROI 只 OCR 一次，引用同一 ROI 的多条规则共用结果（ocr_stats 统计省下的调用）
+- ocr_mode: per_roi=每个 ROI 一次 ocr()；batched=逐 ROI 检测、全部文本行一次识别（见 war_drone.ocr_batch）；
+  full_frame=缩小整帧检测一次、文本框按重叠分给 ROI；auto=本帧需识别的 ROI 数 ≥ full_frame_min_rois 时
+  full_frame，否则 batched
+- roi_modes: {roi: "rec_only"}：单行文字的紧凑 ROI 跳过检测直接识别，置信度低于 rec_only_min_conf 时回落 det+rec
+- lean 模式：不构造调试信息；按 上一状态 → 后继 → 弹窗 → 其余 评估，领先者无法被追平即停止（见 war_drone.ocr_order）
 """
 from __future__ import annotations
 import importlib.util
 import inspect
 import os
 import re
-from typing import List, Tuple, Dict, Any
+from typing import List, Set, Tuple, Dict, Any
 
 import cv2
 import json5
@@ -27,6 +33,10 @@ if hasattr(libpaddle, "AnalysisConfig") and not hasattr(libpaddle.AnalysisConfig
 
 from paddleocr import PaddleOCR
 
+from war_drone import ocr_batch, ocr_order
+from war_drone.frame import as_frame
+from war_drone.frame_change import FrameChangeDetector
+
 
 def _guess_model_root(explicit_root: str | None) -> str | None:
     candidates: List[str] = []
@@ -88,7 +98,12 @@ def _select_device() -> bool:
     return use_gpu
 
 
-def _build_ocr_kwargs(use_gpu: bool, det_dir=None, rec_dir=None, cls_dir=None) -> Dict[str, Any]:
+OCR_MODES = ("per_roi", "batched", "full_frame", "auto")
+ROI_MODES = ("det_rec", "rec_only")
+
+
+def _build_ocr_kwargs(use_gpu: bool, det_dir=None, rec_dir=None, cls_dir=None,
+                      rec_batch_num=None) -> Dict[str, Any]:
     params = inspect.signature(PaddleOCR.__init__).parameters
     kwargs: Dict[str, Any] = {"lang": "ch", "show_log": False}
 
@@ -118,6 +133,9 @@ def _build_ocr_kwargs(use_gpu: bool, det_dir=None, rec_dir=None, cls_dir=None) -
         if key in params:
             kwargs[key] = val
 
+    if rec_batch_num and "rec_batch_num" in params:
+        kwargs["rec_batch_num"] = int(rec_batch_num)
+
     if det_dir:
         kwargs["det_model_dir"] = det_dir
     if rec_dir:
@@ -147,31 +165,73 @@ def _norm_text(s: str) -> str:
 
 
 class PaddleStateDetector:
-    def __init__(self, cfg_path: str, det_dir=None, rec_dir=None, cls_dir=None, model_root=None):
+    def __init__(self, cfg_path: str, det_dir=None, rec_dir=None, cls_dir=None, model_root=None,
+                 frame_change=None, ocr_mode=None, lean=None):
         self.cfg = json5.load(open(cfg_path, "r", encoding="utf-8"))
         self.WH = (self.cfg["screen"]["width"], self.cfg["screen"]["height"])
         self.rois: Dict[str, List[float]] = self.cfg["rois"]
         self.states: List[Dict[str, Any]] = self.cfg["states"]
+        # 画面未变化时复用上次结果（参数优先，其次配置 frame_change 段）
+        self.frame_change = FrameChangeDetector.from_cfg(
+            frame_change if frame_change is not None else self.cfg.get("frame_change"))
+        self.ocr_mode = ocr_mode or self.cfg.get("ocr_mode", "per_roi")
+        if self.ocr_mode not in OCR_MODES:
+            raise ValueError(f"ocr_mode 只能是 {OCR_MODES}: {self.ocr_mode}")
+        rec_batch_num = self.cfg.get("rec_batch_num")
+        self.roi_modes: Dict[str, str] = dict(self.cfg.get("roi_modes", {}))
+        for k, m in self.roi_modes.items():
+            if k not in self.rois or m not in ROI_MODES:
+                raise ValueError(f"roi_modes.{k}: ROI 须在 rois 中，模式只能是 {ROI_MODES}: {m}")
+        self.rec_only_min_conf = float(self.cfg.get("rec_only_min_conf", 0.8))
+        # lean：生产用，不带调试信息并提前结束（参数优先，其次配置 lean）
+        self.lean = bool(lean if lean is not None else self.cfg.get("lean", False))
+        self.transitions, self.popups, rival_ceiling = ocr_order.load_fsm(self.cfg, [st["name"] for st in self.states])
+        self.score_bounds = ocr_order.score_bounds(self.states, rival_ceiling, exact=self.popups)
+        ff = self.cfg.get("full_frame", {})
+        self.full_frame_scale = float(ff.get("scale", 0.5))
+        self.full_frame_min_overlap = float(ff.get("min_overlap", 0.5))
+        self.full_frame_min_rois = int(ff.get("min_rois", 8))
         det_dir, rec_dir, cls_dir, resolved_root = _resolve_model_dirs(det_dir, rec_dir, cls_dir, model_root)
         if resolved_root:
             print(f"[INFO] Using local PaddleOCR models from: {resolved_root}")
         # 优先尝试 GPU，失败则回落 CPU（保持稳定）
         use_gpu = _select_device()
-        ocr_kwargs = _build_ocr_kwargs(use_gpu, det_dir=det_dir, rec_dir=rec_dir, cls_dir=cls_dir)
+        ocr_kwargs = _build_ocr_kwargs(use_gpu, det_dir=det_dir, rec_dir=rec_dir, cls_dir=cls_dir,
+                                       rec_batch_num=rec_batch_num)
         print("[INFO] init PaddleOCR with params:", ocr_kwargs)
         try:
             self.ocr_reader = PaddleOCR(**ocr_kwargs)
         except Exception as e:
             if use_gpu:
                 print(f"[WARN] PaddleOCR init failed on GPU, fallback CPU: {e}")
-                ocr_kwargs = _build_ocr_kwargs(False, det_dir=det_dir, rec_dir=rec_dir, cls_dir=cls_dir)
+                ocr_kwargs = _build_ocr_kwargs(False, det_dir=det_dir, rec_dir=rec_dir, cls_dir=cls_dir,
+                                               rec_batch_num=rec_batch_num)
                 self.ocr_reader = PaddleOCR(**ocr_kwargs)
             else:
                 raise
         print("[INFO] PaddleOCR init done")
+        if not ocr_batch.supports_batched(self.ocr_reader):
+            if self.ocr_mode != "per_roi" or "rec_only" in self.roi_modes.values():
+                print("[WARN] 当前 PaddleOCR 版本没有 text_detector / text_recognizer，ocr_mode 回落 per_roi，"
+                      "忽略 roi_modes")
+            self.ocr_mode = "per_roi"
+            self.roi_modes = {}
+        self.reset_ocr_stats()
+
+    def reset_ocr_stats(self):
+        """OCR 统计：frames=实际识别的帧数，calls=识别的 ROI 次数，saved=同帧复用省下的次数。"""
+        self.ocr_frames = 0
+        self.ocr_calls = 0
+        self.ocr_saved = 0
+        self.rec_only_ok = 0        # rec_only ROI 直接采用识别结果的次数
+        self.rec_only_fallback = 0  # 置信度不足回落 det+rec 的次数
+        self.ocr_times: Dict[str, float] = {}  # 各阶段累计耗时（det / cls / rec / rec_only，毫秒）
+        self.strategy_counts: Dict[str, int] = {}  # 各帧实际批量识别的方式，每帧计一次（auto 时有意义）
+        self.states_evaluated = 0   # 累计评估的状态数（lean 提前结束时少于状态总数）
+        self.last_rois_ocr = 0      # 最近一帧识别的 ROI 数
 
     def _texts_in_roi(self, img, roi_key: str) -> List[Tuple[str, float]]:
-        tile = crop_rel(img, self.rois[roi_key], self.WH)
+        tile = crop_rel(as_frame(img).bgr, self.rois[roi_key], self.WH)
         if tile.size == 0:
             return []
         try:
@@ -188,6 +248,112 @@ class PaddleStateDetector:
             out.append((txt, conf))
         return out
 
+    def _texts_batched(self, img, roi_keys: List[str]) -> Dict[str, List[Tuple[str, float]]]:
+        """一帧所需的全部 ROI：逐个检测，文本行一次识别；出错时该帧回落逐 ROI ocr()。"""
+        bgr = as_frame(img).bgr
+        tiles = {k: crop_rel(bgr, self.rois[k], self.WH) for k in roi_keys}
+        try:
+            return ocr_batch.ocr_tiles(self.ocr_reader, tiles, times=self.ocr_times)
+        except Exception as e:
+            print(f"[WARN] 批量识别失败，本帧逐 ROI 识别: {e}")
+            return {}
+
+    def _texts_rec_only(self, img, roi_keys: List[str]) -> Dict[str, List[Tuple[str, float]]]:
+        """rec_only ROI 一次批量识别；置信度够的直接作为该 ROI 的唯一文本行，其余不返回（由 det+rec 补）。"""
+        bgr = as_frame(img).bgr
+        tiles = {k: crop_rel(bgr, self.rois[k], self.WH) for k in roi_keys}
+        try:
+            res = ocr_batch.recognize_tiles(self.ocr_reader, tiles, times=self.ocr_times)
+        except Exception as e:
+            print(f"[WARN] rec_only 识别失败，本帧走 det+rec: {e}")
+            return {}
+        out = {}
+        for k, (txt, conf) in res.items():
+            if txt and conf >= self.rec_only_min_conf:
+                out[k] = [(txt, conf)]
+                self.rec_only_ok += 1
+            else:
+                self.rec_only_fallback += 1
+        return out
+
+    def _prefetch(self, img, roi_keys: List[str], used: Set[str]) -> Dict[str, List[Tuple[str, float]]]:
+        """
+        本帧需要的 ROI 先按 roi_modes / ocr_mode 批量识别；未覆盖的 ROI 在 _roi_texts 里逐个 ocr()。
+        used 收集本帧实际用到的批量方式（一帧可能分两次调用），帧末由 _count_strategy 计一次。
+        """
+        rec_keys = [k for k in roi_keys if self.roi_modes.get(k) == "rec_only"]
+        pre = self._texts_rec_only(img, rec_keys) if rec_keys else {}
+        rest = [k for k in roi_keys if k not in pre]
+        strategy = self._strategy(len(rest))
+        if rest and strategy in ("batched", "full_frame"):
+            used.add(strategy)
+        if rest and strategy == "batched":
+            pre.update(self._texts_batched(img, rest))
+        elif rest and strategy == "full_frame":
+            pre.update(self._texts_full_frame(img, rest))
+        self.ocr_calls += len(pre)
+        return pre
+
+    def _texts_full_frame(self, img, roi_keys: List[str]) -> Dict[str, List[Tuple[str, float]]]:
+        """整帧一次检测，只识别落在 roi_keys 里的文本框；出错时该帧回落逐 ROI ocr()。"""
+        rects = {k: ocr_batch.roi_rect(self.rois[k], self.WH) for k in roi_keys}
+        try:
+            return ocr_batch.ocr_full_frame(self.ocr_reader, as_frame(img).bgr, rects, scale=self.full_frame_scale,
+                                            min_overlap=self.full_frame_min_overlap, times=self.ocr_times)
+        except Exception as e:
+            print(f"[WARN] 整帧检测失败，本帧逐 ROI 识别: {e}")
+            return {}
+
+    def _count_strategy(self, used: Set[str]):
+        if used:
+            key = "+".join(sorted(used))
+            self.strategy_counts[key] = self.strategy_counts.get(key, 0) + 1
+
+    def _strategy(self, n_rois: int) -> str:
+        if self.ocr_mode != "auto":
+            return self.ocr_mode
+        return "full_frame" if n_rois >= self.full_frame_min_rois else "batched"
+
+    def _rule_rois(self, states: List[Dict[str, Any]] = None) -> List[str]:
+        return list(dict.fromkeys(rule["roi"] for st in (self.states if states is None else states)
+                                  for rule in st.get("ocr", [])))
+
+    def _roi_texts(self, img, roi_key: str, memo: Dict[str, Tuple[list, list]],
+                   pre: Dict[str, List[Tuple[str, float]]] = None) -> Tuple[list, list]:
+        """本帧该 ROI 的 (原始文本, 规范化文本)；memo 为本帧缓存，同一 ROI 只 OCR 一次；pre 为批量识别的结果。"""
+        if roi_key in memo:
+            self.ocr_saved += 1
+            return memo[roi_key]
+        if pre and roi_key in pre:
+            texts = pre[roi_key]  # 已在 _prefetch 计数
+        else:
+            self.ocr_calls += 1
+            texts = self._texts_in_roi(img, roi_key)
+        memo[roi_key] = (texts, [(_norm_text(t), c) for t, c in texts])
+        return memo[roi_key]
+
+    def ocr_stats(self) -> Dict[str, float]:
+        frames = max(1, self.ocr_frames)
+        return {"frames": self.ocr_frames, "calls": self.ocr_calls, "saved": self.ocr_saved,
+                "calls_per_frame": self.ocr_calls / frames, "saved_per_frame": self.ocr_saved / frames,
+                "rec_only_ok": self.rec_only_ok, "rec_only_fallback": self.rec_only_fallback,
+                "strategies": dict(self.strategy_counts),
+                "evaluated_per_frame": self.states_evaluated / frames, "states": len(self.states)}
+
+    def describe_ocr(self) -> str:
+        st = self.ocr_stats()
+        line = (f"[INFO] OCR({self.ocr_mode}): {st['frames']} 帧，识别 ROI {st['calls']} 次（{st['calls_per_frame']:.1f}/帧），"
+                f"同帧复用省下 {st['saved']} 次（{st['saved_per_frame']:.1f}/帧）")
+        if self.lean:
+            line += f"，lean 平均每帧评估 {st['evaluated_per_frame']:.1f}/{st['states']} 个状态"
+        if self.ocr_mode == "auto" and st["strategies"]:
+            line += "，方式 " + " ".join(f"{k}={v}" for k, v in st["strategies"].items())
+        if st["rec_only_ok"] or st["rec_only_fallback"]:
+            line += f"，rec_only 直接采用 {st['rec_only_ok']} 次 / 回落 det+rec {st['rec_only_fallback']} 次"
+        if self.ocr_times and self.ocr_frames:
+            line += "，" + " ".join(f"{k}={v / self.ocr_frames:.1f}ms/帧" for k, v in self.ocr_times.items())
+        return line
+
     def _eval_rule(self, texts_norm: List[Tuple[str, float]], rule: Dict[str, Any]) -> bool:
         min_conf = float(rule.get("min_conf", 0.5))
         if "contains" in rule:
@@ -213,17 +379,63 @@ class PaddleStateDetector:
             return False
         return False
 
-    def predict(self, img_bgr):
+    def predict(self, img_bgr, prev_state: str = None):
+        """
+        img_bgr 为 ndarray 或共享 Frame（war_drone.frame）。
+        lean 模式下 prev_state 决定评估顺序，dbg 只有 scores（已评估的状态）/ evaluated / rois_ocr。
+        """
+        img_bgr = as_frame(img_bgr)
+        if self.frame_change is None:
+            return self._predict(img_bgr, prev_state)
+        return self.frame_change.cached_dbg(img_bgr, lambda: self._predict(img_bgr, prev_state))
+
+    def _state_score(self, img, st: Dict[str, Any], memo, pre) -> float:
+        return float(sum(1 for rule in st.get("ocr", [])
+                         if self._eval_rule(self._roi_texts(img, rule["roi"], memo, pre)[1], rule)))
+
+    def _predict_lean(self, img_bgr, prev_state: str = None):
+        """按评估顺序打分并提前结束；批量识别分两批：先 上一状态 / 后继 / 弹窗 的 ROI，不够再取其余。"""
+        by_name = {st["name"]: st for st in self.states}
+        order = ocr_order.eval_order(by_name, self.transitions, self.popups, prev_state)
+        head = set(ocr_order.head_states(self.transitions, self.popups, prev_state))
+        memo: Dict[str, Tuple[list, list]] = {}
+        pre: Dict[str, List[Tuple[str, float]]] = {}
+        fetched = set()
+        used: Set[str] = set()
+
+        def score(name: str) -> float:
+            stage = name in head
+            if stage not in fetched:
+                fetched.add(stage)
+                group = [by_name[n] for n in order if (n in head) == stage]
+                pre.update(self._prefetch(img_bgr, [k for k in self._rule_rois(group) if k not in pre], used))
+            return self._state_score(img_bgr, by_name[name], memo, pre)
+
+        self.ocr_frames += 1
+        scores, n = ocr_order.evaluate(order, score, self.score_bounds)
+        self._count_strategy(used)
+        self.states_evaluated += n
+        self.last_rois_ocr = len(set(memo) | set(pre))
+        return ocr_order.decide(scores), {"scores": scores, "evaluated": n, "rois_ocr": self.last_rois_ocr}
+
+    def _predict(self, img_bgr, prev_state: str = None):
+        if self.lean:
+            return self._predict_lean(img_bgr, prev_state)
         scores: Dict[str, float] = {}
         dbg: Dict[str, Any] = {}
+        memo: Dict[str, Tuple[list, list]] = {}  # 本帧 ROI → OCR 结果
+        used: Set[str] = set()
+        pre = self._prefetch(img_bgr, self._rule_rois(), used)
+        self._count_strategy(used)
+        self.ocr_frames += 1
+        self.states_evaluated += len(self.states)
         for st in self.states:
             name = st["name"]
             s = 0.0
             details = {"ocr_hits": [], "ocr_raw": {}}
             for rule in st.get("ocr", []):
                 roi = rule["roi"]
-                texts = self._texts_in_roi(img_bgr, roi)
-                normed = [(_norm_text(t), c) for t, c in texts]
+                texts, normed = self._roi_texts(img_bgr, roi, memo, pre)
                 details["ocr_raw"].setdefault(roi, {"raw": texts, "norm": normed})
                 if self._eval_rule(normed, rule):
                     hit_txt = ""
@@ -243,9 +455,5 @@ class PaddleStateDetector:
             scores[name] = s
             dbg[name] = details
 
-        best = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
-        if not best or best[0][1] <= 0:
-            return "unknown", {"scores": scores, "details": dbg}
-        if len(best) >= 2 and best[0][1] == best[1][1]:
-            return "unknown", {"scores": scores, "details": dbg}
-        return best[0][0], {"scores": scores, "details": dbg}
+        self.last_rois_ocr = len(set(memo) | set(pre))
+        return ocr_order.decide(scores), {"scores": scores, "details": dbg, "rois_ocr": self.last_rois_ocr}
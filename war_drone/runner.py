@@ -11,6 +11,12 @@ def parse_args():
     ap.add_argument("--no-edges", action="store_true", help="禁用边缘预处理")
     ap.add_argument("--no-mask", action="store_true", help="禁用模板掩码匹配")
     ap.add_argument("--debug", action="store_true", help="更详细日志输出")
+    ap.add_argument("--screencap-mode", choices=["png", "raw", "auto"], default="png",
+                    help="截屏方式：png=screencap -p；raw=原始帧缓冲；auto=按实测耗时自动选择")
+    ap.add_argument("--transport", choices=["exec", "socket"], default="exec",
+                    help="adb 通道：exec=每条命令启动 adb 进程；socket=直连 adb server 线协议")
+    ap.add_argument("--source", default=None,
+                    help="帧源：adb[:png|raw|auto] / screenrecord / scrcpy / video:<mp4>[@fps] / dir:<目录>[@fps]")
     return ap.parse_args()
 
 def main():
@@ -20,6 +26,9 @@ def main():
         use_edges=not args.no_edges,
         use_mask=not args.no_mask,
         debug=args.debug,
+        screencap_mode=args.screencap_mode,
+        source=args.source,
+        transport=args.transport,
     )
 
     if args.once:
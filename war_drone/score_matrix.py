@@ -0,0 +1,159 @@
+"""
+批量离线打分：N 张图 × S 个状态的稠密分数矩阵（TemplateStateDetector.score_many 的实现）。
+- 输入可为路径 / ndarray / Frame 的可迭代对象；路径按需逐张解码（不一次性读入内存）
+- processes>1 时用进程池按图片并行：每个子进程用相同参数构造一次识别器，只传路径与结果
+- 分数与 predict 的候选分数一致（各状态按 combine_mode 合成）；无可用模板的状态记 0、位置 (-1, -1)
+- 结果可直接写 CSV / NPZ
+"""
+from __future__ import annotations
+
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+
+from war_drone.frame import Frame
+
+ImageLike = Union[str, np.ndarray, Frame]
+Row = Tuple[List[float], List[Tuple[int, int]], List[str]]
+
+
+@dataclass
+class ScoreMatrix:
+    names: List[str]          # 每行图片的标识（路径，或内存图的 "#序号"）
+    states: List[str]
+    scores: np.ndarray        # (N, S) float32
+    locs: np.ndarray          # (N, S, 2) int32，模板左上角整屏坐标
+    templates: List[List[str]]  # (N, S) 触发模板文件名
+
+    @property
+    def argmax(self) -> np.ndarray:
+        """每张图分数最高的状态下标 (N,)"""
+        return self.scores.argmax(axis=1) if self.scores.size else np.zeros(0, np.int64)
+
+    @property
+    def best_scores(self) -> np.ndarray:
+        return self.scores.max(axis=1) if self.scores.size else np.zeros(0, np.float32)
+
+    @property
+    def best_states(self) -> List[str]:
+        return [self.states[i] for i in self.argmax]
+
+    @property
+    def best_locs(self) -> np.ndarray:
+        """最高分状态的位置 (N, 2)"""
+        return self.locs[np.arange(len(self.names)), self.argmax]
+
+    def column(self, state: str) -> np.ndarray:
+        return self.scores[:, self.states.index(state)]
+
+    def to_csv(self, path: str, gt: Optional[Sequence[str]] = None):
+        """每行：path, [gt], score_<state>..., pred, pred_score, pred_x, pred_y"""
+        _ensure_dir(path)
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(["path"] + (["gt"] if gt is not None else []) + [f"score_{s}" for s in self.states]
+                       + ["pred", "pred_score", "pred_x", "pred_y"])
+            for i, name in enumerate(self.names):
+                bx, by = (int(v) for v in self.best_locs[i])
+                w.writerow([name] + ([gt[i]] if gt is not None else [])
+                           + [f"{v:.4f}" for v in self.scores[i]]
+                           + [self.best_states[i], f"{self.best_scores[i]:.4f}", bx, by])
+
+    def save_npz(self, path: str, **extra: np.ndarray):
+        _ensure_dir(path)
+        np.savez(path, scores=self.scores, locs=self.locs, argmax=self.argmax,
+                 names=np.array(self.names), states=np.array(self.states),
+                 templates=np.array(json.dumps(self.templates, ensure_ascii=False)), **extra)
+
+    @classmethod
+    def load_npz(cls, path: str) -> "ScoreMatrix":
+        with np.load(path, allow_pickle=False) as z:
+            return cls([str(n) for n in z["names"]], [str(s) for s in z["states"]], z["scores"], z["locs"],
+                       json.loads(str(z["templates"])))
+
+
+def _ensure_dir(path: str):
+    d = os.path.dirname(path)
+    if d:
+        os.makedirs(d, exist_ok=True)
+
+
+def _read(item: ImageLike) -> Union[np.ndarray, Frame]:
+    if isinstance(item, str):
+        img = cv2.imread(item)
+        if img is None:
+            raise FileNotFoundError(f"无法读取图片: {item}")
+        return img
+    return item
+
+
+def score_row(det, item: ImageLike, states: Sequence[str]) -> Row:
+    """单张图对各状态的 (分数, 位置, 模板)；不走 frame_change / 局部搜索缓存，结果与顺序无关。"""
+    frame = Frame(_read(item)) if not isinstance(item, Frame) else item
+    scores, locs, tmpls = [], [], []
+    for st in states:
+        d = det._score_state(frame, st, local=False)
+        scores.append(d.score if d is not None else 0.0)
+        locs.append(d.loc if d is not None else (-1, -1))
+        tmpls.append(d.template if d is not None else "")
+    return scores, locs, tmpls
+
+
+# ---------- 进程池 ----------
+
+_worker_det = None
+
+
+def _init_worker(det_kwargs: Dict):
+    global _worker_det
+    from war_drone.state_detector import TemplateStateDetector
+    cv2.setNumThreads(1)  # 按图片并行，子进程内不再开 OpenCV 线程
+    _worker_det = TemplateStateDetector(**det_kwargs)
+
+
+def _worker_row(args) -> Row:
+    item, states = args
+    return score_row(_worker_det, item, states)
+
+
+def iter_rows(det, items: Iterable[ImageLike], states: Sequence[str], processes: int = 0,
+              chunksize: int = 4) -> Iterator[Row]:
+    """按输入顺序逐张产出结果；processes>1 时子进程各自读图打分。"""
+    if processes <= 1:
+        for item in items:
+            yield score_row(det, item, states)
+        return
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(det.offline_kwargs(),)) as ex:
+        yield from ex.map(_worker_row, ((it, states) for it in items), chunksize=chunksize)
+
+
+def build(det, items: Iterable[ImageLike], states: Optional[Sequence[str]] = None,
+          processes: int = 0, chunksize: int = 4) -> ScoreMatrix:
+    states = list(states) if states is not None else list(det.state_order)
+    unknown = [s for s in states if s not in det.state_order]
+    if unknown:
+        raise ValueError(f"未定义的状态: {unknown}")
+    names: List[str] = []
+
+    def tagged():
+        for i, item in enumerate(items):
+            names.append(item if isinstance(item, str) else f"#{i}")
+            yield item
+
+    rows = list(iter_rows(det, tagged(), states, processes, chunksize))
+    n, s = len(rows), len(states)
+    scores = np.zeros((n, s), np.float32)
+    locs = np.full((n, s, 2), -1, np.int32)
+    templates = []
+    for i, (sc, lc, tp) in enumerate(rows):
+        scores[i] = sc
+        locs[i] = lc
+        templates.append(tp)
+    return ScoreMatrix(names, states, scores, locs, templates)
@@ -6,7 +6,7 @@ from queue import Queue
 import time
 
 class ScrcpyFrameGrabber:
-    """适配 scrcpy-python 的帧抓取器"""
+    """适配 scrcpy-python 的帧抓取器（frame_id 为收到的帧数，wait_newer 与 ScreenrecordStream 同接口）"""
     
     def __init__(self, device_serial=None, max_fps=30, max_size=1280, bitrate=8000000):
         self.device_serial = device_serial
@@ -18,6 +18,10 @@ class ScrcpyFrameGrabber:
         self.running = False
         self.thread = None
         self.resolution = None  # 将在连接后更新
+        self._cond = threading.Condition()
+        self._frame = None
+        self._ts = 0.0
+        self.frame_id = 0  # 回调收到的帧数（只增不减）
 
     def on_frame(self, frame: np.ndarray):
         """回调函数：收到新画面"""
@@ -27,6 +31,12 @@ class ScrcpyFrameGrabber:
                 self.resolution = (frame.shape[1], frame.shape[0])
                 print(f"[scrcpy] 设备分辨率: {self.resolution}")
             
+            with self._cond:
+                self._frame = frame
+                self._ts = time.time()
+                self.frame_id += 1
+                self._cond.notify_all()
+
             # 更新队列
             if self.frame_queue.full():
                 try: 
@@ -86,6 +96,17 @@ class ScrcpyFrameGrabber:
         except:
             return None
 
+    def wait_newer(self, after_id, timeout=1.0):
+        """等待帧号 > after_id 的帧，返回 (帧, 到达时间戳, 帧号)；超时返回当前最新"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self.frame_id <= after_id:
+                remain = deadline - time.monotonic()
+                if remain <= 0:
+                    break
+                self._cond.wait(remain)
+            return self._frame, self._ts, self.frame_id
+
     def swipe(self, start_x, start_y, end_x, end_y, duration=0.02):
         """执行滑动操作（相对坐标 0-1）"""
         if not self.client or not self.client.resolution:
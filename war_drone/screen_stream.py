@@ -0,0 +1,236 @@
+"""
+连续 H.264 屏幕流帧源：
+- 只启动一次 `adb exec-out screenrecord --output-format=h264 -`，后台 ffmpeg 进程解码为 BGR 原始帧
+- 读线程始终保存“最新一帧 + 时间戳 + 帧号”，消费者拿最新帧，不排队
+- screenrecord 到达时间上限（默认 180s）或进程断开时自动重启，调用方无感
+- 连续 max_spawn_failures 次启动失败（没有 ffmpeg、设备不支持 screenrecord 等，一帧都没出）后结束，
+  error 记录原因，wait_newer() / screencap() 抛出
+- source_file 可替换为本地 .h264 文件（代替真机，便于测试/回放）
+
+与 AdbClient.screencap() 同名接口 screencap()，可直接替换 ScreenshotThread / paddle_runner 中的截屏调用。
+依赖：ffmpeg 可执行文件（PATH 中或通过 ffmpeg_path 指定）
+"""
+from __future__ import annotations
+
+import shutil
+import subprocess
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+def _read_exact(stream, buf: bytearray) -> bool:
+    view = memoryview(buf)
+    got = 0
+    while got < len(buf):
+        n = stream.readinto(view[got:])
+        if not n:
+            return False
+        got += n
+    return True
+
+
+class ScreenrecordStream:
+    def __init__(
+        self,
+        adb=None,
+        decode_size: Optional[Tuple[int, int]] = None,   # 解码输出 (W, H)；None=探测原始尺寸
+        record_size: Optional[str] = None,               # screenrecord --size，如 "1280x576"
+        bit_rate: int = 8_000_000,
+        time_limit: int = 180,
+        source_file: Optional[str] = None,                # 本地 .h264 文件代替设备
+        ffmpeg_path: Optional[str] = None,
+        restart_backoff: float = 0.2,
+        max_spawn_failures: int = 5,                     # 连续启动失败上限（0=不限）
+    ):
+        if adb is None and source_file is None:
+            raise ValueError("需要 adb 客户端或 source_file")
+        self.adb = adb
+        self.decode_size = tuple(decode_size) if decode_size else None
+        self.record_size = record_size
+        self.bit_rate = int(bit_rate)
+        self.time_limit = int(time_limit)
+        self.source_file = source_file
+        self.ffmpeg = ffmpeg_path or shutil.which("ffmpeg") or "ffmpeg"
+        self.restart_backoff = float(restart_backoff)
+        self.max_spawn_failures = int(max_spawn_failures)
+
+        self._cond = threading.Condition()
+        self._frame: Optional[np.ndarray] = None
+        self._ts = 0.0
+        self._frame_id = 0
+        self._returned_id = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._procs: List[subprocess.Popen] = []
+        self.restarts = 0
+        self.error: Optional[Exception] = None  # 放弃重启的原因
+
+    # ---------- 生命周期 ----------
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return self
+        if self.decode_size is None:
+            self.decode_size = self._probe_size()
+        self._stop.clear()
+        self.error = None
+        self._thread = threading.Thread(target=self._run, name="ScreenrecordStream", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._kill_pipeline()
+        if self._thread:
+            self._thread.join(timeout=3.0)
+            self._thread = None
+        with self._cond:
+            self._cond.notify_all()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _probe_size(self) -> Tuple[int, int]:
+        if self.source_file:
+            cap = cv2.VideoCapture(self.source_file)
+            try:
+                w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) or 0)
+                h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0)
+            finally:
+                cap.release()
+            if w <= 0 or h <= 0:
+                raise RuntimeError(f"无法探测视频尺寸，请指定 decode_size: {self.source_file}")
+            return w, h
+        img = self.adb.screencap()
+        return img.shape[1], img.shape[0]
+
+    # ---------- 管线 ----------
+
+    def _producer_cmd(self) -> List[str]:
+        cmd = self.adb._base() + ["exec-out", "screenrecord", "--output-format=h264",
+                      "--bit-rate", str(self.bit_rate), "--time-limit", str(self.time_limit)]
+        if self.record_size:
+            cmd += ["--size", self.record_size]
+        return cmd + ["-"]
+
+    def _decoder_cmd(self, input_arg: str, realtime: bool = False) -> List[str]:
+        w, h = self.decode_size
+        return [
+            self.ffmpeg, "-loglevel", "error", "-nostdin",
+            # 最小探测 + 低延迟解码：首帧尽快出来（不要用 -fflags nobuffer，短输入会无输出）
+            "-probesize", "32", "-analyzeduration", "0", "-flags", "low_delay",
+            *(["-re"] if realtime else []),  # 本地文件按原始帧率播放，模拟真机
+            "-f", "h264", "-i", input_arg,
+            "-vf", f"scale={w}:{h}",
+            "-pix_fmt", "bgr24", "-f", "rawvideo", "pipe:1",
+        ]
+
+    def _spawn(self) -> subprocess.Popen:
+        if self.source_file:
+            dec = subprocess.Popen(self._decoder_cmd(self.source_file, realtime=True), stdout=subprocess.PIPE,
+                                   stderr=subprocess.DEVNULL, stdin=subprocess.DEVNULL)
+            self._procs = [dec]
+            return dec
+        prod = subprocess.Popen(self._producer_cmd(), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        dec = subprocess.Popen(self._decoder_cmd("pipe:0"), stdin=prod.stdout, stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL)
+        prod.stdout.close()  # 只让 ffmpeg 持有读端，screenrecord 退出时 ffmpeg 能收到 EOF
+        self._procs = [prod, dec]
+        return dec
+
+    def _kill_pipeline(self):
+        procs, self._procs = self._procs, []
+        for p in procs:
+            try:
+                if p.poll() is None:
+                    p.kill()
+                p.wait(timeout=2.0)
+            except Exception:
+                pass
+
+    def _run(self):
+        w, h = self.decode_size
+        nbytes = w * h * 3
+        first = True
+        failures = 0   # 连续没出帧的启动次数
+        last_err = "进程退出且没有输出帧"
+        while not self._stop.is_set():
+            if not first:
+                self.restarts += 1
+                if self._stop.wait(self.restart_backoff):
+                    break
+            first = False
+            if self.max_spawn_failures and failures >= self.max_spawn_failures:
+                self._fail(RuntimeError(f"屏幕流连续 {failures} 次启动失败: {last_err}"))
+                break
+            try:
+                dec = self._spawn()
+            except Exception as e:
+                print(f"[WARN] 屏幕流启动失败: {e}")
+                failures += 1
+                last_err = str(e)
+                continue
+            got = 0
+            try:
+                while not self._stop.is_set():
+                    buf = bytearray(nbytes)
+                    if not _read_exact(dec.stdout, buf):
+                        break  # screenrecord 到时/断开 → 重启
+                    frame = np.frombuffer(buf, dtype=np.uint8).reshape(h, w, 3)
+                    got += 1
+                    with self._cond:
+                        self._frame = frame
+                        self._ts = time.time()
+                        self._frame_id += 1
+                        self._cond.notify_all()
+            except Exception as e:
+                if not self._stop.is_set():
+                    print(f"[WARN] 屏幕流读取异常，重启: {e}")
+                    last_err = str(e)
+            finally:
+                self._kill_pipeline()
+            failures = 0 if got else failures + 1
+
+    def _fail(self, err: Exception):
+        print(f"[WARN] {err}")
+        with self._cond:
+            self.error = err
+            self._cond.notify_all()
+
+    # ---------- 取帧 ----------
+
+    @property
+    def frame_id(self) -> int:
+        with self._cond:
+            return self._frame_id
+
+    def latest(self) -> Tuple[Optional[np.ndarray], float, int]:
+        """(最新帧, 到达时间戳, 帧号)；尚无帧时 frame 为 None。"""
+        with self._cond:
+            return self._frame, self._ts, self._frame_id
+
+    def wait_newer(self, after_id: int, timeout: float = 2.0) -> Tuple[Optional[np.ndarray], float, int]:
+        """等待帧号 > after_id 的帧（超时返回当前最新）；流已放弃重启且没有更新的帧时抛出 error。"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._frame_id <= after_id and not self._stop.is_set() and self.error is None:
+                remain = deadline - time.monotonic()
+                if remain <= 0:
+                    break
+                self._cond.wait(remain)
+            if self._frame_id <= after_id and self.error is not None:
+                raise self.error
+            return self._frame, self._ts, self._frame_id
+
+    def screencap(self, timeout: float = 2.0) -> Optional[np.ndarray]:
+        """与 AdbClient.screencap() 兼容：返回比上次更新的一帧 BGR（超时返回最新帧或 None）。"""
+        frame, _, fid = self.wait_newer(self._returned_id, timeout=timeout)
+        self._returned_id = fid
+        return frame
@@ -0,0 +1,142 @@
+"""
+截屏数据解析与模式选择：
+- raw：`screencap`（不带 -p）直接输出帧缓冲，头部 12/16 字节 + RGBA 像素，省掉手机端 PNG 编码和主机端 imdecode
+- RawFrame：像素区是 np.frombuffer 的零拷贝视图；BGR 转换、ROI 裁剪按需惰性进行
+- ScreencapModeSelector：按实测耗时在 raw / png 之间自动选择（USB 快就 raw，网络 adb 慢可能 png 更划算）
+"""
+from __future__ import annotations
+
+import struct
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# android.graphics.PixelFormat 中 screencap 可能输出的格式
+PIXEL_FORMATS: Dict[int, Tuple[int, Optional[int]]] = {
+    # fmt: (bytes_per_pixel, cv2 转 BGR 的 code)
+    1: (4, cv2.COLOR_RGBA2BGR),   # RGBA_8888
+    2: (4, cv2.COLOR_RGBA2BGR),   # RGBX_8888
+    3: (3, cv2.COLOR_RGB2BGR),    # RGB_888
+    5: (4, cv2.COLOR_BGRA2BGR),   # BGRA_8888
+}
+
+
+class RawFrame:
+    """screencap 原始帧；data 保持引用，像素视图不拷贝。"""
+
+    def __init__(self, data: bytes, width: int, height: int, fmt: int, header_size: int):
+        if fmt not in PIXEL_FORMATS:
+            raise ValueError(f"不支持的像素格式: {fmt}")
+        self.data = data
+        self.width = int(width)
+        self.height = int(height)
+        self.fmt = int(fmt)
+        self.header_size = int(header_size)
+        self._bgr: Optional[np.ndarray] = None
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.height, self.width
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.data)
+
+    @property
+    def pixels(self) -> np.ndarray:
+        """(H, W, C) uint8 只读视图，指向 data 内部，不拷贝。"""
+        bpp, _ = PIXEL_FORMATS[self.fmt]
+        n = self.width * self.height * bpp
+        arr = np.frombuffer(self.data, dtype=np.uint8, count=n, offset=self.header_size)
+        return arr.reshape(self.height, self.width, bpp)
+
+    def bgr(self) -> np.ndarray:
+        """整帧 BGR（首次调用时转换并缓存）。"""
+        if self._bgr is None:
+            self._bgr = cv2.cvtColor(self.pixels, PIXEL_FORMATS[self.fmt][1])
+        return self._bgr
+
+    def crop_bgr(self, x1: int, y1: int, x2: int, y2: int) -> np.ndarray:
+        """只转换 ROI 区域；若整帧已转换则直接切片。"""
+        x1 = max(0, int(x1)); y1 = max(0, int(y1))
+        x2 = min(self.width, int(x2)); y2 = min(self.height, int(y2))
+        if self._bgr is not None:
+            return self._bgr[y1:y2, x1:x2]
+        return cv2.cvtColor(self.pixels[y1:y2, x1:x2], PIXEL_FORMATS[self.fmt][1])
+
+
+def parse_raw_screencap(data: bytes) -> RawFrame:
+    """
+    解析 `screencap` 原始输出：
+    - Android 9+：w, h, format, colorspace（4×uint32 LE，16 字节）
+    - 更早版本：w, h, format（12 字节）
+    通过总长度与 w*h*bpp 反推头部大小。
+    """
+    if len(data) < 12:
+        raise ValueError(f"raw screencap 数据过短: {len(data)} bytes")
+    w, h, fmt = struct.unpack_from("<III", data, 0)
+    if fmt not in PIXEL_FORMATS:
+        raise ValueError(f"不支持的像素格式: {fmt}")
+    bpp = PIXEL_FORMATS[fmt][0]
+    payload = w * h * bpp
+    for header_size in (16, 12):
+        if len(data) - header_size == payload:
+            return RawFrame(data, w, h, fmt, header_size)
+    # 某些机型尾部带额外字节：按新格式头部处理
+    if len(data) >= 16 + payload:
+        return RawFrame(data, w, h, fmt, 16)
+    raise ValueError(f"raw screencap 长度不匹配: len={len(data)} w={w} h={h} fmt={fmt}")
+
+
+@dataclass
+class CaptureStat:
+    mode: str
+    nbytes: int
+    transfer_ms: float   # adb 读取耗时（含手机端编码）
+    decode_ms: float     # 主机端解码/转换耗时
+
+    @property
+    def total_ms(self) -> float:
+        return self.transfer_ms + self.decode_ms
+
+    def describe(self) -> str:
+        return f"{self.mode} {self.nbytes / 1024:.0f}KB {self.transfer_ms:.0f}+{self.decode_ms:.0f}ms"
+
+
+@dataclass
+class ScreencapModeSelector:
+    """
+    在 raw / png 之间自适应：
+    - 先各试 probe_frames 帧，取均值较低者
+    - 之后每 reprobe_every 帧再试一次另一种模式，网络/设备状态变化时能切回来
+    """
+    probe_frames: int = 2
+    reprobe_every: int = 120
+    window: int = 8
+    current: str = "raw"
+    _ms: Dict[str, Deque[float]] = field(default_factory=dict)
+    _count: int = 0
+
+    def __post_init__(self):
+        self._ms = {"raw": deque(maxlen=self.window), "png": deque(maxlen=self.window)}
+
+    def next_mode(self) -> str:
+        self._count += 1
+        for mode in ("raw", "png"):
+            if len(self._ms[mode]) < self.probe_frames:
+                return mode
+        if self.reprobe_every > 0 and self._count % self.reprobe_every == 0:
+            return "png" if self.current == "raw" else "raw"
+        return self.current
+
+    def record(self, stat: CaptureStat):
+        self._ms[stat.mode].append(stat.total_ms)
+        if all(len(self._ms[m]) >= self.probe_frames for m in ("raw", "png")):
+            avg = {m: sum(v) / len(v) for m, v in self._ms.items() if v}
+            self.current = min(avg, key=avg.get)
+
+    def averages(self) -> Dict[str, float]:
+        return {m: (sum(v) / len(v) if v else 0.0) for m, v in self._ms.items()}
@@ -7,6 +7,8 @@ from datetime import datetime
 from typing import Tuple, Union
 
 from war_drone.adb_client import AdbClient
+from war_drone.device_profile import orient_like
+from war_drone.frames import open_source
 from war_drone.state_detector import TemplateStateDetector, States, DetectedState
 from war_drone.logger import RunLogger
 
@@ -18,7 +20,8 @@ class SimpleSupportBot:
       - 每个关键步骤：截图、落盘、日志（含点击点）
       - combat 阶段依次点击右下角 6 个支援位
     """
-    def __init__(self, serial=None, use_edges=True, use_mask=True, debug=False):
+    def __init__(self, serial=None, use_edges=True, use_mask=True, debug=False, screencap_mode="png", source=None,
+                 transport="exec"):
         self.pkg = "com.miniclip.drone1"
         self.debug = debug
 
@@ -27,7 +30,16 @@ class SimpleSupportBot:
         self.H = self.cfg["screen"]["height"]
         self.coords = self.cfg["coords"]
 
-        self.adb = AdbClient(serial=serial)
+        self.adb = AdbClient(serial=serial, screencap_mode=screencap_mode, transport=transport)
+        # 设备分辨率与配置 screen 不同时按设备档案缩放（见 war_drone.device_profile）；回放源沿用配置分辨率
+        if source is None or source.startswith("adb"):
+            try:
+                self.W, self.H = orient_like(self.adb.screen_size(), (self.W, self.H))
+            except Exception as e:
+                print(f"[WARN] 读取设备分辨率失败，按配置 {self.W}x{self.H}: {e}")
+        # 帧源：默认 adb 截屏；也可回放目录/视频（见 war_drone.frames）
+        self.src = open_source(source or f"adb:{screencap_mode}", adb=self.adb,
+                               decode_size=(self.W, self.H)).start()
         self.det = TemplateStateDetector(
             cfg_path="configs/config.json5",
             templates_dir="templates",
@@ -35,16 +47,22 @@ class SimpleSupportBot:
             use_mask=use_mask,
             method="CCORR_NORMED",
             default_thresh=0.85,
+            screen_size=(self.W, self.H),
         )
+        self.coords = self.det.coords  # 设备档案可按分辨率覆盖锚点
 
         # 运行会话日志目录
         stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         self.run_dir = os.path.join("runs", f"session_{stamp}")
         os.makedirs(self.run_dir, exist_ok=True)
         self.log = RunLogger(self.run_dir, verbose=debug)
+        if self.det.profile is not None:
+            self.log.info(f"[INFO] 设备档案 {self.det.profile.describe()}")
 
         # 点击抖动（相对屏比例），非精确瞄准时使用
         self.jitter = 0.008
+        # 上一次识别出的状态：作为转移先验传给识别器（按后继优先评估，可提前结束）
+        self.prev_state = States.UNKNOWN.value
 
     # ---------- 基础工具 ----------
 
@@ -52,7 +70,9 @@ class SimpleSupportBot:
         return int(p[0]*self.W), int(p[1]*self.H)
 
     def _screencap_bgr(self):
-        img = self.adb.screencap()
+        img = self.src.screencap()
+        if img is None:
+            raise RuntimeError(f"帧源无画面或已结束: {self.src.name}")
         path = self.log.save_image(img)
         return img, path
 
@@ -81,9 +101,13 @@ class SimpleSupportBot:
         last = None
         while time.time() < end_ts:
             bgr, cap_path = self._screencap_bgr()
-            r = self.det.predict(img_bgr=bgr, margin=0.12)
-            self.log.info(f"[STATE] {os.path.basename(cap_path)} -> {r.name} score={r.score:.3f} by={r.template}")
-            if r.name == target_name and r.score >= self.det.default_thresh:
+            r = self.det.predict(img_bgr=bgr, margin=0.12, prev_state=self.prev_state)
+            if r.name != States.UNKNOWN.value:
+                self.prev_state = r.name
+            cap = self.adb.last_capture.describe() if getattr(self.adb, "last_capture", None) else ""
+            self.log.info(f"[STATE] {os.path.basename(cap_path)} -> {r.name} score={r.score:.3f} by={r.template} "
+                          f"evaluated={self.det.last_states_evaluated}/{len(self.det.state_order)} cap={cap}")
+            if r.name == target_name and r.score >= self.det.thresh_for(r.name):
                 return True, r
             last = r
             time.sleep(poll)
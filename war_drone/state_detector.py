@@ -4,8 +4,12 @@
 - 掩码（mask）匹配：支持 PNG alpha 或 *_mask.png（白=比较，黑=忽略）
 - 边缘预处理（Canny）：降低纯色块误匹配
 - ROI 尺寸 & 偏移：逐状态可覆盖
-- 多模板组合：max / and_min_top2
+- 多模板组合：max / and_min_top2 / and_min / sum / wmean
+- 时间相关性：先在上次匹配位置附近的小窗口搜索，分数不够再回退整 ROI
+- 状态转移先验：给出上一状态时按后继优先评估，领先者确定胜出即提前结束
+- 整 ROI 匹配可走频域互相关（大模板更快，分数与 CCORR_NORMED 一致），按模板尺寸自动选择
 - 动态扩展状态：从 configs/config.json5.extra_states 读取
+- 设备分辨率档案：screen_size 与配置 screen 不同时，ROI / 模板一次性缩放并按分辨率缓存
 
 依赖：OpenCV(cv2), numpy, json5
 """
@@ -14,13 +18,24 @@ from __future__ import annotations
 
 import os
 import enum
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple, Union
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 
 import cv2
 import numpy as np
 import json5
 
+from war_drone.device_profile import DeviceProfile
+from war_drone.frame import EDGE_HI, EDGE_LO, Frame, as_frame, merge_boxes
+from war_drone import fft_match, score_matrix
+from war_drone.frame_change import FrameChangeDetector
+from war_drone.score_matrix import ScoreMatrix
+from war_drone.template_bank import TemplateBank, normalize_template_spec
+
+PYRAMID_EDGE_MARGIN = 8  # 金字塔精匹配窗口做 Canny 时的外扩像素（减小窗口边界效应）
 
 # --------------------- 数据结构 ---------------------
 
@@ -47,13 +62,19 @@ def _bytes_to_bgr(img_bytes: bytes) -> np.ndarray:
     arr = np.frombuffer(img_bytes, dtype=np.uint8)
     return cv2.imdecode(arr, cv2.IMREAD_COLOR)
 
+def _roi_box(wh: Tuple[int, int], center_xy: Tuple[int, int], half_w: int, half_h: int) -> Tuple[int, int, int, int]:
+    """以 center 为中心的 ROI 像素框 (x1, y1, x2, y2)，裁到画面内"""
+    W, H = wh
+    cx, cy = center_xy
+    return max(0, cx - half_w), max(0, cy - half_h), min(W, cx + half_w), min(H, cy + half_h)
+
 def _crop_roi(img: np.ndarray, center_xy: Tuple[int, int], half_w: int, half_h: int) -> Tuple[np.ndarray, Tuple[int, int]]:
-    """以 center 为中心裁 ROI，返回 roi 以及其相对整屏的左上角偏移 (ox, oy)"""
+    """以 center 为中心裁 ROI（视图，不复制），返回 roi 以及其相对整屏的左上角偏移 (ox, oy)"""
     H, W = img.shape[:2]
     cx, cy = center_xy
     x1 = max(0, cx - half_w); y1 = max(0, cy - half_h)
     x2 = min(W, cx + half_w); y2 = min(H, cy + half_h)
-    return img[y1:y2, x1:x2].copy(), (x1, y1)
+    return img[y1:y2, x1:x2], (x1, y1)
 
 def _load_template_and_mask(path: str) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
     """
@@ -93,6 +114,61 @@ def _load_template_and_mask(path: str) -> Tuple[Optional[np.ndarray], Optional[n
     return None, None
 
 
+def _prep_edges(bgr: np.ndarray) -> np.ndarray:
+    """边缘预处理：灰度 → 3x3 高斯 → Canny（与 Frame.edges 一致）"""
+    g = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
+    g = cv2.GaussianBlur(g, (3, 3), 0)
+    return cv2.Canny(g, EDGE_LO, EDGE_HI)
+
+
+def _limit_cv_threads(workers: int, cv_threads: Optional[int] = None) -> int:
+    """
+    并发评估时限制 OpenCV 内部线程池：默认 CPU 数 / workers（至少 1）。
+    cv2.setNumThreads 为进程级设置：自动模式只调小不调大，显式给出 cv_threads 则照设；<0 表示不干预。返回生效的线程数。
+    """
+    current = cv2.getNumThreads()
+    if cv_threads is not None and cv_threads < 0:
+        return current
+    target = cv_threads if cv_threads is not None else max(1, (os.cpu_count() or 1) // max(1, workers))
+    if target < current or cv_threads is not None:
+        cv2.setNumThreads(int(target))
+    return cv2.getNumThreads()
+
+
+# 多模板组合方式
+# - max          ：取最高
+# - and_min_top2 ：取前两高中的较低者（需要至少两张模板同时高分）
+# - and_min      ：所有模板的最低分（全部都要命中）
+# - sum          ：加权求和 Σ w·s（权重之和可大于 1，用来让多张中等分数的模板联合过阈值）
+# - wmean        ：加权平均 Σ w·s / Σ w
+COMBINE_MODES = ("max", "and_min_top2", "and_min", "sum", "wmean")
+
+
+def fuse_scores(matches: List[Tuple[float, Tuple[int, int], str]], mode: str,
+                weights: Optional[Dict[str, float]] = None) -> Tuple[float, Tuple[int, int], str]:
+    """
+    按组合方式合成状态分数，返回 (score, loc, tpath)；loc/tpath 取加权贡献最大的模板。
+    weights 覆盖的模板若不在 matches 中（缺失 / 比 ROI 大）按 0 分计入。
+    """
+    weights = weights or {}
+    w = lambda p: weights.get(p, 1.0)
+    best = max(matches, key=lambda m: m[0] * (w(m[2]) if mode in ("sum", "wmean") else 1.0))
+    scores = {p: s for s, _, p in matches}
+    if mode == "and_min_top2" and len(matches) >= 2:
+        score = sorted(scores.values(), reverse=True)[1]
+    elif mode == "and_min":
+        score = min(scores.get(p, 0.0) for p in (weights or scores))
+    elif mode in ("sum", "wmean"):
+        paths = list(weights) or list(scores)
+        score = sum(w(p) * scores.get(p, 0.0) for p in paths)
+        if mode == "wmean":
+            total = sum(w(p) for p in paths)
+            score = score / total if total > 0 else 0.0
+    else:
+        score = best[0]
+    return float(score), best[1], best[2]
+
+
 # --------------------- 识别器 ---------------------
 
 class TemplateStateDetector:
@@ -105,8 +181,30 @@ class TemplateStateDetector:
         default_thresh: float = 0.85,   # 置信度阈值
         use_edges: bool = True,         # 全局：是否做边缘预处理
         use_mask: bool = True,          # 全局：是否使用 mask 匹配
+        frame_change=None,              # 画面未变化时复用结果：FrameChangeDetector / dict / True；None=读配置
+        template_cache: Optional[str] = None,  # 模板库 .npz 缓存路径（None=不缓存）
+        template_reload_s: float = 1.0,        # 模板 mtime 检查间隔（秒，<0 关闭自动重载）
+        pyramid_levels: Union[None, int, Dict[str, int]] = None,  # 金字塔层数：None=读配置；int=所有状态；dict=逐状态
+        pyramid_pad: int = 4,                  # 精匹配窗口在粗峰值外额外留的像素
+        pyramid_min_tmpl: int = 12,            # 粗层模板最短边下限，不足则减少层数
+        pyramid_topk: int = 1,                 # 粗层取几个候选峰值做精匹配
+        workers: int = 0,                      # >1 时用线程池并发评估各状态（OpenCV 计算期间释放 GIL）
+        cv_threads: Optional[int] = None,      # 并发时 cv2.setNumThreads；None=自动（CPU 数 / workers），<0 不改
+        local_search_pad: Optional[int] = None,  # 先在上次匹配位置 ±pad 像素内搜索；None=读配置，0=关闭
+        local_thresh: Optional[float] = None,    # 局部命中阈值（单模板分数）；None=default_thresh
+        state_fsm: Optional[Dict] = None,        # 状态转移先验 {transitions, popups, rival_ceiling}；None=读配置
+        match_backend: Optional[str] = None,     # 整 ROI 匹配后端 spatial / fft / auto（仅 CCORR_NORMED）；None=读配置
+        screen_size: Optional[Tuple[int, int]] = None,  # 设备分辨率（如 AdbClient.screen_size()）；None=配置 screen
     ):
+        self._init_kwargs = {k: v for k, v in locals().items() if k != "self"}  # score_many 子进程按同样参数重建
         self.cfg = json5.load(open(cfg_path, "r", encoding="utf-8"))
+        # 设备分辨率档案：与配置 screen 不同时，像素量 / 模板按档案缩放（见 war_drone.device_profile）
+        self.profile: Optional[DeviceProfile] = None
+        if screen_size is not None:
+            profile = DeviceProfile.from_cfg(self.cfg, screen_size)
+            if not profile.identity:
+                self.profile = profile
+                self.cfg = profile.apply(self.cfg)
         self.wh = (self.cfg["screen"]["width"], self.cfg["screen"]["height"])
         self.coords = self.cfg["coords"]
         self.extra_states_cfg = self.cfg.get("extra_states", [])
@@ -114,6 +212,9 @@ class TemplateStateDetector:
         self.default_thresh = float(default_thresh)
         self.use_edges = bool(use_edges)
         self.use_mask = bool(use_mask)
+        self.frame_change = FrameChangeDetector.from_cfg(
+            frame_change if frame_change is not None else self.cfg.get("frame_change"))
+        self._cached_margin: Optional[float] = None
 
         # OpenCV 模板匹配方法映射
         _mm = {
@@ -132,6 +233,8 @@ class TemplateStateDetector:
                 States.COMBAT:     (260, 260),  # 稍大，容忍战斗内漂移
                 States.SETTLEMENT: (280, 180),
             }
+        if self.profile is not None:
+            roi_half_size = {k: self.profile.half_size(v) for k, v in roi_half_size.items()}
         self.roi_half_size = roi_half_size
 
         # 基础四状态：模板与锚点（字符串 key）
@@ -149,9 +252,7 @@ class TemplateStateDetector:
             "settlement": "collect",
         }
 
-        # 组合策略（多模板如何合成分数）
-        # - "max": 取最高
-        # - "and_min_top2": 取前两高中的较低者（需要至少两张模板同时高分）
+        # 组合策略（多模板如何合成分数），见 COMBINE_MODES
         self.combine_mode: Dict[str, str] = {
             "list": "max", "prebattle": "max", "combat": "max", "settlement": "max"
         }
@@ -161,6 +262,9 @@ class TemplateStateDetector:
             "combat": False  # 经验：支援图标大色块，边缘会削弱信息
         }
 
+        # 不用边缘时是否单通道匹配（None=按模板自动：三通道几乎相同的模板走灰度）
+        self.gray_per_state: Dict[str, Optional[bool]] = {}
+
         # 每状态 ROI 尺寸/偏移（字符串 key）
         self.roi_half_size_per_state: Dict[str, Tuple[int,int]] = {
             "list": self.roi_half_size[States.LIST],
@@ -175,91 +279,406 @@ class TemplateStateDetector:
             "settlement": (0.0, 0.0),
         }
 
-        # 注入扩展状态（配置驱动）
+        # 每状态置信度阈值（未配置用 default_thresh）；sum 模式分数量纲随权重变化，需要单独给
+        self.thresh_per_state: Dict[str, float] = {}
+
+        # 每模板附加参数（如 weight），key 为模板路径
+        self.template_opts: Dict[str, Dict[str, Dict]] = {}
+
+        # 注入扩展状态（配置驱动）；模板条目可为文件名或 {file, weight, ...}
         for s in self.extra_states_cfg:
             name = s["name"]
             self.anchor_keys[name] = s["anchor"]
-            self.templates[name] = [os.path.join(templates_dir, t) for t in s.get("templates", [])]
+            specs = [normalize_template_spec(t, templates_dir) for t in s.get("templates", [])]
+            self.templates[name] = [p for p, _ in specs]
+            self.template_opts[name] = {p: opts for p, opts in specs}
+            for p, opts in specs:
+                if "anchor" in opts and opts["anchor"] not in self.coords:
+                    raise ValueError(f"状态 {name} 模板 {os.path.basename(p)} 的 anchor 不在 coords 中: {opts['anchor']}")
             if "roi_half_size" in s:
                 self.roi_half_size_per_state[name] = (int(s["roi_half_size"][0]), int(s["roi_half_size"][1]))
+            elif name not in self.roi_half_size_per_state and self.profile is not None:
+                self.roi_half_size_per_state[name] = self.profile.half_size((220, 180))
             if "roi_offset_pct" in s:
                 self.roi_offset_pct[name] = (float(s["roi_offset_pct"][0]), float(s["roi_offset_pct"][1]))
             self.use_edges_per_state[name] = s.get("use_edges", None)
+            self.gray_per_state[name] = s.get("gray", None)
+            if "thresh" in s:
+                self.thresh_per_state[name] = float(s["thresh"])
             self.combine_mode[name] = s.get("combine_mode", "max")
-
-        # 最终识别顺序：基础四状态 + 扩展状态（按配置定义顺序）
-        self.state_order: List[str] = base_states + [s["name"] for s in self.extra_states_cfg]
+            if self.combine_mode[name] not in COMBINE_MODES:
+                raise ValueError(f"状态 {name} 的 combine_mode 未知: {self.combine_mode[name]}"
+                                 f"（可选 {'/'.join(COMBINE_MODES)}）")
+
+        # 金字塔层数（0=全分辨率匹配）：配置顶层 pyramid_levels: {state: n}，扩展状态也可单独写 pyramid_levels
+        self.pyramid_pad = int(pyramid_pad)
+        self.pyramid_min_tmpl = int(pyramid_min_tmpl)
+        self.pyramid_topk = int(pyramid_topk)
+        self.pyramid_levels: Dict[str, int] = {k: int(v) for k, v in self.cfg.get("pyramid_levels", {}).items()}
+        for s in self.extra_states_cfg:
+            if "pyramid_levels" in s:
+                self.pyramid_levels[s["name"]] = int(s["pyramid_levels"])
+        if isinstance(pyramid_levels, dict):
+            self.pyramid_levels.update({k: int(v) for k, v in pyramid_levels.items()})
+
+        # 最终识别顺序：基础四状态 + 扩展状态（按配置定义顺序；扩展同名状态覆盖基础定义，不重复评估）
+        self.state_order: List[str] = list(dict.fromkeys(base_states + [s["name"] for s in self.extra_states_cfg]))
+
+        if isinstance(pyramid_levels, int):
+            self.pyramid_levels = {k: int(pyramid_levels) for k in self.state_order}
+
+        self._roi_plans: Dict[Tuple[int, int], Dict] = {}  # 画面尺寸 -> roi_plan
+
+        # 时间相关性：记住每个 (状态, 模板) 上次的匹配位置，先在其附近小窗口搜索
+        self.local_search_pad = int(self.cfg.get("local_search_pad", 0) if local_search_pad is None else local_search_pad)
+        self.local_thresh = local_thresh
+        self._last_loc: Dict[Tuple[str, str], Tuple[int, int]] = {}
+        self._full_ms: Dict[Tuple[str, str], float] = {}  # 整 ROI 匹配耗时的滑动平均，用于估算节省
+        self._local_lock = threading.Lock()
+        self.local_hits = 0
+        self.local_misses = 0
+        self.local_saved_ms = 0.0
+
+        # 状态转移先验：predict(prev_state=...) 时的评估顺序与“对手分数上限”
+        fsm = self.cfg.get("state_fsm", {}) if state_fsm is None else state_fsm
+        self.transitions: Dict[str, List[str]] = {k: list(v) for k, v in fsm.get("transitions", {}).items()}
+        self.popups: List[str] = list(fsm.get("popups", []))
+        ceiling = fsm.get("rival_ceiling", 1.0)
+        if isinstance(ceiling, dict):
+            ceiling = dict(ceiling)
+            self.rival_ceiling_default = float(ceiling.pop("default", 1.0))
+            self.rival_ceiling: Dict[str, float] = {k: float(v) for k, v in ceiling.items()}
+        else:
+            self.rival_ceiling_default, self.rival_ceiling = float(ceiling), {}
+        for name in list(self.transitions) + [t for v in self.transitions.values() for t in v] + self.popups:
+            if name not in self.state_order:
+                raise ValueError(f"state_fsm 中的状态未定义: {name}")
+        # 共用模板的状态（如 settlement / settlement_noads）互为兄弟：分数相关，提前结束前必须一起评估
+        self._siblings: Dict[str, List[str]] = {
+            st: [o for o in self.state_order if o != st and set(self.templates.get(o, [])) & set(self.templates.get(st, []))]
+            for st in self.state_order
+        }
+        self.last_states_evaluated = 0  # 最近一帧实际评估的状态数（画面未变复用结果时为 0）
+        self.states_evaluated_total = 0
+        self.frames_evaluated = 0
+
+        # 整 ROI 匹配后端：auto 时按 (模板, ROI 尺寸) 一次性微基准选空间域 / 频域（见 war_drone.fft_match）
+        self.match_backend = match_backend or self.cfg.get("match_backend", "auto")
+        if self.match_backend not in fft_match.BACKENDS:
+            raise ValueError(f"match_backend 未知: {self.match_backend}（可选 {'/'.join(fft_match.BACKENDS)}）")
+        self._fft: Dict[Tuple, Optional[fft_match.FFTCorrelator]] = {}
+        self.backend_report: List[Dict] = []
+
+        # 并发评估状态：线程池 + 限制 OpenCV 自身线程数，避免 workers × OpenCV 线程超订
+        self.workers = max(0, int(workers))
+        self._pool: Optional[ThreadPoolExecutor] = None
+        if self.workers > 1:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="state")
+            _limit_cv_threads(self.workers, cv_threads)
+
+        # 模板库：一次性读入 BGR / mask / 边缘图，predict 时不再读盘
+        # 有设备档案时读入即缩放，并按 分辨率 + scale 单独缓存（template_cache 缺省用配置 template_cache_dir）
+        loader = _load_template_and_mask
+        if self.profile is not None:
+            loader = lambda p: self.profile.load_template(p, _load_template_and_mask)
+            template_cache = self.profile.cache_path(
+                template_cache or self.cfg.get("template_cache_dir", os.path.join(".cache", "templates")))
+        self.bank = TemplateBank(
+            loader, _prep_edges,
+            paths=[p for st in self.state_order for p in self.templates.get(st, [])],
+            cache_path=template_cache, reload_interval=template_reload_s,
+        )
+        self._warmup_backends()
+
+    def thresh_for(self, state: Union[States, str]) -> float:
+        """该状态的置信度阈值（extra_states 可配 thresh，否则 default_thresh）。"""
+        key = state.value if isinstance(state, States) else state
+        return self.thresh_per_state.get(key, self.default_thresh)
 
     # ---------- 预处理 ----------
 
     def _prep(self, bgr: np.ndarray) -> np.ndarray:
         """边缘预处理：Canny；关闭则直接返回原图。"""
-        g = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
-        g = cv2.GaussianBlur(g, (3, 3), 0)
-        e = cv2.Canny(g, 60, 120)
-        return e
+        return _prep_edges(bgr)
 
     def _pct_to_px(self, p) -> Tuple[int, int]:
         return int(p[0] * self.wh[0]), int(p[1] * self.wh[1])
 
     # ---------- 匹配 ----------
 
-    def _best_matches_in_state(self, img_bgr: np.ndarray, state: Union[States, str]) -> List[Tuple[float, Tuple[int, int], str]]:
+    def _roi_center(self, key: str, opts: Optional[Dict] = None) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+        """ROI 中心与半尺寸：模板参数（anchor / roi_half_size / roi_offset_pct）优先，其次状态设置。"""
+        opts = opts or {}
+        anchor = opts.get("anchor", self.anchor_keys[key])
+        cx, cy = self._pct_to_px(self.coords[anchor])
+        offx, offy = opts.get("roi_offset_pct", self.roi_offset_pct.get(key, (0.0, 0.0)))
+        cx += int(offx * self.wh[0]); cy += int(offy * self.wh[1])
+        half_w, half_h = opts.get("roi_half_size", self.roi_half_size_per_state.get(key, (220, 180)))
+        return (cx, cy), (int(half_w), int(half_h))
+
+    def _best_matches_in_state(self, img_bgr: Union[np.ndarray, Frame], state: Union[States, str],
+                               local: bool = True) -> List[Tuple[float, Tuple[int, int], str]]:
         """
-        返回该状态下各模板最佳匹配列表 [(score, loc, tpath), ...]
+        返回该状态下各模板最佳匹配列表 [(score, loc, tpath), ...]（按模板配置顺序）
+        - img_bgr 可以是 ndarray 或共享的 Frame（灰度/边缘图整帧只算一次，ROI 为视图）
         - score：越大越好（若用 SQDIFF(_NORMED)，已转换为 1 - min）
         - loc：匹配到的左上角（整屏坐标）
         - tpath：模板路径
+        - 模板可单独指定 anchor / roi_half_size / roi_offset_pct；同一 ROI 的模板共用一次预处理
+        - 不同状态重叠的 ROI 按 roi_plan 合并为区域，区域在 Frame 上只预处理一次（各 ROI 为视图）
+        - local=False 时不用也不更新局部搜索位置（离线打分，结果与调用顺序无关）
         """
         key = state.value if isinstance(state, States) else state
+        frame = as_frame(img_bgr)
+        levels = self.pyramid_levels.get(key, 0)
+        plan = self.roi_plan(frame.wh)
 
-        # ROI 中心 = 锚点坐标 + 相对偏移
-        anchor = self.anchor_keys[key]
-        cx, cy = self._pct_to_px(self.coords[anchor])
-        offx, offy = self.roi_offset_pct.get(key, (0.0, 0.0))
-        cx += int(offx * self.wh[0]); cy += int(offy * self.wh[1])
-
-        half_w, half_h = self.roi_half_size_per_state.get(key, (220, 180))
-        roi_bgr, (ox, oy) = _crop_roi(img_bgr, (cx, cy), half_w, half_h)
-
-        # 是否对本状态启用边缘
-        ue = self.use_edges_per_state.get(key, None)
-        use_edges_state = self.use_edges if ue is None else ue
-        roiX = self._prep(roi_bgr) if use_edges_state else roi_bgr
-
-        results: List[Tuple[float, Tuple[int, int], str]] = []
-        for tpath in self.templates.get(key, []):
-            if not os.path.exists(tpath):
-                continue
-            tmpl_bgr, mask = _load_template_and_mask(tpath)
-            if tmpl_bgr is None:
-                continue
-            tmplX = self._prep(tmpl_bgr) if use_edges_state else tmpl_bgr
+        found: Dict[str, Tuple[float, Tuple[int, int], str]] = {}
+        roi_cache: Dict[Tuple, np.ndarray] = {}  # (框, kind) -> 整个 ROI 的预处理图；金字塔模式下只在精匹配窗口内计算
+        for entry, box, kind in self._state_rois(key, frame.wh):
+            x1, y1, x2, y2 = box
+            tmplX = entry.image(kind)
 
             # 尺寸检查
-            if tmplX.shape[0] > roiX.shape[0] or tmplX.shape[1] > roiX.shape[1]:
+            if tmplX.shape[0] > y2 - y1 or tmplX.shape[1] > x2 - x1:
                 continue
 
-            # 是否启用 mask（方法需支持）
-            supports_mask = self.method in (cv2.TM_CCORR_NORMED, cv2.TM_SQDIFF, cv2.TM_SQDIFF_NORMED)
-            use_mask = (self.use_mask and (mask is not None) and supports_mask)
-
-            if use_mask:
-                res = cv2.matchTemplate(roiX, tmplX, self.method, mask=mask)
-            else:
-                res = cv2.matchTemplate(roiX, tmplX, self.method)
+            hit = self._match_local(frame, key, box, kind, entry) if local else None
+            if hit is None:
+                t0 = time.perf_counter()
+                if levels > 0:
+                    hit = self._match_pyramid(frame, box, kind, entry, levels, plan)
+                if hit is None:
+                    roiX = roi_cache.get((box, kind))
+                    if roiX is None:
+                        roiX = roi_cache[(box, kind)] = frame.crop(*box, kind=kind, region=plan.get((kind, 0, box)))
+                    hit = self._match_full(roiX, entry, kind)
+                if local:
+                    self._remember(key, entry.path, hit, (x1, y1), (time.perf_counter() - t0) * 1000.0)
+            score, (mx, my) = hit
+            found[entry.path] = (score, (mx + x1, my + y1), entry.path)
+
+        return [found[p] for p in self.templates.get(key, []) if p in found]
+
+    def _kind_for(self, key: str, entry) -> str:
+        """匹配用的预处理：edges；否则灰度模板（或状态配置 gray: true）走单通道 gray，其余 bgr。"""
+        ue = self.use_edges_per_state.get(key, None)
+        if self.use_edges if ue is None else ue:
+            return "edges"
+        g = self.gray_per_state.get(key)
+        return "gray" if (entry.is_gray if g is None else g) else "bgr"
+
+    def _state_rois(self, key: str, wh: Tuple[int, int]) -> List[Tuple]:
+        """该状态各模板的 (entry, ROI 框, kind)，按模板配置顺序。"""
+        opts_by_path = self.template_opts.get(key, {})
+        out = []
+        for entry in self.bank.entries(self.templates.get(key, [])):
+            center, (half_w, half_h) = self._roi_center(key, opts_by_path.get(entry.path))
+            out.append((entry, _roi_box(wh, center, half_w, half_h), self._kind_for(key, entry)))
+        return out
+
+    def roi_plan(self, wh: Tuple[int, int]) -> Dict[Tuple, Tuple[int, int, int, int]]:
+        """
+        各状态 ROI 的共享预处理区域：{(kind, 金字塔层, 框): 合并区域}，按画面尺寸缓存。
+        同一 (kind, 层) 下重叠的框合并（见 frame.merge_boxes），区域只做一次灰度 / Canny / 缩放。
+        """
+        plan = self._roi_plans.get(wh)
+        if plan is None:
+            boxes: Dict[Tuple[str, int], List] = {}
+            for st in self.state_order:
+                for _, box, kind in self._state_rois(st, wh):
+                    for n in range(self.pyramid_levels.get(st, 0) + 1):
+                        boxes.setdefault((kind, n), []).append(box)
+            plan = {(kind, n, b): r for (kind, n), bs in boxes.items() for b, r in merge_boxes(bs).items()}
+            self._roi_plans[wh] = plan
+        return plan
+
+    def _match_map(self, roiX: np.ndarray, tmplX: np.ndarray, mask: Optional[np.ndarray]) -> np.ndarray:
+        """matchTemplate 结果图，统一为“越大越好”（SQDIFF 取 1 - v）。"""
+        # 是否启用 mask（方法需支持）
+        supports_mask = self.method in (cv2.TM_CCORR_NORMED, cv2.TM_SQDIFF, cv2.TM_SQDIFF_NORMED)
+        use_mask = (self.use_mask and (mask is not None) and supports_mask)
+
+        if use_mask:
+            res = cv2.matchTemplate(roiX, tmplX, self.method, mask=mask)
+        else:
+            res = cv2.matchTemplate(roiX, tmplX, self.method)
+        if self.method in (cv2.TM_SQDIFF, cv2.TM_SQDIFF_NORMED):
+            res = 1.0 - res
+        elif use_mask:
+            res[~np.isfinite(res)] = 0.0  # 带 mask 时窗口能量为 0 会得到 inf/nan，与频域后端一致记 0
+        return res
+
+    def _match(self, roiX: np.ndarray, tmplX: np.ndarray, mask: Optional[np.ndarray]) -> Tuple[float, Tuple[int, int]]:
+        """单次 matchTemplate，返回 (score, ROI 内左上角)；score 越大越好。"""
+        _, max_val, _, max_loc = cv2.minMaxLoc(self._match_map(roiX, tmplX, mask))
+        return float(max_val), max_loc
+
+    # ---------- 整 ROI 匹配后端（空间域 / 频域） ----------
+
+    def _use_mask_for(self, entry) -> bool:
+        supports_mask = self.method in (cv2.TM_CCORR_NORMED, cv2.TM_SQDIFF, cv2.TM_SQDIFF_NORMED)
+        return self.use_mask and entry.mask is not None and supports_mask
+
+    def _fft_for(self, entry, kind: str, roi_shape: Tuple[int, int]) -> Optional[fft_match.FFTCorrelator]:
+        """该 (模板, kind, ROI 尺寸) 的频域相关器；选了空间域（或方法不支持）返回 None。首次调用时决定并缓存。"""
+        if self.match_backend == fft_match.SPATIAL or self.method != cv2.TM_CCORR_NORMED:
+            return None
+        key = (entry.path, entry.stamp, kind, tuple(roi_shape[:2]))
+        if key in self._fft:
+            return self._fft[key]
+        tmplX = entry.image(kind)
+        if tmplX.shape[0] > roi_shape[0] or tmplX.shape[1] > roi_shape[1]:
+            return None
+        mask = entry.mask if self._use_mask_for(entry) else None
+        if self.match_backend == fft_match.FFT:
+            corr, choice, t_sp, t_fft = fft_match.FFTCorrelator(tmplX, mask, roi_shape), fft_match.FFT, None, None
+        else:
+            choice, corr, t_sp, t_fft = fft_match.choose_backend(
+                tmplX, mask, roi_shape, lambda r: self._match_map(r, tmplX, entry.mask))
+        self._fft[key] = corr
+        self.backend_report.append({"template": entry.name, "kind": kind, "roi": tuple(roi_shape[:2]),
+                                    "backend": choice, "spatial_ms": t_sp, "fft_ms": t_fft})
+        return corr
+
+    def _warmup_backends(self):
+        """构造时为配置分辨率下走整 ROI 匹配的模板（pyramid_levels=0 的状态）预算频谱 / 选后端。"""
+        if self.match_backend == fft_match.SPATIAL or self.method != cv2.TM_CCORR_NORMED:
+            return
+        for st in self.state_order:
+            if self.pyramid_levels.get(st, 0) > 0:
+                continue  # 金字塔状态只在回退时整 ROI 匹配，首次用到再决定
+            for entry, (x1, y1, x2, y2), kind in self._state_rois(st, self.wh):
+                self._fft_for(entry, kind, (y2 - y1, x2 - x1))
+
+    def _match_full(self, roiX: np.ndarray, entry, kind: str) -> Tuple[float, Tuple[int, int]]:
+        """整 ROI 匹配：按选定后端走频域或 matchTemplate，分数一致（CCORR_NORMED）。"""
+        corr = self._fft_for(entry, kind, roiX.shape[:2])
+        if corr is None:
+            return self._match(roiX, entry.image(kind), entry.mask)
+        _, max_val, _, max_loc = cv2.minMaxLoc(corr.match(roiX))
+        return float(max_val), max_loc
+
+    def _match_pyramid(self, frame: Frame, box: Tuple[int, int, int, int], kind: str, entry,
+                       levels: int, plan: Optional[Dict] = None) -> Optional[Tuple[float, Tuple[int, int]]]:
+        """
+        由粗到细：先在 ROI 的第 levels 层（1/2**levels）匹配缩小的模板，取前 pyramid_topk 个峰值，
+        再在原分辨率各峰值附近 ±(2**levels + pyramid_pad) 的小窗口内精匹配，取最高者。
+        边缘图只在窗口（外扩 PYRAMID_EDGE_MARGIN，不出 ROI）内计算，与整 ROI Canny 仅在窗口边缘可能有细微差别。
+        模板缩小后过小（< pyramid_min_tmpl）时自动减少层数；无法使用时返回 None（走全分辨率）。
+        """
+        x1, y1, x2, y2 = box
+        rw, rh = x2 - x1, y2 - y1
+        tmplX = entry.image(kind)
+        while levels > 0 and min(entry.image(kind, levels).shape[:2]) < self.pyramid_min_tmpl:
+            levels -= 1
+        if levels <= 0:
+            return None
 
-            min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(res)
-            if self.method in (cv2.TM_SQDIFF, cv2.TM_SQDIFF_NORMED):
-                score = 1.0 - float(min_val)
-                loc = (min_loc[0] + ox, min_loc[1] + oy)
-            else:
-                score = float(max_val)
-                loc = (max_loc[0] + ox, max_loc[1] + oy)
+        s = 2 ** levels
+        region = (plan or {}).get((kind, levels, box))
+        roiL = frame.crop(x1, y1, x2, y2, kind=kind, n=levels, region=region)
+        # 取自合并区域时，粗层原点相对 ROI 左上角偏移 (-ox, -oy)（区域内偏移按 2**levels 取整的余数）
+        ox, oy = ((x1 - region[0]) % s, (y1 - region[1]) % s) if region else (0, 0)
+        tmplL = entry.image(kind, levels)
+        if tmplL.shape[0] > roiL.shape[0] or tmplL.shape[1] > roiL.shape[1]:
+            return None
+        res = self._match_map(roiL, tmplL, entry.mask_at(levels))
+
+        best = None
+        pad = s + self.pyramid_pad
+        for _ in range(max(1, self.pyramid_topk)):
+            _, _, _, (lx, ly) = cv2.minMaxLoc(res)
+            # 抑制该峰值邻域，下一轮取次峰
+            res[max(0, ly - 2):ly + 3, max(0, lx - 2):lx + 3] = -np.inf
+
+            # 粗峰值换算回原分辨率 ROI 坐标，取精匹配窗口
+            gx, gy = lx * s - ox, ly * s - oy
+            wx1, wy1 = max(0, gx - pad), max(0, gy - pad)
+            wx2 = min(rw, gx + tmplX.shape[1] + pad)
+            wy2 = min(rh, gy + tmplX.shape[0] + pad)
+            hit = self._match_window(frame, box, kind, entry, (wx1, wy1, wx2, wy2))
+            if hit is not None and (best is None or hit[0] > best[0]):
+                best = hit
+        return best
 
-            results.append((score, loc, tpath))
+    def _match_window(self, frame: Frame, box: Tuple[int, int, int, int], kind: str, entry,
+                      win: Tuple[int, int, int, int]) -> Optional[Tuple[float, Tuple[int, int]]]:
+        """在 ROI 内的小窗口 win（ROI 坐标）中原分辨率匹配，返回 (score, ROI 内左上角)；窗口比模板小返回 None。"""
+        x1, y1, x2, y2 = box
+        wx1, wy1, wx2, wy2 = win
+        tmplX = entry.image(kind)
+        if wy2 - wy1 < tmplX.shape[0] or wx2 - wx1 < tmplX.shape[1]:
+            return None
+        margin = PYRAMID_EDGE_MARGIN if kind == "edges" else 0
+        ex1, ey1 = max(0, wx1 - margin), max(0, wy1 - margin)
+        ex2, ey2 = min(x2 - x1, wx2 + margin), min(y2 - y1, wy2 + margin)
+        big = frame.crop(x1 + ex1, y1 + ey1, x1 + ex2, y1 + ey2, kind=kind)
+        window = big[wy1 - ey1:wy2 - ey1, wx1 - ex1:wx2 - ex1]
+        score, (mx, my) = self._match(window, tmplX, entry.mask)
+        return score, (mx + wx1, my + wy1)
+
+    # ---------- 时间相关性：上次位置附近的局部搜索 ----------
+
+    def _local_thresh(self) -> float:
+        """局部命中 / 记住位置的阈值：比较的是单个模板的原始分数，不能用按融合分数配置的状态阈值（如 combat 的 sum）。"""
+        return float(self.default_thresh if self.local_thresh is None else self.local_thresh)
+
+    def _match_local(self, frame: Frame, key: str, box: Tuple[int, int, int, int], kind: str,
+                     entry) -> Optional[Tuple[float, Tuple[int, int]]]:
+        """
+        在上次匹配位置 ±local_search_pad 的窗口内匹配；分数不低于阈值则直接采用（返回 ROI 内坐标），
+        否则忘掉该位置并返回 None（调用方回退整 ROI 搜索）。
+        """
+        if self.local_search_pad <= 0:
+            return None
+        with self._local_lock:  # workers>1 时各状态在线程池里并发读写
+            last = self._last_loc.get((key, entry.path))
+        if last is None:
+            return None
+        t0 = time.perf_counter()
+        x1, y1, x2, y2 = box
+        th, tw = entry.image(kind).shape[:2]
+        pad = self.local_search_pad
+        lx, ly = last[0] - x1, last[1] - y1
+        win = (max(0, lx - pad), max(0, ly - pad), min(x2 - x1, lx + tw + pad), min(y2 - y1, ly + th + pad))
+        hit = self._match_window(frame, box, kind, entry, win)
+        cost = (time.perf_counter() - t0) * 1000.0
+        with self._local_lock:
+            if hit is not None and hit[0] >= self._local_thresh():
+                self.local_hits += 1
+                self.local_saved_ms += self._full_ms.get((key, entry.path), cost) - cost
+                return hit
+            self.local_misses += 1
+            self.local_saved_ms -= cost  # 白做的局部匹配
+            self._last_loc.pop((key, entry.path), None)
+        return None
+
+    def _remember(self, key: str, path: str, hit: Tuple[float, Tuple[int, int]], origin: Tuple[int, int],
+                  full_ms: float):
+        """整 ROI 匹配后：分数过阈值才记住位置（整屏坐标），并更新整 ROI 耗时的滑动平均。"""
+        if self.local_search_pad <= 0:
+            return
+        k = (key, path)
+        with self._local_lock:
+            prev = self._full_ms.get(k)
+            self._full_ms[k] = full_ms if prev is None else 0.8 * prev + 0.2 * full_ms
+            if hit[0] >= self._local_thresh():
+                self._last_loc[k] = (hit[1][0] + origin[0], hit[1][1] + origin[1])
+
+    def local_search_stats(self) -> Dict[str, float]:
+        """局部搜索命中率与累计节省耗时（毫秒；未命中时的局部匹配耗时记为负）。"""
+        total = self.local_hits + self.local_misses
+        return {
+            "hits": self.local_hits,
+            "misses": self.local_misses,
+            "hit_ratio": self.local_hits / total if total else 0.0,
+            "saved_ms": self.local_saved_ms,
+        }
 
-        return results
+    def reset_local_search(self):
+        with self._local_lock:
+            self._last_loc.clear()
 
     # 兼容旧测试：返回单个最佳匹配
     def _best_match_in_state(self, img_bgr: np.ndarray, state: Union[States, str]):
@@ -270,41 +689,141 @@ class TemplateStateDetector:
         return DetectedState(name=(state.value if isinstance(state, States) else state),
                              score=float(score), loc=loc, template=os.path.basename(tpath))
 
+    # ---------- 批量离线打分 ----------
+
+    def score_many(self, images: Iterable[Union[str, np.ndarray, Frame]], states: Optional[List[str]] = None,
+                   processes: int = 0, chunksize: int = 4) -> ScoreMatrix:
+        """
+        N 张图 × S 个状态的分数矩阵（见 war_drone.score_matrix）；images 为路径时逐张解码。
+        processes>1 时按图片用进程池并行。打分不走局部搜索（不改实例状态，可与 predict 并发），结果与输入顺序无关。
+        """
+        return score_matrix.build(self, images, states, processes, chunksize)
+
+    def offline_kwargs(self) -> Dict:
+        """重建同配置识别器的参数（离线打分用：不缓存帧、不做局部搜索、不开线程池、不重载模板）。"""
+        kw = dict(self._init_kwargs)
+        kw.update(frame_change=False, local_search_pad=0, workers=0, template_reload_s=-1.0)
+        return kw
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
     # ---------- 预测 ----------
 
-    def predict(self, img_bytes: Optional[bytes] = None, img_bgr: Optional[np.ndarray] = None, margin: float = 0.12) -> DetectedState:
+    def predict(self, img_bytes: Optional[bytes] = None, img_bgr: Union[np.ndarray, Frame, None] = None,
+                margin: float = 0.12, prev_state: Optional[str] = None) -> DetectedState:
         """
         返回最可能的状态；若最高分低于阈值或领先优势不足，则 UNKNOWN。
+        img_bgr 可传共享 Frame，与其他识别器共用灰度 / 边缘图。
+        prev_state 非 None 时按状态转移先验排序评估并可提前结束（见 _predict_ordered）；该模式串行执行。
         """
         assert img_bytes is not None or img_bgr is not None
         if img_bgr is None:
             img_bgr = _bytes_to_bgr(img_bytes)
-
+        img_bgr = as_frame(img_bgr)
+        self.last_states_evaluated = 0
+        if prev_state is None:
+            run = lambda: self._predict(img_bgr, margin)
+        else:
+            run = lambda: self._predict_ordered(img_bgr, margin, prev_state)
+        if self.frame_change is None:
+            return run()
+        # margin 不同的调用不能共用缓存
+        if self._cached_margin is not None and self._cached_margin != margin:
+            self.frame_change.reset()
+        self._cached_margin = margin
+        return self.frame_change.cached(img_bgr, run)
+
+    def _score_state(self, img_bgr: Frame, st_name: str, local: bool = True) -> Optional[DetectedState]:
+        """单个状态的合成分数（见 COMBINE_MODES）；无可用模板返回 None。local=False 不走局部搜索。"""
+        matches = self._best_matches_in_state(img_bgr, st_name, local)
+        if not matches:
+            return None
+        score, loc, tpath = fuse_scores(matches, self.combine_mode.get(st_name, "max"),
+                                        self._template_weights(st_name))
+        return DetectedState(name=st_name, score=score, loc=loc, template=os.path.basename(tpath))
+
+    def _template_weights(self, st_name: str) -> Dict[str, float]:
+        """状态内每个模板的权重（未配置为 1.0）；缺失 / 未匹配的模板按 0 分参与 sum / wmean / and_min。"""
+        opts = self.template_opts.get(st_name, {})
+        return {p: float(opts.get(p, {}).get("weight", 1.0)) for p in self.templates.get(st_name, [])}
+
+    def _score_states(self, img_bgr: Frame) -> List[DetectedState]:
+        """按 state_order 逐状态打分；workers>1 时并发执行，结果仍按 state_order 排列（与串行一致）。"""
+        if self._pool is None or len(self.state_order) < 2:
+            scored = [self._score_state(img_bgr, st) for st in self.state_order]
+        else:
+            scored = list(self._pool.map(lambda st: self._score_state(img_bgr, st), self.state_order))
+        return [d for d in scored if d is not None]
+
+    def _predict(self, img_bgr: Frame, margin: float) -> DetectedState:
+        self._count_evaluated(len(self.state_order))
+        return self._decide(self._score_states(img_bgr), margin)
+
+    # ---------- 状态转移先验 + 提前结束 ----------
+
+    def fsm_order(self, prev_state: Optional[str]) -> List[str]:
+        """评估顺序：上一状态 → 其后继（配置顺序）→ 弹窗 → 其余（state_order）；共用模板的兄弟状态紧随其后。"""
+        head = [prev_state] + self.transitions.get(prev_state, []) + self.popups
+        order: List[str] = []
+        for st in [st for st in head if st in self.state_order] + self.state_order:
+            order.extend([st] + self._siblings[st])
+        return list(dict.fromkeys(order))
+
+    def rival_ceiling_for(self, state: str) -> float:
+        """该状态（及其兄弟状态）的页面不在屏幕上时可能达到的最高分（经验上限，按 dataset 校准）。"""
+        return self.rival_ceiling.get(state, self.rival_ceiling_default)
+
+    def _predict_ordered(self, img_bgr: Frame, margin: float, prev_state: str) -> DetectedState:
+        """
+        按 fsm_order 逐个评估；当领先者已过阈值，且所有未评估状态的分数上限都比它低至少 margin 时停止。
+        未评估状态按上限无法超过领先者，因此判定结果与全量评估一致（前提是 rival_ceiling 校准可靠）。
+        """
+        order = self.fsm_order(prev_state)
         candidates: List[DetectedState] = []
-
-        for st_name in self.state_order:
-            matches = self._best_matches_in_state(img_bgr, st_name)
-            if not matches:
+        best: Optional[DetectedState] = None
+        n = 0
+        for n, st in enumerate(order, 1):
+            d = self._score_state(img_bgr, st)
+            if d is not None:
+                candidates.append(d)
+                if best is None or d.score > best.score:
+                    best = d
+            rest = order[n:]
+            if any(sib in rest for done in order[:n] for sib in self._siblings[done]):
                 continue
+            if best is not None and best.score >= self.thresh_for(best.name) and all(
+                    best.score - self.rival_ceiling_for(r) >= margin for r in rest):
+                break
+        self._count_evaluated(n)
+        return self._decide(candidates, margin)
+
+    def _count_evaluated(self, n: int):
+        self.last_states_evaluated = n
+        self.states_evaluated_total += n
+        self.frames_evaluated += 1
+
+    def fsm_stats(self) -> Dict[str, float]:
+        """实际评估的帧数、平均每帧评估的状态数、最近一帧的评估数。"""
+        f = self.frames_evaluated
+        return {
+            "frames": f,
+            "mean_evaluated": self.states_evaluated_total / f if f else 0.0,
+            "last_evaluated": self.last_states_evaluated,
+            "states": len(self.state_order),
+        }
 
-            mode = self.combine_mode.get(st_name, "max")
-            if mode == "and_min_top2" and len(matches) >= 2:
-                # 需要至少两张模板都高分：取前两高的较低者作为该状态分数
-                top2 = sorted([s for (s, _, _) in matches], reverse=True)[:2]
-                score = min(top2)
-                score1, loc, tpath = max(matches, key=lambda x: x[0])
-            else:
-                score, loc, tpath = max(matches, key=lambda x: x[0])
-
-            candidates.append(DetectedState(name=st_name, score=score, loc=loc, template=os.path.basename(tpath)))
-
+    def _decide(self, candidates: List[DetectedState], margin: float) -> DetectedState:
+        """阈值 + 领先优势判定。"""
         if not candidates:
             return DetectedState(name=States.UNKNOWN.value, score=0.0, loc=(0, 0), template="")
 
         top2 = sorted(candidates, key=lambda d: d.score, reverse=True)[:2]
         best = top2[0]
 
-        if best.score < self.default_thresh:
+        if best.score < self.thresh_for(best.name):
             return DetectedState(name=States.UNKNOWN.value, score=best.score, loc=best.loc, template=best.template)
 
         if len(top2) >= 2 and (best.score - top2[1].score) < margin:
@@ -0,0 +1,207 @@
+"""
+模板库：构造时一次性读入所有模板，保存 BGR / mask / 边缘预处理结果，predict 时不再读盘。
+- 模板条目支持字符串或 {file, weight, ...}（configs/config.json5 的多模板融合写法）
+- 自动重载：PNG（或 *_mask.png）mtime 变化时重新读入（按 reload_interval 秒节流检查）
+- 可选 .npz 缓存：按 (路径, mtime, 大小) 校验，命中则跳过 imread/Canny，加快启动
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from war_drone.frame import Frame
+
+TemplateSpec = Union[str, Dict[str, Any]]
+GRAY_TOL = 2  # 判定灰度模板的通道差容差（JPEG / 缩放带来的色偏）
+
+
+@dataclass
+class TemplateEntry:
+    path: str
+    bgr: np.ndarray
+    mask: Optional[np.ndarray]
+    edges: np.ndarray
+    stamp: Tuple[float, int, float]  # (模板 mtime, 大小, mask mtime)
+    _pyr: Dict[Tuple, Any] = field(default_factory=dict, repr=False, compare=False)
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.path)
+
+    def image(self, kind: str = "bgr", level: int = 0) -> np.ndarray:
+        """kind 为 bgr / gray / edges；level>0 为金字塔层（与 Frame.level/edges 同一缩放与边缘流程）。"""
+        if kind == "edges" and level <= 0:
+            return self.edges
+        frame = self._pyr.get("frame")
+        if frame is None:
+            frame = self._pyr["frame"] = Frame(self.bgr)
+        if kind == "edges":
+            return frame.edges(level)
+        return frame.level(level, gray=kind == "gray")
+
+    @property
+    def is_gray(self) -> bool:
+        """模板三通道几乎相同（mask 内通道差 ≤ GRAY_TOL），单通道匹配不丢信息。"""
+        if "is_gray" not in self._pyr:
+            b = self.bgr.astype(np.int16)
+            spread = np.maximum(np.abs(b[..., 0] - b[..., 1]), np.abs(b[..., 1] - b[..., 2]))
+            if self.mask is not None:
+                spread = spread[self.mask > 0]
+            self._pyr["is_gray"] = bool(spread.size == 0 or spread.max() <= GRAY_TOL)
+        return self._pyr["is_gray"]
+
+    def mask_at(self, level: int = 0) -> Optional[np.ndarray]:
+        if self.mask is None or level <= 0:
+            return self.mask
+        key = ("mask", level)
+        if key not in self._pyr:
+            h, w = self.image("bgr", level).shape[:2]
+            m = cv2.resize(self.mask, (w, h), interpolation=cv2.INTER_NEAREST)
+            self._pyr[key] = m
+        return self._pyr[key]
+
+
+def normalize_template_spec(spec: TemplateSpec, templates_dir: str = "") -> Tuple[str, Dict[str, Any]]:
+    """返回 (模板路径, 其余参数)；字符串视为 {file: spec}。"""
+    if isinstance(spec, str):
+        return os.path.join(templates_dir, spec), {}
+    opts = dict(spec)
+    file = opts.pop("file", None) or opts.pop("path", None)
+    if not file:
+        raise ValueError(f"模板条目缺少 file: {spec}")
+    return os.path.join(templates_dir, file), opts
+
+
+def mask_path_for(path: str) -> str:
+    return f"{os.path.splitext(path)[0]}_mask.png"
+
+
+def _stamp(path: str) -> Optional[Tuple[float, int, float]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    mp = mask_path_for(path)
+    m_mtime = os.path.getmtime(mp) if os.path.exists(mp) else 0.0
+    return st.st_mtime, st.st_size, m_mtime
+
+
+class TemplateBank:
+    """
+    loader(path) -> (bgr, mask)；prep(bgr) -> 边缘图。与 TemplateStateDetector 的读取/预处理保持一致。
+    get(path) 返回 TemplateEntry；文件不存在或读取失败返回 None。
+    """
+
+    def __init__(self, loader: Callable[[str], Tuple[Optional[np.ndarray], Optional[np.ndarray]]],
+                 prep: Callable[[np.ndarray], np.ndarray], paths: Iterable[str] = (),
+                 cache_path: Optional[str] = None, reload_interval: float = 1.0):
+        self._loader = loader
+        self._prep = prep
+        self.cache_path = cache_path
+        self.reload_interval = float(reload_interval)  # <0 关闭自动重载
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Optional[TemplateEntry]] = {}
+        self._last_check = time.monotonic()
+        self.loads = 0     # 实际读盘次数（含重载）
+        self.reloads = 0
+        self.cache_hits = 0
+        paths = list(dict.fromkeys(paths))
+        cached = self._read_cache(paths) if cache_path else {}
+        for p in paths:
+            self._entries[p] = cached.get(p) or self._load(p)
+        if cache_path and len(cached) < sum(1 for e in self._entries.values() if e is not None):
+            self.save(cache_path)
+
+    # ---------- 读取 ----------
+
+    def _load(self, path: str) -> Optional[TemplateEntry]:
+        stamp = _stamp(path)
+        if stamp is None:
+            return None
+        bgr, mask = self._loader(path)
+        if bgr is None:
+            return None
+        if mask is not None and mask.shape[:2] != bgr.shape[:2]:
+            # matchTemplate 要求 mask 与模板同尺寸；对不上时不用 mask（加载时提示一次）
+            print(f"[WARN] 模板 {os.path.basename(path)} 的 mask 尺寸 {mask.shape[1]}x{mask.shape[0]} "
+                  f"与模板 {bgr.shape[1]}x{bgr.shape[0]} 不一致，忽略 mask")
+            mask = None
+        self.loads += 1
+        return TemplateEntry(path, bgr, mask, self._prep(bgr), stamp)
+
+    def _maybe_reload(self):
+        if self.reload_interval < 0:
+            return
+        now = time.monotonic()
+        if now - self._last_check < self.reload_interval:
+            return
+        self._last_check = now
+        for path, entry in list(self._entries.items()):
+            stamp = _stamp(path)
+            if stamp != (entry.stamp if entry is not None else None):
+                self._entries[path] = self._load(path) if stamp is not None else None
+                self.reloads += 1
+
+    def get(self, path: str) -> Optional[TemplateEntry]:
+        with self._lock:
+            self._maybe_reload()
+            if path not in self._entries:
+                self._entries[path] = self._load(path)
+            return self._entries[path]
+
+    def entries(self, paths: Iterable[str]) -> List[TemplateEntry]:
+        return [e for e in (self.get(p) for p in paths) if e is not None]
+
+    def invalidate(self):
+        """立即重新读盘全部模板（基准测试用来模拟旧的“每次 predict 都读”）。"""
+        with self._lock:
+            for p in self._entries:
+                self._entries[p] = self._load(p)
+
+    def __len__(self) -> int:
+        return sum(1 for e in self._entries.values() if e is not None)
+
+    # ---------- npz 缓存 ----------
+
+    def save(self, path: str):
+        arrays: Dict[str, np.ndarray] = {}
+        meta = []
+        for i, e in enumerate(e for e in self._entries.values() if e is not None):
+            arrays[f"bgr_{i}"] = e.bgr
+            arrays[f"edges_{i}"] = e.edges
+            if e.mask is not None:
+                arrays[f"mask_{i}"] = e.mask
+            meta.append({"path": e.path, "stamp": list(e.stamp), "mask": e.mask is not None})
+        arrays["meta"] = np.array(json.dumps(meta, ensure_ascii=False))
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, **arrays)
+        os.replace(tmp, path)
+
+    def _read_cache(self, paths: List[str]) -> Dict[str, TemplateEntry]:
+        if not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with np.load(self.cache_path, allow_pickle=False) as z:
+                meta = json.loads(str(z["meta"]))
+                out = {}
+                for i, m in enumerate(meta):
+                    p = m["path"]
+                    if p not in paths or _stamp(p) != tuple(m["stamp"]):
+                        continue  # 模板已改动或不再使用
+                    out[p] = TemplateEntry(p, z[f"bgr_{i}"], z[f"mask_{i}"] if m["mask"] else None,
+                                           z[f"edges_{i}"], tuple(m["stamp"]))
+        except Exception as e:
+            print(f"[WARN] 模板缓存 {self.cache_path} 读取失败，重新加载: {e}")
+            return {}
+        self.cache_hits = len(out)
+        return out